@@ -1,23 +1,257 @@
-from typing import List
-import xlsx
+"""Converts the sheets of the allocation workbooks (*.xlsx) into CSV files or
+typed binary .npy files.
+
+Rows are streamed from each sheet and written as they are read, so memory use
+does not grow with the size of the sheet. The .npy format reads each sheet
+twice: once to find the type and width of every column, then to write it.
+Every matching sheet of every workbook in the directory is converted, one
+process per sheet.
+
+Usage (from the data directory):
+    python create_csvs.py [--sheet token_distribution] [--format csv|npy]
+"""
+import argparse
+import concurrent.futures
 import csv
+import datetime
 import os
+import shutil
+import tempfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import openpyxl
+
+CHUNK_ROWS: int = 4096
+"""CHUNK_ROWS: Rows buffered in memory before they are written to disk."""
 
 
-def csv_from_excel():
-    excel_file_paths: List[str] = [f for f in os.listdir() if ("xlsx" in f)]
-    workbook = xlsx.Workbook(excel_file_paths[0])
-    sheet: xlsx.Sheet = [
-        sheet for sheet in workbook if ("token_distribution" in sheet.name)
-    ][0]
+def iter_sheet_rows(xlsx_path: str, sheet_name: str) -> Iterator[Tuple[Any, ...]]:
+    """Streams the cell values of a sheet row by row, skipping empty rows.
+    Formula cells yield the value cached by the spreadsheet application."""
+    workbook = openpyxl.load_workbook(xlsx_path, read_only=True, data_only=True)
+    try:
+        for row in workbook[sheet_name].iter_rows(values_only=True):
+            if any(cell is not None for cell in row):
+                yield row
+    finally:
+        workbook.close()
 
-    with open("token_distribution.csv", "w") as csv_file:
+
+def format_cell(value: Any) -> Any:
+    # Dates are written as "(2022, 3, 1, 0, 0, 0)" tuples, the format read by
+    # 'PlotterTokenomicsV0'.
+    if isinstance(value, datetime.datetime):
+        return str(tuple(value.timetuple()[:6]))
+    return "" if value is None else value
+
+
+def write_csv(rows: Iterator[Tuple[Any, ...]], out_path: str) -> int:
+    num_rows = 0
+    with open(out_path, "w", newline="") as csv_file:
         writer = csv.writer(csv_file, quoting=csv.QUOTE_ALL)
-        for row_num, cells in sheet.rows().items():
-            writer.writerow([c.value for c in cells])
+        for cells in rows:
+            writer.writerow([format_cell(c) for c in cells])
+            num_rows += 1
+    return num_rows
+
+
+def column_names(header: Tuple[Any, ...]) -> List[str]:
+    """Field names from a header row. Blank and repeated names get the column
+    number appended."""
+    names: List[str] = []
+    for idx, name in enumerate(header):
+        name = "" if name is None else str(name)
+        if not name or name in names:
+            name = f"{name or 'column'}_{idx}"
+        names.append(name)
+    return names
+
+
+def cell_kind(value: Any) -> Optional[str]:
+    """"M" for dates, "f" for numbers, "U" for anything else and None for
+    empty cells."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime.datetime):
+        return "M"
+    if isinstance(value, (int, float)):
+        return "f"
+    return "U"
+
+
+def sheet_dtype(rows: Iterator[Tuple[Any, ...]]) -> np.dtype:
+    """Structured dtype of a sheet, from every one of its rows. The first row
+    holds the column names. A column is datetime64[s] if all its non-empty
+    cells are dates, float64 if they are all numbers, and otherwise a string
+    as wide as its longest cell. Empty columns are float64."""
+    names = column_names(next(rows))
+    kinds: Dict[int, set] = {idx: set() for idx in range(len(names))}
+    widths = [1] * len(names)
+    for cells in rows:
+        for idx, value in enumerate(cells[:len(names)]):
+            kind = cell_kind(value)
+            if kind is not None:
+                kinds[idx].add(kind)
+                widths[idx] = max(widths[idx], len(str(value)))
+
+    fields = []
+    for idx, name in enumerate(names):
+        if kinds[idx] == {"M"}:
+            fields.append((name, "M8[s]"))
+        elif kinds[idx] <= {"f"}:
+            fields.append((name, "f8"))
+        else:
+            fields.append((name, f"U{widths[idx]}"))
+    return np.dtype(fields)
+
+
+def write_npy(
+    rows: Iterator[Tuple[Any, ...]], out_path: str, dtype: np.dtype
+) -> int:
+    """Writes the rows as a structured .npy array of type 'dtype', usually
+    'sheet_dtype' of the same rows. The first row is the header and is
+    skipped. Empty numeric and date cells become NaN / NaT.
+
+    Chunks are appended to a temporary file because the number of rows, which
+    goes in the .npy header, is only known at the end.
+
+    Raises:
+        ValueError: If a cell does not fit its column, e.g. a string longer
+            than the field or a number in a date column.
+    """
+    next(rows)
+    fields = [(name, field_dtype) for name, (field_dtype, _) in dtype.fields.items()]
+
+    def to_record(cells: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        cells = tuple(cells[:len(fields)]) + (None,) * (len(fields) - len(cells))
+        record = []
+        for (name, field_dtype), value in zip(fields, cells):
+            kind = cell_kind(value)
+            if field_dtype.kind == "U":
+                value = "" if value is None else str(value)
+                if len(value) > field_dtype.itemsize // 4:
+                    raise ValueError(
+                        f"{out_path}: {len(value)} characters do not fit "
+                        f"column {name!r} of type {field_dtype}")
+            elif kind is None:
+                value = np.nan if field_dtype.kind == "f" else np.datetime64("NaT")
+            elif kind != field_dtype.kind:
+                raise ValueError(
+                    f"{out_path}: {value!r} does not fit column {name!r} "
+                    f"of type {field_dtype}")
+            elif field_dtype.kind == "M":
+                value = np.datetime64(value, "s")
+            record.append(value)
+        return tuple(record)
+
+    num_rows = 0
+    with tempfile.TemporaryFile() as body:
+        chunk: List[Tuple[Any, ...]] = []
+        for cells in rows:
+            chunk.append(to_record(cells))
+            if len(chunk) == CHUNK_ROWS:
+                body.write(np.array(chunk, dtype=dtype).tobytes())
+                num_rows += len(chunk)
+                chunk = []
+        if chunk:
+            body.write(np.array(chunk, dtype=dtype).tobytes())
+            num_rows += len(chunk)
+
+        body.seek(0)
+        with open(out_path, "wb") as out:
+            np.lib.format.write_array_header_1_0(
+                out,
+                dict(descr=np.lib.format.dtype_to_descr(dtype),
+                     fortran_order=False, shape=(num_rows,)),
+            )
+            shutil.copyfileobj(body, out)
+    return num_rows
+
+
+def convert_sheet(
+    xlsx_path: str, sheet_name: str, out_path: str, file_type: str = "csv"
+) -> Tuple[str, int]:
+    """Converts one sheet and returns the output path and number of rows."""
+    rows = iter_sheet_rows(xlsx_path=xlsx_path, sheet_name=sheet_name)
+    if file_type == "csv":
+        num_rows = write_csv(rows=rows, out_path=out_path)
+    elif file_type == "npy":
+        dtype = sheet_dtype(rows)
+        num_rows = write_npy(
+            rows=iter_sheet_rows(xlsx_path=xlsx_path, sheet_name=sheet_name),
+            out_path=out_path, dtype=dtype)
+    else:
+        raise ValueError(f"Invalid 'file_type': {file_type}. Must be csv or npy")
+    return out_path, num_rows
+
+
+def matching_sheets(
+    xlsx_paths: List[str], sheet_pattern: str
+) -> List[Tuple[str, str]]:
+    """Returns (workbook path, sheet name) for every sheet whose name contains
+    'sheet_pattern'."""
+    matches: List[Tuple[str, str]] = []
+    for xlsx_path in xlsx_paths:
+        workbook = openpyxl.load_workbook(xlsx_path, read_only=True)
+        matches += [(xlsx_path, name) for name in workbook.sheetnames
+                    if sheet_pattern in name]
+        workbook.close()
+    return matches
+
+
+def csv_from_excel(
+    directory: str = ".",
+    sheet_pattern: str = "token_distribution",
+    file_type: str = "csv",
+    max_workers: Optional[int] = None,
+) -> List[Tuple[str, int]]:
+    """Converts every sheet matching 'sheet_pattern' in every workbook of
+    'directory', in parallel.
+
+    Outputs are named after the sheet, e.g. "token_distribution.csv". When
+    several workbooks have a sheet of the same name, the workbook name is
+    prepended to keep the outputs apart.
+
+    Returns:
+        List[Tuple[str, int]]: Output path and number of rows of each sheet.
+    """
+    xlsx_paths: List[str] = sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.endswith(".xlsx") and not f.startswith("~$")
+    )
+    sheets = matching_sheets(xlsx_paths, sheet_pattern)
+    sheet_names = [name for _, name in sheets]
+
+    jobs: List[Tuple[str, str, str]] = []
+    for xlsx_path, sheet_name in sheets:
+        out_name = sheet_name
+        if sheet_names.count(sheet_name) > 1:
+            stem = os.path.splitext(os.path.basename(xlsx_path))[0]
+            out_name = f"{stem}.{sheet_name}"
+        out_path = os.path.join(directory, f"{out_name}.{file_type}")
+        jobs.append((xlsx_path, sheet_name, out_path))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [
+            pool.submit(convert_sheet, xlsx_path, sheet_name, out_path, file_type)
+            for xlsx_path, sheet_name, out_path in jobs
+        ]
+        return [future.result() for future in futures]
 
 
 # runs the csv_from_excel function:
 
 if __name__ == "__main__":
-    csv_from_excel()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dir", default=".")
+    parser.add_argument("--sheet", default="token_distribution",
+                        help="Convert sheets whose name contains this.")
+    parser.add_argument("--format", choices=["csv", "npy"], default="csv")
+    parser.add_argument("--jobs", type=int, default=None)
+    args = parser.parse_args()
+    for out_path, num_rows in csv_from_excel(
+        directory=args.dir, sheet_pattern=args.sheet,
+        file_type=args.format, max_workers=args.jobs,
+    ):
+        print(f"{out_path}: {num_rows} rows")
@@ -1,151 +1,476 @@
-import pprint
-import io
-import numpy as np
+import argparse
+import dataclasses
+import functools
+from pkg import payload
 from pkg import plotter
-from pkg import decay
-from typing import List, Union, Any, Dict
+from pkg import profiling
+from pkg import shared
+from pkg import vesting
+from pkg.metrics import SupplyMetrics
+from pkg.sensitivity import Tornado
+from pkg.spec import DecaySpec, TokenomicsSpec, load_spec, spec_from_groups
+from pkg.supply import SupplyMatrix
+from pkg.decay import DecayResult, SUPPLY_AT_MATURITY, do_decay  # noqa: F401
+from typing import Callable, Hashable, List, Any, Dict, Optional, Union
 
 import dash
 from dash import dcc
 from dash import html
+from dash import ALL, Input, Output
+from dash.exceptions import PreventUpdate
+import flask
 import plotly.graph_objects as go
 
-from dataclasses import dataclass
-
-SUPPLY_AT_MATURITY = 800_000_000
-
-
-@dataclass
-class DecayResult:
-    f_t: np.ndarray
-    times: np.ndarray
-    normal_f_t: np.ndarray
-
-    def pprint(self):
-        """Pretty-print results"""
-        out_buffer = io.StringIO()
-
-        pprint.pprint(self.pprint_data(), stream=out_buffer)
-
-        pretty_str = out_buffer.getvalue()
-        out_buffer.close()
-        return pretty_str
-
-    def pprint_data(self) -> Dict[str, Any]:
-        """Pretty-print results as a dictionary. This format is easier to work
-        with inside Python."""
-        return {
-            "polynomial_coefs (decreasing order, last coef is intercept)":
-                [c for c in self.poly_coefs(degree=5)],
-            "times": f"{self.times[:2]}...{self.times[-2:]}",
-            "normal_f(t) := f(t) / f(t).sum()": self.normal_f_t,
-        }
-
-    def target_vector(self):
-        return self.normal_f_t * SUPPLY_AT_MATURITY
-
-    def poly_coefs(self, degree=5):
-        snapshots = self.target_vector()
-        return np.polyfit(self.times, snapshots, degree)
-
-    def poly_fn(self):
-        coefs = self.poly_coefs()
-        return np.poly1d(coefs)
-
-    def plot_polynomial(self) -> go.Figure:
-        x = self.times
-
-        poly_fn = self.poly_fn()
-        y_poly = poly_fn(self.times)
-        y_target = self.target_vector()
-
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(
-            x=x, y=y_poly, mode='lines', name='Polynomial Fit'))
-        fig.add_trace(go.Scatter(x=x, y=y_target,
-                      mode='lines', name='Target Vector'))
-
-        coef_display = [f"{c:.3e}" for c in self.poly_coefs()]
-        fig.update_layout(
-            title='Polynomial Fit and Target Vector',
-            xaxis_title='Time',
-            yaxis_title='Value',
-            font=dict(family="Inter"),
-            annotations=[
-                dict(xref="paper", yref="paper", x=0.9, y=0.9, showarrow=False,
-                     text=f"Polynomial Coefs:\n{coef_display}", align="right"),
-                dict(xref="paper", yref="paper", x=0.9, y=0.8, showarrow=False,
-                     text=f"Supply (Fit Line):{round(y_poly.sum()):.3e}", align="right"),
-                dict(xref="paper", yref="paper", x=0.9, y=0.7, showarrow=False,
-                     text=f"Supply (Target Line):{y_target.sum():.3e}", align="right"),
-            ],
-        )
-
-        # Show the figure
-        return fig
+
+def group_controls(groups: List[plotter.AllocationGroup]) -> html.Div:
+    """Debounced inputs for each group's 'pct' and 'VestingInfo'. Component
+    ids use pattern matching on the group's index in 'groups'."""
+    rows = []
+    for idx, group in enumerate(groups):
+        fields = [("group-pct", "pct", group.pct, 0.001)]
+        if group.vi is not None:
+            fields += [
+                ("group-cliff", "cliff_pct", group.vi.cliff_pct, 0.01),
+                ("group-start", "vest_start_month",
+                 group.vi.vest_start_month, 1),
+                ("group-end", "vest_end_month", group.vi.vest_end_month, 1),
+            ]
+        inputs = []
+        for id_type, label, value, step in fields:
+            inputs.append(html.Label(label))
+            inputs.append(dcc.Input(
+                id={"type": id_type, "index": idx}, type="number",
+                value=value, step=step, min=0, debounce=True))
+        rows.append(html.Div([html.B(group.name), *inputs]))
+    return html.Div(rows)
+
+
+def decay_controls(
+    decay_factor: float, time_years: int, degree: int
+) -> html.Div:
+    return html.Div([
+        html.Label("decay_factor"),
+        dcc.Slider(id="decay-factor", min=0.01, max=0.9, step=0.01,
+                   value=decay_factor, updatemode="mouseup"),
+        html.Label("time_years"),
+        dcc.Input(id="decay-time-years", type="number", value=time_years,
+                  min=1, step=1, debounce=True),
+        html.Label("degree"),
+        dcc.Input(id="decay-degree", type="number", value=degree,
+                  min=1, max=12, step=1, debounce=True),
+    ])
+
+
+def sensitivity_controls(month: float) -> html.Div:
+    return html.Div([
+        html.Label("sensitivity_month"),
+        dcc.Input(id="sensitivity-month", type="number", value=month,
+                  min=0, step=1, debounce=True),
+    ])
+
+
+def decay_text_elems(decay_result: DecayResult) -> List[Any]:
+    text_elems = []  # HTML text elements
+    for k, v in decay_result.pprint_data().items():
+        text_elems.append(html.H2(k))
+        text_elems.append(html.P(f"{v}\n"))
+    return text_elems
+
+
+def app_layout(
+    groups: List[plotter.AllocationGroup],
+    figures: Dict[str, Union[go.Figure, Dict[str, Any]]],
+    decay_result: DecayResult,
+    decay_factor: float,
+    time_years: int,
+    degree: int,
+    sensitivity_month: float = 24,
+) -> html.Div:
+    """Controls, one 'dcc.Graph' per entry of 'figures' (keyed by graph id,
+    figures or compact payloads) and the decay summary."""
+    return html.Div([
+        group_controls(groups),
+        html.Div(children=[dcc.Graph(id=fig_id, figure=fig)
+                 for fig_id, fig in figures.items()]),
+        sensitivity_controls(sensitivity_month),
+        decay_controls(decay_factor, time_years, degree),
+        html.Div(id="decay-text", children=decay_text_elems(decay_result)),
+    ])
+
+
+def render(
+    key: Hashable,
+    build: Callable[[], go.Figure],
+    compact: bool = False,
+    float32: bool = False,
+) -> Union[go.Figure, Dict[str, Any]]:
+    """The figure from 'build', or with 'compact', its cached typed-array
+    payload (see 'pkg.payload'). 'key' must identify the figure's inputs."""
+    if not compact:
+        return build()
+    return payload.figure_payload(key=key, build=build, float32=float32)
+
+
+def metrics_figures(
+    supply_metrics: Callable[[], SupplyMetrics], colors: Dict[str, str]
+) -> Dict[str, Callable[[], go.Figure]]:
+    """Builders of the derived metrics figures, keyed by graph id."""
+    return {
+        "inflation-rate": lambda: supply_metrics().plot_inflation_rate(),
+        "token-unlocks": lambda: supply_metrics().plot_unlocks(),
+        "supply-shares": lambda: supply_metrics().plot_shares(colors),
+    }
+
+
+def plotter_for(
+    groups: List[plotter.AllocationGroup],
+    tokenomics_spec: Optional[TokenomicsSpec] = None,
+) -> plotter.PlotterTokenomicsV1:
+    """Plotter of 'groups' with the total supply and phases of
+    'tokenomics_spec', or the defaults without one."""
+    if tokenomics_spec is None:
+        return plotter.PlotterTokenomicsV1(groups=groups)
+    return plotter.PlotterTokenomicsV1.from_spec(dataclasses.replace(
+        tokenomics_spec, groups=spec_from_groups(groups).groups))
+
+
+def dashboard_figures(
+    plotter_v1: plotter.PlotterTokenomicsV1,
+    supply_metrics: Callable[[], SupplyMetrics],
+    decay_result: DecayResult,
+    supply_matrix: Optional[SupplyMatrix] = None,
+    tornado: Optional[Tornado] = None,
+) -> Dict[str, go.Figure]:
+    """Every figure of the dashboard, keyed by graph id. The release area
+    and tornado are plotted from 'supply_matrix' and 'tornado' when given,
+    e.g. by workers attached to a shared store."""
+    return {
+        # plot: Token release schedule
+        "token-release-area": plotter_v1.plot_token_distrib_area(
+            supply_matrix=supply_matrix),
+        # plot: Token distribution at maturity
+        "final-token-supply": plotter_v1.plot_final_token_supply(
+            save=False, pie_type="pie"),
+        # plot: Parameters ranked by their effect on supply
+        "sensitivity-tornado": plotter_v1.plot_sensitivity_tornado(
+            tornado=tornado),
+        # plots: Inflation rate, unlocks and shares of supply
+        **{fig_id: build() for fig_id, build in metrics_figures(
+            supply_metrics, plotter_v1.category_color_map).items()},
+        # plot: Polynomial comparison
+        "decay-polynomial": decay_result.plot_polynomial(),
+        # ----------------------- V0 Plots -----------------------
+        # plotter_v0.plot_token_release_schedule_area()),
+        # plotter_v0.plot_token_release_schedule_line(save=True)),
+        # plotter_v0.plot_genesis_supply(save=True, pie_type="sunburst")),
+        # custom.plot_foo()),
+    }
+
+
+def register_callbacks(
+    app: dash.Dash,
+    groups: List[plotter.AllocationGroup],
+    compact: bool = False,
+    float32: bool = False,
+    tokenomics_spec: Optional[TokenomicsSpec] = None,
+):
+    """Wires the parameter controls to the figures. Each figure only depends
+    on the controls it reads, so Dash re-renders nothing else, and the
+    schedules of unchanged groups come from the 'VestingInfo.schedule' cache.
+    With 'compact', figures are sent as cached typed-array payloads. The
+    total supply, phases and decay 'supply_at_maturity' are those of
+    'tokenomics_spec', or the defaults without one.
+    """
+    decay_spec = DecaySpec() if tokenomics_spec is None else tokenomics_spec.decay
+    supply_at_maturity = decay_spec.supply_at_maturity
+    vesting_idxs = [idx for idx, g in enumerate(groups) if g.vi is not None]
+
+    def with_params(pcts, cliffs=None, starts=None, ends=None):
+        if any(v is None for v in pcts):
+            raise PreventUpdate
+        new_groups = [dataclasses.replace(g, pct=pct)
+                      for g, pct in zip(groups, pcts)]
+        if cliffs is None:
+            return new_groups
+        for idx, cliff, start, end in zip(vesting_idxs, cliffs, starts, ends):
+            if None in (cliff, start, end) or not 0 <= start <= end:
+                raise PreventUpdate
+            new_groups[idx] = dataclasses.replace(
+                new_groups[idx],
+                vi=vesting.VestingInfo(
+                    cliff_pct=cliff,
+                    vest_start_month=int(start),
+                    vest_end_month=int(end),
+                ),
+            )
+        return new_groups
+
+    @app.callback(
+        Output("token-release-area", "figure"),
+        Input({"type": "group-pct", "index": ALL}, "value"),
+        Input({"type": "group-cliff", "index": ALL}, "value"),
+        Input({"type": "group-start", "index": ALL}, "value"),
+        Input({"type": "group-end", "index": ALL}, "value"),
+        prevent_initial_call=True,
+    )
+    def update_release_area(pcts, cliffs, starts, ends):
+        new_groups = with_params(pcts, cliffs, starts, ends)
+        return render(
+            key=("token-release-area", repr(new_groups)),
+            build=plotter_for(
+                new_groups, tokenomics_spec).plot_token_distrib_area,
+            compact=compact, float32=float32)
+
+    @app.callback(
+        Output("final-token-supply", "figure"),
+        Input({"type": "group-pct", "index": ALL}, "value"),
+        prevent_initial_call=True,
+    )
+    def update_final_supply(pcts):
+        new_groups = with_params(pcts)
+        return render(
+            key=("final-token-supply", repr(new_groups)),
+            build=lambda: plotter_for(
+                new_groups, tokenomics_spec).plot_final_token_supply(
+                    pie_type="pie"),
+            compact=compact, float32=float32)
+
+    @app.callback(
+        Output("inflation-rate", "figure"),
+        Output("token-unlocks", "figure"),
+        Output("supply-shares", "figure"),
+        Input({"type": "group-pct", "index": ALL}, "value"),
+        Input({"type": "group-cliff", "index": ALL}, "value"),
+        Input({"type": "group-start", "index": ALL}, "value"),
+        Input({"type": "group-end", "index": ALL}, "value"),
+        prevent_initial_call=True,
+    )
+    def update_metrics(pcts, cliffs, starts, ends):
+        new_groups = with_params(pcts, cliffs, starts, ends)
+        new_plotter = plotter_for(new_groups, tokenomics_spec)
+        supply_metrics = functools.lru_cache(maxsize=1)(new_plotter.supply_metrics)
+        return tuple(
+            render(key=(fig_id, repr(new_groups)), build=build,
+                   compact=compact, float32=float32)
+            for fig_id, build in metrics_figures(
+                supply_metrics, new_plotter.category_color_map).items())
+
+    @app.callback(
+        Output("sensitivity-tornado", "figure"),
+        Input({"type": "group-pct", "index": ALL}, "value"),
+        Input({"type": "group-cliff", "index": ALL}, "value"),
+        Input({"type": "group-start", "index": ALL}, "value"),
+        Input({"type": "group-end", "index": ALL}, "value"),
+        Input("sensitivity-month", "value"),
+        prevent_initial_call=True,
+    )
+    def update_tornado(pcts, cliffs, starts, ends, month):
+        if month is None:
+            raise PreventUpdate
+        new_groups = with_params(pcts, cliffs, starts, ends)
+        return render(
+            key=("sensitivity-tornado", repr(new_groups), month),
+            build=lambda: plotter_for(
+                new_groups, tokenomics_spec).plot_sensitivity_tornado(
+                    month=month),
+            compact=compact, float32=float32)
+
+    @app.callback(
+        Output("decay-polynomial", "figure"),
+        Output("decay-text", "children"),
+        Input("decay-factor", "value"),
+        Input("decay-time-years", "value"),
+        Input("decay-degree", "value"),
+        prevent_initial_call=True,
+    )
+    def update_decay(decay_factor, time_years, degree):
+        if None in (decay_factor, time_years, degree):
+            raise PreventUpdate
+        decay_result = do_decay(
+            decay_factor=decay_factor, time_years=int(time_years),
+            degree=int(degree), supply_at_maturity=supply_at_maturity)
+        figure = render(
+            key=("decay-polynomial", decay_factor, int(time_years), int(degree),
+                 supply_at_maturity),
+            build=decay_result.plot_polynomial,
+            compact=compact, float32=float32)
+        return figure, decay_text_elems(decay_result)
+
+
+def serving_app(
+    directory: Optional[str] = None,
+    compact: bool = False,
+    float32: bool = False,
+    attach_timeout: float = 0.0,
+) -> dash.Dash:
+    """Dashboard for a WSGI server running several worker processes.
+
+    The arrays are attached from the store published by
+    'shared.publish' (e.g. 'python main.py --publish'), so workers share one
+    copy of them and do not recompute them. The plotter is rebuilt from the
+    published spec, and the release area, tornado, metrics and decay figures
+    are plotted from the shared arrays. Adds the routes:
+        /healthz: 200 while the process serves requests.
+        /readyz: 200 while the attached generation is the published one,
+            503 once a newer one replaces it, so the worker gets restarted.
+
+    Args:
+        directory (str, optional): Shared store. Defaults to
+            'shared.default_dir()'.
+        compact, float32: As in 'register_callbacks'.
+        attach_timeout (float, optional): Seconds to wait for the primary to
+            publish. Defaults to 0.
+    """
+    store = shared.attach(directory, timeout=attach_timeout)
+    tokenomics_spec = store.tokenomics_spec()
+    plotter_v1 = plotter.PlotterTokenomicsV1.from_spec(tokenomics_spec)
+    figures: Dict[str, Any] = dashboard_figures(
+        plotter_v1=plotter_v1,
+        supply_metrics=store.supply_metrics,
+        decay_result=store.decay_result(),
+        supply_matrix=store.supply_matrix(),
+        tornado=store.tornado(),
+    )
+    if compact:
+        figures = {fig_id: payload.compact_figure(fig, float32=float32)
+                   for fig_id, fig in figures.items()}
+
+    app = dash.Dash(__name__)
+    app.layout = app_layout(
+        groups=plotter_v1.groups,
+        figures=figures,
+        decay_result=store.decay_result(),
+        decay_factor=tokenomics_spec.decay.decay_factor,
+        time_years=tokenomics_spec.decay.time_years,
+        degree=tokenomics_spec.decay.degree,
+        sensitivity_month=store.tornado().month,
+    )
+    register_callbacks(
+        app, plotter_v1.groups, compact=compact, float32=float32,
+        tokenomics_spec=tokenomics_spec)
+
+    @app.server.route("/healthz")
+    def healthz():
+        return flask.jsonify(status="ok")
+
+    @app.server.route("/readyz")
+    def readyz():
+        status = dict(generation=store.generation, shared_bytes=store.nbytes())
+        if not store.is_current():
+            return flask.jsonify(status="stale", **status), 503
+        return flask.jsonify(status="ready", **status)
+
+    return app
 
 
 if __name__ == "__main__":
 
-    def plotting():
+    def plotting(
+        compact: bool = False,
+        float32: bool = False,
+        tokenomics_spec: Optional[TokenomicsSpec] = None,
+    ):
         # plotter_v0 = plotter.PlotterTokenomicsV0()
-        plotter_v1 = plotter.PlotterTokenomicsV1()
+        with profiling.span("plotter_v1"):
+            plotter_v1 = (plotter.PlotterTokenomicsV1() if tokenomics_spec is None
+                          else plotter.PlotterTokenomicsV1.from_spec(tokenomics_spec))
         # custom = plotter.CustomPlotter()
 
-        decay = do_decay(decay_factor=0.2)
-        decay.pprint()
+        decay_spec = plotter_v1.decay_spec()
+        decay_factor = decay_spec.decay_factor
+        time_years, degree = decay_spec.time_years, decay_spec.degree
+        with profiling.span("do_decay"):
+            decay = plotter_v1.decay_result()
+        print("\n————————————————————————————————————————")
+        print(f"decay_factor: {decay_factor}")
+        with profiling.span("decay.pprint"):
+            decay.pprint()
 
         app = dash.Dash()
-        figures: List[go.Figure] = [
-            # plot: Token release schedule
-            plotter_v1.plot_token_distrib_area(save=True, save_types=["png",
-                                                                      "svg"]),
-            # plot: Token distribution at maturity
-            plotter_v1.plot_final_token_supply(save=False, pie_type="pie"),
-            # plot: Polynomial comparison
-            decay.plot_polynomial(),
-            # ----------------------- V0 Plots -----------------------
-            # plotter_v0.plot_token_release_schedule_area()),
-            # plotter_v0.plot_token_release_schedule_line(save=True)),
-            # plotter_v0.plot_genesis_supply(save=True, pie_type="sunburst")),
-            # custom.plot_foo()),
-        ]
-
-        def parse_figure(
-            fig: Union[go.Figure, dcc.Markdown],
-        ) -> Union[dcc.Graph, dcc.Markdown]:
-            try:
-                return dcc.Graph(figure=fig)
-            except BaseException:
-                assert isinstance(fig, dcc.Markdown)
-                return fig
-
-        text_elems = []  # HTML text elements
-        for k, v in decay.pprint_data().items():
-            text_elems.append(html.H2(k))
-            text_elems.append(html.P(f"{v}\n"))
-
-        app.layout = html.Div([
-            html.Div(children=[parse_figure(fig=figure)
-                     for figure in figures]),
-            *text_elems,
-        ])
+        with profiling.span("figures"):
+            figures = dashboard_figures(
+                plotter_v1=plotter_v1,
+                supply_metrics=functools.lru_cache(maxsize=1)(
+                    plotter_v1.supply_metrics),
+                decay_result=decay,
+            )
 
+        with profiling.span("save_figures"):
+            export_results = plotter.save_figures(jobs=[
+                (figures["token-release-area"], "token_release_area", file_type)
+                for file_type in ["png", "svg"]
+            ])
+        for result in export_results:
+            print(f"saved {result.path} in {result.seconds:.3f}s")
+
+        layout_figures: Dict[str, Any] = dict(figures)
+        if compact:
+            # Encoded once here; Dash re-serializes only the base64 strings
+            # on each page load.
+            with profiling.span("figures.compact"):
+                layout_figures = {
+                    fig_id: payload.compact_figure(fig, float32=float32)
+                    for fig_id, fig in figures.items()
+                }
+
+        with profiling.span("layout"):
+            app.layout = app_layout(
+                groups=plotter_v1.groups,
+                figures=layout_figures,
+                decay_result=decay,
+                decay_factor=decay_factor,
+                time_years=time_years,
+                degree=degree,
+            )
+        if profiling.is_enabled():
+            # Dash serializes the layout on every page load.
+            import plotly.io
+            with profiling.span("layout.serialize"):
+                plotly.io.json.to_json_plotly(app.layout)
+        register_callbacks(
+            app, plotter_v1.groups, compact=compact, float32=float32,
+            tokenomics_spec=tokenomics_spec)
+
+        profiling.report()
         app.run_server(debug=True, use_reloader=False)
 
-    def do_decay(decay_factor=0.5, time_years=8) -> DecayResult:
-        time_years = np.linspace(start=0, stop=time_years,
-                                 num=time_years * 12)  # in months
-        f_t = decay.ExponentialDecay.decay_amts(
-            amt_start=100, decay_factor=decay_factor, times=time_years
-        )
-        print("\n————————————————————————————————————————")
-        print(f"decay_factor: {decay_factor}")
-        norm_f_t = f_t / f_t.sum()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--profile", nargs="?", const="", default=None, metavar="DUMP_PATH",
+        help="Time each stage and print a summary. With a path, also write "
+             "cProfile stats there and folded stacks to DUMP_PATH.folded.")
+    parser.add_argument(
+        "--typed-arrays", action="store_true",
+        help="Send figures as cached base64 typed arrays. Needs a Dash "
+             "release that bundles plotly.js 2.28 or later.")
+    parser.add_argument(
+        "--float32", action="store_true",
+        help="With --typed-arrays, send float arrays as float32 where the "
+             "relative error stays below 1e-6.")
+    parser.add_argument(
+        "--publish", nargs="?", const="", default=None, metavar="DIR",
+        help="Compute the arrays shared by the workers of 'wsgi.py', publish "
+             "them to DIR (default: shared.default_dir()) and exit.")
+    parser.add_argument(
+        "--spec", default=None,
+        help="TOML or YAML tokenomics spec for the groups, phases and decay "
+             "parameters. Defaults to the built-in ones.")
+    args = parser.parse_args()
+    tokenomics_spec = None if args.spec is None else load_spec(args.spec)
+    if args.profile is not None:
+        profiling.enable(dump_path=args.profile or None)
+    else:
+        profiling.enable_from_env()
 
-        times = [t for t, _ in enumerate(norm_f_t)]
-        return DecayResult(f_t=f_t, times=times, normal_f_t=norm_f_t)
+    if args.publish is not None:
+        with profiling.span("publish"):
+            gen_dir = shared.publish(
+                directory=args.publish or None, tokenomics_spec=tokenomics_spec)
+        print(f"published {gen_dir}")
+        profiling.report()
+        raise SystemExit(0)
 
-    plotting()
+    plotting(compact=args.typed_arrays, float32=args.float32,
+             tokenomics_spec=tokenomics_spec)
 
 # %%
@@ -0,0 +1,160 @@
+"""Allocation groups of the NIBI token supply and their release schedules.
+
+This module depends only on NumPy so that the schedules can be computed
+without importing the plotting stack.
+
+Classes:
+    AllocationGroup
+    Colors
+    GroupType
+
+Functions:
+    community_schedule
+    default_groups
+    schedules
+"""
+import dataclasses
+import functools
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg import vesting
+
+
+@dataclasses.dataclass
+class AllocationGroup:
+    name: str
+    pct: float  # e.g. 20 for 20%
+    color: str
+    vi: Optional[vesting.VestingInfo] = None
+
+
+class Colors:
+    PURPLE = "rgb(100, 80, 194)"
+    SKY_BLUE = "rgb(96, 156, 212)"
+    PINK = "rgb(200, 124, 226)"
+    GOLD = "rgb(213, 175, 96)"
+    GREEN = "rgb(130, 207, 179)"
+
+    LOGO_PINK = "rgb(255, 212, 229)"
+    LOGO_TURQUOISE = "rgb(83, 77, 224)"
+    LOGO_YELLOW = "rgb(255, 243, 204)"
+    LOGO_BLACK = "rgb(7, 0, 19)"
+
+
+class GroupType:
+    TEAM = "Core Contributors"
+    POST_SEED = "Investors (Post-Seed)"
+    SEED = "Investors (Seed)"
+    COMMUNITY = "Community"
+    PUBLIC_SALE = "Public Sale"  # CoinList
+
+
+"""
+>>> yp
+array([17.35483871, 12.09677419,  10.87096774,  8.06451613,  8.06451613,
+        7.25806452,  6.4516129 ,  5.64516129,  4.83870968,  4.03225806,
+        3.22580645,  2.41935484,  2.82258065,  2.41935484,  2.41935484,
+        2.01612903])
+>>> yp.sum()
+100.0
+"""
+# Juno opts for 30-17-9-6 over 12 phases
+#
+INCENTIVE_PHASES: List[float] = (
+    [17.35483871, 12.09677419, 10.87096774, 8.06451613]
+    + [8.06451613, 7.25806452, 6.4516129, 5.64516129]
+    + [4.83870968, 4.03225806, 3.22580645, 2.82258065]
+    + [2.41935484, 2.41935484, 2.41935484, 2.01612903]
+)
+"""INCENTIVE_PHASES (List[float]): A breakdown of percentages of the
+community distribution.
+- Q: Why are there 16 phases?
+  Each incentive phase lasts 6 months. Since the community distribution
+  comes out across a time span of 8 years, there are 16 phases.
+"""
+
+PHASE_MONTHS: float = TOKEN_SUPPLY_YEARS * 12 / len(INCENTIVE_PHASES)
+"""PHASE_MONTHS: Duration of each community incentive phase in months."""
+
+
+@functools.lru_cache(maxsize=256)
+def community_schedule(
+    group_supply: float, phases: Tuple[float, ...]
+) -> vesting.PiecewiseLinear:
+    """Cumulative community distribution of 'group_supply' tokens released
+    linearly over consecutive phases of 'PHASE_MONTHS' each. 'phases' are
+    percentages that sum to 100. Memoized, so callers must not mutate the
+    result.
+    """
+    phases_arr = np.asarray(phases, dtype=float)
+    assert abs(phases_arr.sum() - 100) <= 0.01
+    times = PHASE_MONTHS * np.arange(phases_arr.size + 1)
+    values = np.concatenate([[0.0], phases_arr.cumsum() / 100 * group_supply])
+    return vesting.PiecewiseLinear(times=times, values=values)
+
+
+def default_groups() -> List[AllocationGroup]:
+    """Allocation groups of Tokenomics v2 (2024-01-26)."""
+    return [
+        # AllocationGroup("Team", 0.17, "rgb(195, 155, 213)"),
+        # AllocationGroup("Treasury", 0.04, "rgb(83, 77, 224)"),
+        AllocationGroup(
+            GroupType.PUBLIC_SALE,
+            0.08,
+            Colors.GREEN,
+            vi=vesting.VestingInfo(
+                cliff_pct=0.1, vest_start_month=0, vest_end_month=12
+            ),
+        ),
+        AllocationGroup(
+            GroupType.POST_SEED,
+            0.081328,
+            Colors.GOLD,
+            vi=vesting.VestingInfo(
+                cliff_pct=0, vest_start_month=0, vest_end_month=36
+            ),
+        ),
+        AllocationGroup(
+            GroupType.SEED,
+            0.085172,
+            Colors.SKY_BLUE,
+            vi=vesting.VestingInfo(
+                cliff_pct=0.25, vest_start_month=9, vest_end_month=45
+            ),
+        ),
+        AllocationGroup(
+            GroupType.TEAM,
+            0.1535,
+            Colors.PINK,
+            vi=vesting.VestingInfo(
+                cliff_pct=0.1, vest_start_month=9, vest_end_month=24
+            ),
+        ),
+        AllocationGroup(GroupType.COMMUNITY, 0.60, Colors.PURPLE),
+    ]
+
+
+def schedules(
+    groups: List[AllocationGroup], total_supply: float
+) -> Dict[str, vesting.PiecewiseLinear]:
+    """Cumulative supply curve of every group, keyed by group name. Groups
+    without 'VestingInfo' are released through the 'INCENTIVE_PHASES' and come
+    first, matching the stacking order of the release schedule plot.
+
+    Args:
+        groups (List[AllocationGroup]): Allocation groups.
+        total_supply (float): Token supply at maturity.
+    """
+    out: Dict[str, vesting.PiecewiseLinear] = {}
+    for group in groups:
+        if group.vi is None:
+            out[group.name] = community_schedule(
+                group_supply=total_supply * group.pct,
+                phases=tuple(INCENTIVE_PHASES),
+            )
+    for group in groups:
+        if group.vi is not None:
+            out[group.name] = group.vi.schedule(
+                group_pct=group.pct, total_supply=total_supply)
+    return out
@@ -0,0 +1,347 @@
+"""Benchmarks of the compute and render stages, with a machine-readable history.
+
+Each case is timed over a few repeats (best and median wall time) and run once
+more under 'tracemalloc' to record its peak Python heap allocation, which
+includes NumPy buffers. Cases that depend on the size of the time grid are run
+for every size in the sweep. Every run appends one JSON line per measurement
+to the history file, tagged with the git commit, so a regression shows up as a
+jump between consecutive runs of the same case and size. '--compare' exits
+with an error if any case got slower than the previous run by more than the
+threshold.
+
+Usage (from the repository root):
+    python -m pkg.bench [--sizes 1e3 1e4 1e5 1e6 1e7] [--cases distrib_vec ...]
+    python -m pkg.bench --compare --threshold 1.25
+
+Classes:
+    BenchCase
+    Measurement
+
+Functions:
+    default_cases
+    measure
+    run
+    compare
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pkg import allocation
+from pkg import decay
+from pkg.const import TOKEN_SUPPLY_YEARS
+
+HISTORY_PATH: str = os.path.join("benchmarks", "history.jsonl")
+DEFAULT_SIZES: List[int] = [10**3, 10**4, 10**5, 10**6, 10**7]
+
+
+@dataclasses.dataclass
+class BenchCase:
+    """A benchmarked stage.
+
+    Attributes:
+        name (str): Case name, the key of its history.
+        setup (Callable[[Optional[int]], Callable[[], Any]]): Given a time
+            grid size (None for fixed-size cases), does any untimed
+            preparation and returns the function to time.
+        sized (bool): Whether the case is swept over the grid sizes.
+    """
+
+    name: str
+    setup: Callable[[Optional[int]], Callable[[], Any]]
+    sized: bool = True
+
+
+@dataclasses.dataclass
+class Measurement:
+    case: str
+    size: Optional[int]
+    repeat: int
+    best_seconds: Optional[float]
+    median_seconds: Optional[float]
+    peak_bytes: Optional[int]
+    error: Optional[str] = None
+
+
+def _plotter():
+    from pkg import plotter
+    return plotter
+
+
+def _case_distrib_vec(size: Optional[int]) -> Callable[[], Any]:
+    group = next(g for g in allocation.default_groups() if g.vi is not None)
+    return lambda: group.vi.distrib_vec(group_pct=group.pct, num_time_points=size)
+
+
+def _case_token_distrib_area(size: Optional[int]) -> Callable[[], Any]:
+    plotter_v1 = _plotter().PlotterTokenomicsV1()
+    return lambda: plotter_v1.setup_token_distrib_area(num_time_points=size)
+
+
+def _case_decay_amts(size: Optional[int]) -> Callable[[], Any]:
+    times = np.linspace(0, TOKEN_SUPPLY_YEARS * 12, num=size)
+    return lambda: decay.ExponentialDecay.decay_amts(
+        amt_start=100, decay_factor=0.2, times=times)
+
+
+def _case_poly_coefs(size: Optional[int]) -> Callable[[], Any]:
+    times = np.linspace(0, TOKEN_SUPPLY_YEARS * 12, num=size)
+    f_t = decay.ExponentialDecay.decay_amts(
+        amt_start=100, decay_factor=0.2, times=times / 12)
+
+    # A new DecayResult per call, so the per-instance cache is always cold.
+    def run() -> np.ndarray:
+        result = decay.DecayResult(f_t=f_t, times=times, normal_f_t=f_t / f_t.sum())
+        return result.poly_coefs()
+    return run
+
+
+def _case_plot_token_distrib_area(_: Optional[int]) -> Callable[[], Any]:
+    plotter_v1 = _plotter().PlotterTokenomicsV1()
+    return plotter_v1.plot_token_distrib_area
+
+
+def _case_plot_final_token_supply(_: Optional[int]) -> Callable[[], Any]:
+    plotter_v1 = _plotter().PlotterTokenomicsV1()
+    return lambda: plotter_v1.plot_final_token_supply(pie_type="pie")
+
+
+def _case_save_figure(file_type: str) -> Callable[[Optional[int]], Callable[[], Any]]:
+    def setup(_: Optional[int]) -> Callable[[], Any]:
+        plotter = _plotter()
+        fig = plotter.PlotterTokenomicsV1().plot_token_distrib_area()
+        out_dir = tempfile.mkdtemp(prefix="tokenomics-bench-")
+
+        # 'save_figure' writes to "plots/" under the working directory.
+        def run() -> None:
+            cwd = os.getcwd()
+            os.chdir(out_dir)
+            try:
+                plotter.save_figure(
+                    fig=fig, plot_fname="token_release_area", file_type=file_type)
+            finally:
+                os.chdir(cwd)
+        weakref.finalize(run, shutil.rmtree, out_dir, ignore_errors=True)
+        return run
+    return setup
+
+
+def _case_dash_layout(_: Optional[int]) -> Callable[[], Any]:
+    import plotly.io
+    import main
+
+    plotter_v1 = _plotter().PlotterTokenomicsV1()
+    decay_result = decay.do_decay(decay_factor=0.2, time_years=8, degree=5)
+    figures = {
+        "token-release-area": plotter_v1.plot_token_distrib_area(),
+        "final-token-supply": plotter_v1.plot_final_token_supply(pie_type="pie"),
+        "decay-polynomial": decay_result.plot_polynomial(),
+    }
+    layout = main.app_layout(
+        groups=plotter_v1.groups, figures=figures, decay_result=decay_result,
+        decay_factor=0.2, time_years=8, degree=5)
+    # What Dash does to serve the layout.
+    return lambda: plotly.io.json.to_json_plotly(layout)
+
+
+def default_cases() -> List[BenchCase]:
+    return [
+        BenchCase("distrib_vec", _case_distrib_vec),
+        BenchCase("setup_token_distrib_area", _case_token_distrib_area),
+        BenchCase("decay_amts", _case_decay_amts),
+        BenchCase("poly_coefs", _case_poly_coefs),
+        BenchCase("plot_token_distrib_area", _case_plot_token_distrib_area,
+                  sized=False),
+        BenchCase("plot_final_token_supply", _case_plot_final_token_supply,
+                  sized=False),
+        *[BenchCase(f"save_figure.{file_type}", _case_save_figure(file_type),
+                    sized=False)
+          for file_type in ["html", "svg", "png"]],
+        BenchCase("dash_layout_json", _case_dash_layout, sized=False),
+    ]
+
+
+def measure(
+    case: BenchCase, size: Optional[int], repeat: int = 5,
+    max_seconds: float = 10.0,
+) -> Measurement:
+    """Times 'case' at 'size' up to 'repeat' times, stopping early once the
+    repeats have taken 'max_seconds', then measures its peak allocation.
+    Failures, e.g. an image export without kaleido, are recorded in 'error'.
+    """
+    try:
+        fn = case.setup(size)
+        fn()  # warm up caches and lazy imports
+        seconds: List[float] = []
+        while len(seconds) < repeat and sum(seconds) < max_seconds:
+            start = time.perf_counter()
+            fn()
+            seconds.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    except Exception as err:
+        message = (str(err).strip().splitlines() or [""])[0]
+        return Measurement(case=case.name, size=size, repeat=0, best_seconds=None,
+                           median_seconds=None, peak_bytes=None,
+                           error=f"{type(err).__name__}: {message}")
+    return Measurement(
+        case=case.name,
+        size=size,
+        repeat=len(seconds),
+        best_seconds=min(seconds),
+        median_seconds=statistics.median(seconds),
+        peak_bytes=peak,
+    )
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(
+    cases: Optional[List[BenchCase]] = None,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    repeat: int = 5,
+    history_path: Optional[str] = HISTORY_PATH,
+) -> List[Dict[str, Any]]:
+    """Measures every case, appends the records to 'history_path' (unless
+    None) and returns them."""
+    if cases is None:
+        cases = default_cases()
+    env = dict(
+        timestamp=datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        commit=_git_commit(),
+        python=platform.python_version(),
+        numpy=np.__version__,
+        machine=platform.machine(),
+        node=platform.node(),
+    )
+    records: List[Dict[str, Any]] = []
+    for case in cases:
+        for size in (sizes if case.sized else [None]):
+            result = measure(case, size=size, repeat=repeat)
+            records.append({**env, **dataclasses.asdict(result)})
+            _print_record(records[-1])
+
+    if history_path is not None:
+        os.makedirs(os.path.dirname(history_path) or ".", exist_ok=True)
+        with open(history_path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    return records
+
+
+def _print_record(record: Dict[str, Any]) -> None:
+    size = "-" if record["size"] is None else f"{record['size']:.0e}"
+    if record["error"] is not None:
+        print(f"{record['case']:<28} {size:>6}  error: {record['error']}")
+        return
+    print(f"{record['case']:<28} {size:>6}  "
+          f"best {record['best_seconds'] * 1e3:10.3f} ms  "
+          f"median {record['median_seconds'] * 1e3:10.3f} ms  "
+          f"peak {record['peak_bytes'] / 2**20:9.2f} MiB")
+
+
+def compare(
+    history_path: str = HISTORY_PATH, threshold: float = 1.25
+) -> List[str]:
+    """Compares the last run in the history with the latest previous run on
+    the same host, i.e. with the same machine, node and Python version.
+    Timings from different hosts are not comparable.
+
+    Returns:
+        List[str]: A line for each (case, size) whose best time grew by more
+            than the factor 'threshold', empty if there is no regression or
+            no previous run on the same host.
+    """
+    with open(history_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        return []
+
+    def host(record: Dict[str, Any]) -> Tuple[Any, ...]:
+        return tuple(record.get(k) for k in ("machine", "node", "python"))
+
+    runs: Dict[str, Tuple[Any, ...]] = {r["timestamp"]: host(r) for r in records}
+    last_ts = max(runs)
+    same_host = [ts for ts, h in runs.items() if ts < last_ts and h == runs[last_ts]]
+    if not same_host:
+        return []
+    prev, last = ({(r["case"], r["size"]): r for r in records if r["timestamp"] == ts}
+                  for ts in (max(same_host), last_ts))
+    regressions = []
+    for key, record in last.items():
+        before = prev.get(key)
+        if before is None or record["error"] or before["error"]:
+            continue
+        ratio = record["best_seconds"] / before["best_seconds"]
+        if ratio > threshold:
+            regressions.append(
+                f"{key[0]} (size {key[1]}): {before['best_seconds']:.4g}s "
+                f"@ {before['commit']} -> {record['best_seconds']:.4g}s "
+                f"@ {record['commit']} ({ratio:.2f}x)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="bench", description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES,
+                        help="Time grid sizes of the sized cases.")
+    parser.add_argument("--cases", nargs="+", default=None,
+                        help="Only run these cases.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--history", default=HISTORY_PATH)
+    parser.add_argument("--no-save", action="store_true",
+                        help="Do not append the results to the history.")
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare the last two runs instead of running.")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        regressions = compare(args.history, threshold=args.threshold)
+        print("\n".join(regressions) or "no regressions")
+        return 1 if regressions else 0
+
+    cases = default_cases()
+    if args.cases is not None:
+        unknown = set(args.cases) - {c.name for c in cases}
+        if unknown:
+            parser.error(f"unknown cases {sorted(unknown)}")
+        cases = [c for c in cases if c.name in args.cases]
+    run(
+        cases=cases,
+        sizes=[int(s) for s in args.sizes],
+        repeat=args.repeat,
+        history_path=None if args.no_save else args.history,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,227 @@
+"""Per-block emission schedule: tokens minted by the community emission and
+unlocked by vesting in every block over the token supply horizon.
+
+At a few seconds per block, the horizon has over 100 million blocks. The
+schedule is therefore computed in fixed-size chunks of blocks and appended to
+a binary file as each chunk is done, so peak memory depends on the chunk size
+only. The file has a small JSON header followed by a C-ordered array of
+records, one per block, that 'load_block_schedule' memory-maps so readers can
+slice it without copying.
+
+Block 'i' covers the times [i, i + 1) * block_seconds after genesis. An
+unlock cliff is credited to the block in which it falls, and supply released
+at genesis to block 0.
+
+File layout:
+    BLOCKS_MAGIC, a uint32 (little-endian) header length, the JSON header
+    padded with spaces to a multiple of 64 bytes, then the records.
+
+Classes:
+    BlockSchedule
+
+Functions:
+    block_dtype
+    iter_block_chunks
+    write_block_schedule
+    load_block_schedule
+"""
+import dataclasses
+import json
+import math
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pkg import allocation
+from pkg.allocation import AllocationGroup
+from pkg.const import SECONDS_PER_MONTH, SUPPLY_AT_MATURITY, TOKEN_SUPPLY_YEARS
+
+BLOCKS_MAGIC: bytes = b"NIBIBLKS"
+BLOCKS_VERSION: int = 1
+CHUNK_BLOCKS: int = 1 << 20
+"""CHUNK_BLOCKS: Blocks computed per chunk, which bounds the memory used."""
+
+_HEADER_ALIGN = 64
+
+
+@dataclasses.dataclass
+class BlockSchedule:
+    """A block schedule file opened as a read-only memory map.
+
+    Attributes:
+        records (np.memmap): One record per block, with fields "minted"
+            (community emission), "unlocked" (vesting unlocks) and, if the
+            file was written with 'by_group', one field per group.
+        block_seconds (float): Block time in seconds.
+        minted_groups (List[str]): Groups summed in "minted".
+        unlocked_groups (List[str]): Groups summed in "unlocked".
+    """
+
+    records: np.memmap
+    block_seconds: float
+    minted_groups: List[str]
+    unlocked_groups: List[str]
+
+    @property
+    def num_blocks(self) -> int:
+        return self.records.shape[0]
+
+    def block_at(self, month: float) -> int:
+        """Index of the block that contains time 'month'."""
+        return int(month * SECONDS_PER_MONTH // self.block_seconds)
+
+    def block_times(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Start time of blocks 'start' to 'stop' in months."""
+        stop = self.num_blocks if stop is None else stop
+        return np.arange(start, stop) * (self.block_seconds / SECONDS_PER_MONTH)
+
+
+def block_dtype(
+    group_names: Optional[List[str]] = None, dtype: type = np.float64
+) -> np.dtype:
+    """Record type of a block: "minted", "unlocked" and one field per name in
+    'group_names'."""
+    names = ["minted", "unlocked"] + list(group_names or [])
+    return np.dtype([(name, dtype) for name in names])
+
+
+def _split_groups(
+    groups: List[AllocationGroup],
+) -> Tuple[List[str], List[str]]:
+    minted = [g.name for g in groups if g.vi is None]
+    unlocked = [g.name for g in groups if g.vi is not None]
+    return minted, unlocked
+
+
+def iter_block_chunks(
+    groups: List[AllocationGroup],
+    block_seconds: float,
+    num_blocks: int,
+    total_supply: float = SUPPLY_AT_MATURITY,
+    by_group: bool = False,
+    dtype: type = np.float64,
+    chunk_blocks: int = CHUNK_BLOCKS,
+) -> Iterator[np.ndarray]:
+    """Yields the per-block records of 'num_blocks' blocks, 'chunk_blocks' at a
+    time. Each yielded array is reused for the next chunk, so copy it to keep
+    it.
+
+    Amounts in a block are differences of each cumulative schedule between
+    the block boundaries. Left limits are taken at both boundaries, so a
+    cliff at the start of a block counts in that block and not the previous
+    one. Supply already released at genesis is credited to block 0.
+    """
+    schedules = allocation.schedules(groups=groups, total_supply=total_supply)
+    minted_groups, _ = _split_groups(groups)
+    rec_dtype = block_dtype(list(schedules) if by_group else None, dtype)
+    months_per_block = block_seconds / SECONDS_PER_MONTH
+
+    records = np.empty(min(chunk_blocks, num_blocks), dtype=rec_dtype)
+    boundaries = np.empty(records.size + 1)
+    deltas = np.empty(records.size)
+    for start in range(0, num_blocks, chunk_blocks):
+        size = min(chunk_blocks, num_blocks - start)
+        chunk, bounds, delta = records[:size], boundaries[:size + 1], deltas[:size]
+        np.multiply(np.arange(start, start + size + 1), months_per_block, out=bounds)
+        chunk["minted"] = 0
+        chunk["unlocked"] = 0
+        for name, schedule in schedules.items():
+            cumulative = schedule.left_limit(bounds)
+            if start == 0:
+                cumulative[0] = 0
+            np.subtract(cumulative[1:], cumulative[:-1], out=delta)
+            chunk["minted" if name in minted_groups else "unlocked"] += delta
+            if by_group:
+                chunk[name] = delta
+        yield chunk
+
+
+def _header_bytes(header: Dict[str, Any]) -> bytes:
+    body = json.dumps(header).encode()
+    prefix = len(BLOCKS_MAGIC) + 4
+    padded = -(-(prefix + len(body)) // _HEADER_ALIGN) * _HEADER_ALIGN
+    body += b" " * (padded - prefix - len(body))
+    return BLOCKS_MAGIC + struct.pack("<I", len(body)) + body
+
+
+def write_block_schedule(
+    path: str,
+    groups: Optional[List[AllocationGroup]] = None,
+    block_seconds: float = 2.0,
+    horizon_months: float = TOKEN_SUPPLY_YEARS * 12,
+    total_supply: float = SUPPLY_AT_MATURITY,
+    by_group: bool = False,
+    dtype: type = np.float64,
+    chunk_blocks: int = CHUNK_BLOCKS,
+) -> int:
+    """Writes the per-block schedule of every block in the horizon to 'path'.
+
+    Args:
+        path (str): Output file.
+        groups (List[AllocationGroup], optional): Defaults to
+            'allocation.default_groups()'.
+        block_seconds (float, optional): Block time. Defaults to 2 seconds.
+        horizon_months (float, optional): Defaults to the token supply
+            horizon.
+        total_supply (float, optional): Supply at maturity.
+        by_group (bool, optional): Also store the amount of every group.
+            Defaults to False.
+        dtype (type, optional): np.float64 or np.float32.
+        chunk_blocks (int, optional): Blocks computed and written at a time.
+
+    Returns:
+        int: Number of blocks written.
+    """
+    if groups is None:
+        groups = allocation.default_groups()
+    num_blocks = math.ceil(horizon_months * SECONDS_PER_MONTH / block_seconds)
+    minted_groups, unlocked_groups = _split_groups(groups)
+    group_names = list(allocation.schedules(groups, total_supply)) if by_group else None
+    header = dict(
+        version=BLOCKS_VERSION,
+        descr=np.lib.format.dtype_to_descr(block_dtype(group_names, dtype)),
+        num_blocks=num_blocks,
+        block_seconds=block_seconds,
+        minted_groups=minted_groups,
+        unlocked_groups=unlocked_groups,
+    )
+    with open(path, "wb") as f:
+        f.write(_header_bytes(header))
+        for chunk in iter_block_chunks(
+            groups=groups,
+            block_seconds=block_seconds,
+            num_blocks=num_blocks,
+            total_supply=total_supply,
+            by_group=by_group,
+            dtype=dtype,
+            chunk_blocks=chunk_blocks,
+        ):
+            chunk.tofile(f)
+    return num_blocks
+
+
+def load_block_schedule(path: str, mode: str = "r") -> BlockSchedule:
+    """Memory-maps a file written by 'write_block_schedule'."""
+    with open(path, "rb") as f:
+        magic = f.read(len(BLOCKS_MAGIC))
+        if magic != BLOCKS_MAGIC:
+            raise ValueError(f"{path} is not a block schedule file")
+        (header_len,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_len))
+    if header["version"] != BLOCKS_VERSION:
+        raise ValueError(f"unsupported block schedule version {header['version']}")
+    descr = [tuple(field) for field in header["descr"]]
+    records = np.memmap(
+        path,
+        dtype=np.lib.format.descr_to_dtype(descr),
+        mode=mode,
+        offset=len(BLOCKS_MAGIC) + 4 + header_len,
+        shape=(header["num_blocks"],),
+    )
+    return BlockSchedule(
+        records=records,
+        block_seconds=header["block_seconds"],
+        minted_groups=header["minted_groups"],
+        unlocked_groups=header["unlocked_groups"],
+    )
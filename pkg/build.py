@@ -0,0 +1,366 @@
+"""Incremental, dependency-tracked build of the tokenomics plots.
+
+The pipeline is a DAG of stages: parameters -> schedules / decay -> figures ->
+exported files. Each stage is keyed by a content hash of its parameters, of
+the keys of the stages it depends on and of the code it runs: every module
+of this package and the module that defines the stage function. Editing the
+code therefore rebuilds everything, as cached results may be stale. A stage whose key matches the
+previous run, and whose output files still hash to what that run wrote, is
+skipped; its result is loaded from the cache only if a downstream stage needs
+it. Editing one group's vesting therefore only rebuilds the artifacts
+downstream of that group. Independent stages run in parallel.
+
+Usage:
+    python -m pkg.build [--force] [--max-workers N]
+
+Classes:
+    Stage
+    BuildRunner
+
+Functions:
+    code_fingerprint
+    tokenomics_stages
+"""
+import argparse
+import concurrent.futures
+import dataclasses
+import glob
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pkg import allocation
+from pkg import decay
+from pkg import profiling
+from pkg.const import SUPPLY_AT_MATURITY
+
+BUILD_CACHE_DIR: str = ".build-cache"
+
+
+@dataclasses.dataclass
+class Stage:
+    """A node of the build graph.
+
+    Attributes:
+        name (str): Unique stage name.
+        fn (Callable[[Dict[str, Any]], Any]): Computes the stage result from
+            the results of 'deps', keyed by stage name.
+        deps (List[str]): Names of the stages this one reads.
+        params (Any): JSON-serializable inputs of 'fn' that do not come from
+            other stages. Part of the cache key.
+        outputs (List[str]): Files written by 'fn'. Deleting or editing one
+            rebuilds the stage.
+    """
+
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: List[str] = dataclasses.field(default_factory=list)
+    params: Any = None
+    outputs: List[str] = dataclasses.field(default_factory=list)
+
+
+def _hash_files(paths: List[str]) -> Optional[str]:
+    digest = hashlib.sha256()
+    for path in paths:
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def code_fingerprint(paths: Optional[List[str]] = None) -> str:
+    """Hash of the contents of source files, by default every module of this
+    package."""
+    if paths is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        paths = glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+
+class BuildRunner:
+    """Runs a list of stages in dependency order, skipping stages whose
+    inputs are unchanged since the last run.
+
+    Args:
+        stages (List[Stage]): Stages of the graph, in any order.
+        cache_dir (str, optional): Where the manifest and stage results are
+            kept. Defaults to 'BUILD_CACHE_DIR'.
+        max_workers (int, optional): Number of stages to run concurrently.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        cache_dir: str = BUILD_CACHE_DIR,
+        max_workers: Optional[int] = None,
+    ):
+        self.stages: Dict[str, Stage] = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("stage names must be unique")
+        for stage in stages:
+            missing = [d for d in stage.deps if d not in self.stages]
+            if missing:
+                raise ValueError(f"stage {stage.name!r} has unknown deps {missing}")
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        self._keys: Dict[str, str] = {}
+        self._results: Dict[str, Any] = {}
+        self._package_code = code_fingerprint()
+        self._module_code: Dict[str, str] = {}
+
+    def _code(self, stage: Stage) -> str:
+        # Stage functions may live outside the package, e.g. in a script.
+        try:
+            path = inspect.getsourcefile(stage.fn)
+        except TypeError:
+            path = None
+        if path is None or not os.path.exists(path):
+            return self._package_code
+        if path not in self._module_code:
+            self._module_code[path] = code_fingerprint([path])
+        return f"{self._package_code}:{self._module_code[path]}"
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: Dict[str, Dict[str, Any]]) -> None:
+        # Written after every finished stage, and atomically, so a failed or
+        # interrupted run keeps the stages it did build.
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _result_path(self, name: str) -> str:
+        fname = hashlib.sha256(name.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{fname}.pkl")
+
+    def _key(self, stage: Stage) -> str:
+        payload = json.dumps(
+            {
+                "name": stage.name,
+                "params": stage.params,
+                "deps": {d: self._keys[d] for d in stage.deps},
+                "code": self._code(stage),
+            },
+            sort_keys=True,
+            default=repr,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _result(self, name: str) -> Any:
+        if name not in self._results:
+            with open(self._result_path(name), "rb") as f:
+                self._results[name] = pickle.load(f)
+        return self._results[name]
+
+    def _run_stage(self, stage: Stage) -> float:
+        start = time.perf_counter()
+        inputs = {d: self._result(d) for d in stage.deps}
+        result = stage.fn(inputs)
+        self._results[stage.name] = result
+        with open(self._result_path(stage.name), "wb") as f:
+            pickle.dump(result, f)
+        return time.perf_counter() - start
+
+    def run(self, force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Builds every stage that is out of date.
+
+        Args:
+            force (bool, optional): Rebuild everything. Defaults to False.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: For each stage, whether it was "built"
+                or "cached" and its run time in seconds.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        report: Dict[str, Dict[str, Any]] = {}
+        remaining = dict(self.stages)
+        running: Dict[concurrent.futures.Future, Stage] = {}
+
+        def is_ready(stage: Stage) -> bool:
+            return all(d in self._keys for d in stage.deps)
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers
+        ) as pool:
+            while remaining or running:
+                for name, stage in list(remaining.items()):
+                    if not is_ready(stage):
+                        continue
+                    del remaining[name]
+                    key = self._key(stage)
+                    entry = manifest.get(name, {})
+                    is_fresh = (
+                        not force
+                        and entry.get("key") == key
+                        and entry.get("outputs_hash") == _hash_files(stage.outputs)
+                        and os.path.exists(self._result_path(name))
+                    )
+                    if is_fresh:
+                        self._keys[name] = key
+                        report[name] = dict(status="cached", seconds=0.0)
+                        continue
+                    running[pool.submit(self._run_stage, stage)] = stage
+
+                if not running:
+                    if remaining:
+                        raise ValueError(
+                            f"dependency cycle among stages {list(remaining)}")
+                    break
+
+                done, _ = concurrent.futures.wait(
+                    running, return_when=concurrent.futures.FIRST_COMPLETED)
+                error: Optional[BaseException] = None
+                for future in done:
+                    stage = running.pop(future)
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        continue
+                    key = self._key(stage)
+                    self._keys[stage.name] = key
+                    manifest[stage.name] = dict(
+                        key=key, outputs_hash=_hash_files(stage.outputs))
+                    report[stage.name] = dict(
+                        status="built", seconds=future.result())
+                self._write_manifest(manifest)
+                if error is not None:
+                    # Stages still running finish before the pool shuts down,
+                    # but are not recorded.
+                    raise error
+
+        self._write_manifest(manifest)
+        return report
+
+
+def tokenomics_stages(
+    groups: Optional[List[allocation.AllocationGroup]] = None,
+    decay_params: Optional[Dict[str, Any]] = None,
+    exports: Optional[Dict[str, List[str]]] = None,
+) -> List[Stage]:
+    """Stages that build the plots in 'plots/' from the model parameters.
+
+    Args:
+        groups (List[AllocationGroup], optional): Defaults to
+            'allocation.default_groups()'.
+        decay_params (Dict[str, Any], optional): Keyword arguments of
+            'decay.do_decay'. Defaults to the values used by 'main.plotting'.
+        exports (Dict[str, List[str]], optional): File types to export for
+            each figure name.
+    """
+    if groups is None:
+        groups = allocation.default_groups()
+    if decay_params is None:
+        decay_params = dict(decay_factor=0.2, time_years=8, degree=5)
+    if exports is None:
+        exports = {
+            "token_release_area": ["png", "svg"],
+            "final_token_supply": ["svg"],
+        }
+
+    stages: List[Stage] = []
+    schedule_stages: List[str] = []
+    for group in groups:
+        params = dict(group=dataclasses.asdict(group),
+                      total_supply=SUPPLY_AT_MATURITY)
+        if group.vi is None:
+            params["phases"] = list(allocation.INCENTIVE_PHASES)
+        name = f"schedule:{group.name}"
+        schedule_stages.append(name)
+        stages.append(Stage(
+            name=name,
+            params=params,
+            fn=lambda _, group=group: allocation.schedules(
+                groups=[group], total_supply=SUPPLY_AT_MATURITY)[group.name],
+        ))
+
+    stages.append(Stage(
+        name="decay",
+        params=decay_params,
+        fn=lambda _: decay.do_decay(**decay_params),
+    ))
+
+    def plot_release_area(inputs: Dict[str, Any]) -> Any:
+        from pkg import plotter
+        # Phased groups are stacked first, as in 'allocation.schedules'.
+        ordered = ([g for g in groups if g.vi is None]
+                   + [g for g in groups if g.vi is not None])
+        schedules = {g.name: inputs[f"schedule:{g.name}"] for g in ordered}
+        return plotter.PlotterTokenomicsV1(groups=groups).plot_token_distrib_area(
+            schedules=schedules)
+
+    def plot_final_supply(_) -> Any:
+        from pkg import plotter
+        return plotter.PlotterTokenomicsV1(groups=groups).plot_final_token_supply(
+            pie_type="pie")
+
+    stages += [
+        Stage(name="figure:token_release_area", fn=plot_release_area,
+              deps=schedule_stages,
+              params=[g.color for g in groups]),
+        # The pie chart only reads names, colors and pcts.
+        Stage(name="figure:final_token_supply", fn=plot_final_supply,
+              params=[(g.name, g.pct, g.color) for g in groups]),
+        Stage(name="figure:decay_polynomial", deps=["decay"],
+              fn=lambda inputs: inputs["decay"].plot_polynomial()),
+    ]
+
+    def export(figure_stage: str, plot_fname: str, file_type: str):
+        def fn(inputs: Dict[str, Any]) -> str:
+            from pkg import plotter
+            plotter.save_figure(
+                fig=inputs[figure_stage], plot_fname=plot_fname,
+                file_type=file_type)
+            return os.path.join("plots", f"{plot_fname}.{file_type}")
+        return fn
+
+    for plot_fname, file_types in exports.items():
+        figure_stage = f"figure:{plot_fname}"
+        for file_type in file_types:
+            stages.append(Stage(
+                name=f"export:{plot_fname}.{file_type}",
+                fn=export(figure_stage, plot_fname, file_type),
+                deps=[figure_stage],
+                outputs=[os.path.join("plots", f"{plot_fname}.{file_type}")],
+            ))
+    return stages
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="build", description="Incrementally rebuild the plots.")
+    parser.add_argument("--force", action="store_true",
+                        help="Rebuild every stage.")
+    parser.add_argument("--max-workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    # Stages run in threads; import the plotting stack (and pandas, which
+    # plotly imports lazily) once here rather than from several at a time.
+    from pkg import plotter  # noqa: F401
+    profiling.enable_from_env(report_at_exit=True)
+
+    runner = BuildRunner(stages=tokenomics_stages(),
+                         max_workers=args.max_workers)
+    report = runner.run(force=args.force)
+    for name, info in report.items():
+        print(f"{info['status']:>6}  {info['seconds']:8.3f}s  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,261 @@
+"""Headless command line interface for the tokenomics model.
+
+Only NumPy and the model modules are imported, so start-up stays fast enough
+for CI and scripting jobs; nothing here loads Dash, Plotly or Pandas.
+
+Usage:
+    python -m pkg.cli coefs --decay-factor 0.2 --time-years 8 --degree 5
+    python -m pkg.cli supply-at 12 24 36 --by-group --spec specs/tokenomics-v2.toml
+    python -m pkg.cli schedule --format npz --output schedule.npz
+    python -m pkg.cli blocks --block-seconds 2 --output blocks.bin
+    python -m pkg.cli phases --decay-factor 0.2 --min-pct 2
+    python -m pkg.cli sensitivity 24 --top 10
+"""
+import argparse
+import dataclasses
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from pkg import allocation
+from pkg import blocks
+from pkg import decay
+from pkg import phases
+from pkg import profiling
+from pkg import sensitivity
+from pkg import spec
+from pkg import supply
+from pkg.vesting import PiecewiseLinear
+from pkg.const import SUPPLY_AT_MATURITY, TOKEN_SUPPLY_YEARS
+
+
+def load_schedules(spec_path: Optional[str]) -> Dict[str, PiecewiseLinear]:
+    """Schedules of a spec file, or of the default groups if None."""
+    if spec_path is not None:
+        return spec.load_spec(spec_path).schedules()
+    return allocation.schedules(
+        groups=allocation.default_groups(), total_supply=SUPPLY_AT_MATURITY)
+
+
+def load_decay_params(args: argparse.Namespace) -> Dict[str, Any]:
+    """'do_decay' arguments from the decay section of '--spec' (or its
+    defaults), overridden by any decay flag given on the command line."""
+    decay_spec = (spec.load_spec(args.spec).decay if args.spec is not None
+                  else spec.DecaySpec())
+    params = dataclasses.asdict(decay_spec)
+    for key in ["decay_factor", "time_years", "degree"]:
+        if getattr(args, key, None) is not None:
+            params[key] = getattr(args, key)
+    return params
+
+
+def cmd_coefs(args: argparse.Namespace) -> int:
+    decay_result = decay.do_decay(**load_decay_params(args))
+    coefs: List[float] = decay_result.poly_coefs().tolist()
+    if args.json:
+        print(json.dumps(coefs))
+    else:
+        print("\n".join(repr(c) for c in coefs))
+    return 0
+
+
+def cmd_supply_at(args: argparse.Namespace) -> int:
+    schedules = load_schedules(args.spec)
+    months = np.asarray(args.times, dtype=float)
+    if args.years:
+        months = months * 12
+    by_group = {name: s(months) for name, s in schedules.items()}
+    totals = np.sum(list(by_group.values()), axis=0)
+
+    header = ["month", "total"]
+    columns = [months, totals]
+    if args.by_group:
+        header += list(by_group)
+        columns += list(by_group.values())
+    print("\t".join(header))
+    for row in zip(*columns):
+        print("\t".join(repr(float(v)) for v in row))
+    return 0
+
+
+def cmd_schedule(args: argparse.Namespace) -> int:
+    schedules = load_schedules(args.spec)
+    matrix = supply.supply_matrix(
+        schedules=schedules,
+        num_time_points=args.num_time_points,
+        stop=TOKEN_SUPPLY_YEARS * 12,
+        dtype=np.dtype(args.dtype).type,
+    )
+    if args.format == "npz":
+        if args.output is None:
+            raise SystemExit("schedule: --output is required for --format npz")
+        np.savez(
+            args.output,
+            names=np.array(matrix.names),
+            times=matrix.times,
+            amounts=matrix.amounts,
+        )
+        return 0
+
+    out = sys.stdout if args.output is None else open(args.output, "w")
+    try:
+        out.write(",".join(["month", *matrix.names]) + "\n")
+        np.savetxt(
+            out,
+            np.column_stack([matrix.times, matrix.amounts.T]),
+            delimiter=",",
+            fmt="%.17g",
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def cmd_phases(args: argparse.Namespace) -> int:
+    decay_params = load_decay_params(args)
+    pcts: List[float] = phases.fit_decay_phases(
+        decay_factors=decay_params["decay_factor"],
+        time_years=decay_params["time_years"],
+        num_phases=args.num_phases,
+        min_pct=args.min_pct,
+    ).tolist()
+    if args.json:
+        print(json.dumps(pcts))
+    else:
+        print("\n".join(repr(p) for p in pcts))
+    return 0
+
+
+def cmd_blocks(args: argparse.Namespace) -> int:
+    num_blocks = blocks.write_block_schedule(
+        path=args.output,
+        block_seconds=args.block_seconds,
+        by_group=args.by_group,
+        dtype=np.dtype(args.dtype).type,
+        chunk_blocks=args.chunk_blocks,
+    )
+    print(f"{args.output}: {num_blocks} blocks")
+    return 0
+
+
+def cmd_sensitivity(args: argparse.Namespace) -> int:
+    kwargs = dict(rel_swing=args.rel_swing, month_swing=args.month_swing)
+    if args.spec is not None:
+        tokenomics_spec = spec.load_spec(args.spec)
+        kwargs.update(
+            groups=tokenomics_spec.allocation_groups(),
+            phases=tokenomics_spec.community.incentive_phases,
+            total_supply=tokenomics_spec.total_supply,
+            phase_months=tokenomics_spec.community.phase_months)
+    tornado = sensitivity.tornado(month=args.month, **kwargs)
+    records = tornado.records()[:args.top]
+    if args.json:
+        print(json.dumps(dict(month=tornado.month, base=tornado.base,
+                              params=records)))
+        return 0
+    header = ["param", "value", "low", "high", "low_supply", "high_supply", "swing"]
+    print("\t".join(header))
+    for record in records:
+        print("\t".join(str(record[k]) for k in header))
+    return 0
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="tokenomics", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coefs = subparsers.add_parser(
+        "coefs", help="Polynomial coefficients of the normalized decay.")
+    coefs.add_argument("--decay-factor", type=float, default=None,
+                       help="Defaults to the spec's, else 0.2.")
+    coefs.add_argument("--time-years", type=int, default=None,
+                       help=f"Defaults to the spec's, else {TOKEN_SUPPLY_YEARS}.")
+    coefs.add_argument("--degree", type=int, default=None,
+                       help="Defaults to the spec's, else 5.")
+    coefs.add_argument("--spec", default=None,
+                       help="TOML or YAML tokenomics spec whose decay section "
+                            "gives the defaults, including supply_at_maturity.")
+    coefs.add_argument("--json", action="store_true",
+                       help="Print the coefficients as a JSON list.")
+    coefs.set_defaults(func=cmd_coefs)
+
+    supply_at = subparsers.add_parser(
+        "supply-at", help="Released supply at the given times.")
+    supply_at.add_argument("times", type=float, nargs="+",
+                           help="Times in months (or years with --years).")
+    supply_at.add_argument("--years", action="store_true")
+    supply_at.add_argument("--by-group", action="store_true")
+    supply_at.add_argument("--spec", default=None,
+                           help="TOML or YAML tokenomics spec. Defaults to the "
+                                "built-in groups.")
+    supply_at.set_defaults(func=cmd_supply_at)
+
+    schedule = subparsers.add_parser(
+        "schedule", help="Sampled supply of every group over the horizon.")
+    schedule.add_argument("--num-time-points", type=int, default=int(1e5))
+    schedule.add_argument("--format", choices=["npz", "csv"], default="csv")
+    schedule.add_argument("--dtype", choices=["float64", "float32"],
+                          default="float64")
+    schedule.add_argument("--output", "-o", default=None,
+                          help="Output path. CSV defaults to stdout.")
+    schedule.add_argument("--spec", default=None,
+                          help="TOML or YAML tokenomics spec. Defaults to the "
+                               "built-in groups.")
+    schedule.set_defaults(func=cmd_schedule)
+
+    phases_parser = subparsers.add_parser(
+        "phases", help="Incentive phase percentages fitted to a decay curve.")
+    phases_parser.add_argument("--decay-factor", type=float, default=None,
+                               help="Defaults to the spec's, else 0.2.")
+    phases_parser.add_argument("--time-years", type=int, default=None,
+                               help="Defaults to the spec's, else "
+                                    f"{TOKEN_SUPPLY_YEARS}.")
+    phases_parser.add_argument("--spec", default=None,
+                               help="TOML or YAML tokenomics spec whose decay "
+                                    "section gives the defaults.")
+    phases_parser.add_argument("--num-phases", type=int,
+                               default=phases.NUM_PHASES)
+    phases_parser.add_argument("--min-pct", type=float, default=0.0)
+    phases_parser.add_argument("--json", action="store_true")
+    phases_parser.set_defaults(func=cmd_phases)
+
+    blocks_parser = subparsers.add_parser(
+        "blocks", help="Minted and unlocked tokens in every block.")
+    blocks_parser.add_argument("--block-seconds", type=float, default=2.0)
+    blocks_parser.add_argument("--by-group", action="store_true")
+    blocks_parser.add_argument("--dtype", choices=["float64", "float32"],
+                               default="float64")
+    blocks_parser.add_argument("--chunk-blocks", type=int,
+                               default=blocks.CHUNK_BLOCKS)
+    blocks_parser.add_argument("--output", "-o", required=True)
+    blocks_parser.set_defaults(func=cmd_blocks)
+
+    sensitivity_parser = subparsers.add_parser(
+        "sensitivity", help="Parameters ranked by their effect on supply.")
+    sensitivity_parser.add_argument("month", type=float,
+                                    help="Time of interest in months.")
+    sensitivity_parser.add_argument("--rel-swing", type=float, default=0.1)
+    sensitivity_parser.add_argument("--month-swing", type=float, default=3)
+    sensitivity_parser.add_argument("--top", type=int, default=None,
+                                    help="Print only the first N rows.")
+    sensitivity_parser.add_argument("--spec", default=None,
+                                    help="TOML or YAML tokenomics spec. "
+                                         "Defaults to the built-in groups.")
+    sensitivity_parser.add_argument("--json", action="store_true")
+    sensitivity_parser.set_defaults(func=cmd_sensitivity)
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    profiling.enable_from_env(report_at_exit=True)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,2 +1,3 @@
 TOKEN_SUPPLY_YEARS = 8
 SUPPLY_AT_MATURITY = 1.5e9
+SECONDS_PER_MONTH = 365.25 * 24 * 60 * 60 / 12
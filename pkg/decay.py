@@ -1,7 +1,18 @@
+import functools
+import io
+import pprint
+from dataclasses import dataclass, field
 from numbers import Real
-from typing import Union
+from typing import TYPE_CHECKING, Any, Dict, Optional, Sequence, Union
 import numpy as np
 
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+SUPPLY_AT_MATURITY = 800_000_000
+"""SUPPLY_AT_MATURITY: Supply that the normalized decay curves are scaled to.
+Distinct from 'pkg.const.SUPPLY_AT_MATURITY'."""
+
 
 class ExponentialDecay:
     """Utility class for computing values in an exponential decay."""
@@ -38,3 +49,274 @@ class ExponentialDecay:
         return cls.calc_amt_final(
             amt_start=amt_start, decay_factor=decay_factor, time=times
         )
+
+
+@dataclass
+class DecaySweep:
+    """Exponential decay curves for every pair of decay factor and horizon,
+    computed in one broadcast pass. Each horizon of 'time_years' is sampled
+    monthly, as in 'main.do_decay'; shorter horizons are zero-padded up to the
+    longest one and flagged in 'mask'.
+
+    Attributes:
+        decay_factors (np.ndarray): Shape (F,).
+        time_years (np.ndarray): Horizons in years, shape (H,).
+        times (np.ndarray): Sample times in years, shape (H, N).
+        mask (np.ndarray): True where a sample lies within its horizon,
+            shape (H, N).
+        f_t (np.ndarray): 'ExponentialDecay.decay_amts', shape (F, H, N).
+        normal_f_t (np.ndarray): 'f_t' normalized to sum to one over each
+            horizon, shape (F, H, N).
+        cumulative_supply (np.ndarray): Running total of
+            'normal_f_t * supply_at_maturity', shape (F, H, N).
+    """
+
+    decay_factors: np.ndarray
+    time_years: np.ndarray
+    times: np.ndarray
+    mask: np.ndarray
+    f_t: np.ndarray
+    normal_f_t: np.ndarray
+    cumulative_supply: np.ndarray
+    supply_at_maturity: float
+
+    def target_vectors(self) -> np.ndarray:
+        """Per-month supply of every curve, shape (F, H, N)."""
+        return self.normal_f_t * self.supply_at_maturity
+
+    def table(self) -> np.ndarray:
+        """Summarizes each (decay factor, horizon) pair in one row of a
+        structured array.
+
+        Columns:
+            decay_factor, time_years, num_months,
+            first_month_supply: Supply minted in the first month.
+            first_year_supply: Supply minted in the first 12 months.
+            last_month_supply: Supply minted in the final month.
+            half_supply_month: First month by which half of the supply at
+                maturity has been minted.
+        """
+        num_factors, num_horizons, _ = self.f_t.shape
+        num_months = self.mask.sum(axis=1)
+        last_idx = num_months - 1
+        horizon_idx = np.arange(num_horizons)
+        target = self.target_vectors()
+
+        half_reached = self.cumulative_supply >= 0.5 * self.supply_at_maturity
+        half_reached &= self.mask
+
+        rows = np.empty(
+            num_factors * num_horizons,
+            dtype=[
+                ("decay_factor", float),
+                ("time_years", int),
+                ("num_months", int),
+                ("first_month_supply", float),
+                ("first_year_supply", float),
+                ("last_month_supply", float),
+                ("half_supply_month", int),
+            ],
+        )
+        rows["decay_factor"] = np.repeat(self.decay_factors, num_horizons)
+        rows["time_years"] = np.tile(self.time_years, num_factors)
+        rows["num_months"] = np.tile(num_months, num_factors)
+        rows["first_month_supply"] = target[:, :, 0].ravel()
+        rows["first_year_supply"] = target[:, :, :12].sum(axis=-1).ravel()
+        rows["last_month_supply"] = target[:, horizon_idx, last_idx].ravel()
+        rows["half_supply_month"] = half_reached.argmax(axis=-1).ravel()
+        return rows
+
+
+def sweep(
+    decay_factors: Union[Sequence[Real], np.ndarray],
+    time_years: Union[Sequence[int], np.ndarray],
+    amt_start: Real = 100,
+    supply_at_maturity: Real = SUPPLY_AT_MATURITY,
+) -> DecaySweep:
+    """Evaluates 'ExponentialDecay.decay_amts' for every combination of decay
+    factor and horizon at once, sharing one padded time grid.
+
+    Args:
+        decay_factors (Sequence[Real]): Candidate decay factors.
+        time_years (Sequence[int]): Candidate horizons in whole years.
+        amt_start (Real, optional): Initial value of each decay. Defaults to
+            100, as in 'main.do_decay'.
+        supply_at_maturity (Real, optional): Total supply that the normalized
+            curves are scaled to. Defaults to 'SUPPLY_AT_MATURITY'.
+
+    Returns:
+        DecaySweep
+
+    Raises:
+        ValueError: If a horizon is not a whole number of years, or is less
+            than 1.
+    """
+    decay_factors = np.atleast_1d(np.asarray(decay_factors, dtype=float))
+    horizons = np.atleast_1d(np.asarray(time_years, dtype=float))
+    if not np.all(np.isfinite(horizons) & (horizons == np.round(horizons))):
+        raise ValueError(f"'time_years' must be whole years, got {time_years}")
+    time_years = horizons.astype(int)
+    if np.any(time_years < 1):
+        raise ValueError("'time_years' must be at least 1")
+
+    num_months = time_years * 12
+    month_idx = np.arange(num_months.max())
+    mask = month_idx[None, :] < num_months[:, None]
+    # Matches np.linspace(start=0, stop=time_years, num=time_years * 12)
+    step = time_years / (num_months - 1)
+    times = np.where(mask, month_idx[None, :] * step[:, None], 0.0)
+
+    f_t = ExponentialDecay.decay_amts(
+        amt_start=amt_start,
+        decay_factor=decay_factors[:, None, None],
+        times=times[None, :, :],
+    )
+    f_t = np.where(mask, f_t, 0.0)
+    normal_f_t = f_t / f_t.sum(axis=-1, keepdims=True)
+    cumulative_supply = np.cumsum(normal_f_t, axis=-1)
+    cumulative_supply *= supply_at_maturity
+
+    return DecaySweep(
+        decay_factors=decay_factors,
+        time_years=time_years,
+        times=times,
+        mask=mask,
+        f_t=f_t,
+        normal_f_t=normal_f_t,
+        cumulative_supply=cumulative_supply,
+        supply_at_maturity=supply_at_maturity,
+    )
+
+
+@dataclass(frozen=True)
+class DecayResult:
+    """Normalized exponential decay and its polynomial fit.
+
+    Instances are immutable: the arrays are stored as read-only copies, so the
+    derived values cached in '_cache' can never go stale.
+    """
+    f_t: np.ndarray
+    times: np.ndarray
+    normal_f_t: np.ndarray
+    degree: int = 5
+    supply_at_maturity: float = SUPPLY_AT_MATURITY
+    _cache: Dict[Any, Any] = field(
+        default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        for name in ["f_t", "times", "normal_f_t"]:
+            arr = np.array(getattr(self, name), dtype=float)
+            arr.setflags(write=False)
+            object.__setattr__(self, name, arr)
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def pprint(self):
+        """Pretty-print results"""
+        out_buffer = io.StringIO()
+
+        pprint.pprint(self.pprint_data(), stream=out_buffer)
+
+        pretty_str = out_buffer.getvalue()
+        out_buffer.close()
+        return pretty_str
+
+    def pprint_data(self) -> Dict[str, Any]:
+        """Pretty-print results as a dictionary. This format is easier to work
+        with inside Python."""
+        return {
+            "polynomial_coefs (decreasing order, last coef is intercept)":
+                [c for c in self.poly_coefs()],
+            "times": f"{self.times[:2]}...{self.times[-2:]}",
+            "normal_f(t) := f(t) / f(t).sum()": self.normal_f_t,
+        }
+
+    def target_vector(self) -> np.ndarray:
+        def compute():
+            target = self.normal_f_t * self.supply_at_maturity
+            target.setflags(write=False)
+            return target
+        return self._cached("target_vector", compute)
+
+    def poly_coefs(self, degree: Optional[int] = None) -> np.ndarray:
+        degree = self.degree if degree is None else degree
+
+        def compute():
+            coefs = np.polyfit(self.times, self.target_vector(), degree)
+            coefs.setflags(write=False)
+            return coefs
+        return self._cached(("poly_coefs", degree), compute)
+
+    def poly_fn(self, degree: Optional[int] = None) -> np.poly1d:
+        degree = self.degree if degree is None else degree
+        return self._cached(
+            ("poly_fn", degree), lambda: np.poly1d(self.poly_coefs(degree)))
+
+    def residuals(self, degree: Optional[int] = None) -> np.ndarray:
+        """Polynomial fit minus the target vector at each time."""
+        degree = self.degree if degree is None else degree
+
+        def compute():
+            resid = self.poly_fn(degree)(self.times) - self.target_vector()
+            resid.setflags(write=False)
+            return resid
+        return self._cached(("residuals", degree), compute)
+
+    def plot_polynomial(self) -> "go.Figure":
+        import plotly.graph_objects as go
+
+        x = self.times
+
+        y_target = self.target_vector()
+        y_poly = y_target + self.residuals()
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=x, y=y_poly, mode='lines', name='Polynomial Fit'))
+        fig.add_trace(go.Scatter(x=x, y=y_target,
+                      mode='lines', name='Target Vector'))
+
+        coef_display = [f"{c:.3e}" for c in self.poly_coefs()]
+        fig.update_layout(
+            title='Polynomial Fit and Target Vector',
+            xaxis_title='Time',
+            yaxis_title='Value',
+            font=dict(family="Inter"),
+            annotations=[
+                dict(xref="paper", yref="paper", x=0.9, y=0.9, showarrow=False,
+                     text=f"Polynomial Coefs:\n{coef_display}", align="right"),
+                dict(xref="paper", yref="paper", x=0.9, y=0.8, showarrow=False,
+                     text=f"Supply (Fit Line):{round(y_poly.sum()):.3e}", align="right"),
+                dict(xref="paper", yref="paper", x=0.9, y=0.7, showarrow=False,
+                     text=f"Supply (Target Line):{y_target.sum():.3e}", align="right"),
+            ],
+        )
+
+        # Show the figure
+        return fig
+
+
+@functools.lru_cache(maxsize=128)
+def do_decay(
+    decay_factor=0.5, time_years=8, degree=5,
+    supply_at_maturity=SUPPLY_AT_MATURITY,
+) -> DecayResult:
+    """Computes the exponential decay for 'decay_factor' over 'time_years',
+    sampled monthly, with the target scaled to 'supply_at_maturity'. Results
+    are memoized in a bounded LRU cache keyed by the arguments, so callers
+    must not mutate them.
+    """
+    time_years = np.linspace(start=0, stop=time_years,
+                             num=time_years * 12)  # in months
+    f_t = ExponentialDecay.decay_amts(
+        amt_start=100, decay_factor=decay_factor, times=time_years
+    )
+    norm_f_t = f_t / f_t.sum()
+
+    times = [t for t, _ in enumerate(norm_f_t)]
+    return DecayResult(
+        f_t=f_t, times=times, normal_f_t=norm_f_t, degree=degree,
+        supply_at_maturity=supply_at_maturity)
@@ -0,0 +1,140 @@
+"""Static HTML export with a shared plotly.js asset and compact data.
+
+'fig.write_html' embeds the whole plotly.js bundle (several MB) and the
+figure data as JSON number lists in every file. Pages written here instead:
+- load plotly.js from one versioned file next to them, written once per
+  output directory
+- may hold several figures
+- store their arrays as base64 typed arrays (see 'pkg.payload') when the
+  bundled plotly.js supports them
+- can have precompressed '.gz' and '.br' siblings, which a static server can
+  send as they are
+
+Brotli needs the 'brotli' package.
+
+Functions:
+    plotlyjs_fname
+    plotlyjs_supports_typed_arrays
+    write_plotlyjs
+    write_html_page
+"""
+import gzip
+import html
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import plotly.io as pio
+import plotly.offline
+
+from pkg import payload
+
+TYPED_ARRAYS_MIN_PLOTLYJS = (2, 28)
+"""TYPED_ARRAYS_MIN_PLOTLYJS: First plotly.js release that reads typed
+arrays."""
+
+_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+_PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="{plotlyjs}"></script>
+</head>
+<body>
+{divs}
+</body>
+</html>
+"""
+
+
+def plotlyjs_fname() -> str:
+    """File name of the shared asset, versioned so it can be cached forever."""
+    return f"plotly-{plotly.offline.get_plotlyjs_version()}.min.js"
+
+
+def plotlyjs_supports_typed_arrays() -> bool:
+    major, minor = plotly.offline.get_plotlyjs_version().split(".")[:2]
+    return (int(major), int(minor)) >= TYPED_ARRAYS_MIN_PLOTLYJS
+
+
+def _compress(path: str, encodings: Sequence[str]) -> List[str]:
+    with open(path, "rb") as f:
+        data = f.read()
+    written = []
+    for encoding in encodings:
+        if encoding == "gzip":
+            blob = gzip.compress(data, 9, mtime=0)
+        elif encoding == "br":
+            import brotli
+            blob = brotli.compress(data, quality=11)
+        else:
+            raise ValueError(f"Invalid encoding: {encoding}. Must be gzip or br")
+        out_path = path + _SUFFIXES[encoding]
+        with open(out_path, "wb") as f:
+            f.write(blob)
+        written.append(out_path)
+    return written
+
+
+def write_plotlyjs(directory: str, compress: Sequence[str] = ()) -> List[str]:
+    """Writes the shared plotly.js asset (and its compressed siblings) to
+    'directory' unless it is already there.
+
+    Returns:
+        List[str]: Paths written, empty if everything existed.
+    """
+    path = os.path.join(directory, plotlyjs_fname())
+    if not os.path.exists(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(plotly.offline.get_plotlyjs())
+        return [path, *_compress(path, compress)]
+    missing = [e for e in compress
+               if not os.path.exists(path + _SUFFIXES.get(e, ""))]
+    return _compress(path, missing)
+
+
+def write_html_page(
+    figures: Dict[str, Any],
+    path: str,
+    title: Optional[str] = None,
+    compact: Optional[bool] = None,
+    float32: bool = False,
+    compress: Sequence[str] = ("gzip",),
+) -> List[str]:
+    """Writes one HTML page showing every figure, plus the shared plotly.js
+    asset in the same directory.
+
+    Args:
+        figures (Dict[str, Any]): Figures keyed by the id of their div.
+        path (str): Output .html path.
+        title (str, optional): Page title. Defaults to the file name.
+        compact (bool, optional): Store arrays as typed arrays. Defaults to
+            whether the bundled plotly.js supports them.
+        float32 (bool, optional): With 'compact', store float arrays as
+            float32 where precision allows.
+        compress (Sequence[str], optional): Precompressed siblings to write
+            for the page and the asset: "gzip" and/or "br". Defaults to gzip.
+
+    Returns:
+        List[str]: Paths of every file written.
+    """
+    if compact is None:
+        compact = plotlyjs_supports_typed_arrays()
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    divs = []
+    for div_id, fig in figures.items():
+        fig_data = payload.compact_figure(fig, float32=float32) if compact else fig
+        divs.append(pio.to_html(
+            fig_data, include_plotlyjs=False, full_html=False,
+            div_id=div_id, validate=False))
+    if title is None:
+        title = os.path.splitext(os.path.basename(path))[0]
+    page = _PAGE_TEMPLATE.format(
+        title=html.escape(title), plotlyjs=plotlyjs_fname(), divs="\n".join(divs))
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+    return [path, *_compress(path, compress), *write_plotlyjs(directory, compress)]
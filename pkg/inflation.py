@@ -0,0 +1,161 @@
+"""Verifies polynomial inflation factors the way the chain's x/inflation module
+evaluates them: in 18-decimal fixed point ('sdk.Dec'), not float64.
+
+For epoch 'e', the module takes the period 'p = e // epochs_per_period' and
+computes
+
+    provision(p) = max(sum_i factor_i * p^(n - 1 - i), 0)
+    epoch_mint   = TruncateInt(Quo(provision(p), epochs_per_period) * base_units)
+
+Every 'sdk.Dec' is the integer 'value * 10^18', and its rounding ("chop
+precision and round") is round-half-to-even. Here the same integers are held
+in NumPy object arrays, so a whole (coefficient sets x periods) grid is
+evaluated with array operations on exact Python ints. The chain's result is
+constant within a period, so each period is computed once and weighted by
+its number of epochs.
+
+Classes:
+    VerificationReport
+
+Functions:
+    to_dec
+    verify
+    verify_decay
+"""
+import dataclasses
+import decimal
+from numbers import Real
+from typing import Sequence, Union
+import numpy as np
+from pkg import decay
+
+PRECISION: int = 10**18
+"""PRECISION: Scale of an 'sdk.Dec' (18 decimal places)."""
+
+
+def to_dec(value: Union[Real, str]) -> int:
+    """The 'sdk.Dec' integer for a float or decimal string. Floats are rounded
+    half-to-even to 18 decimals. Strings must have at most 18 decimals, as
+    the chain requires."""
+    if isinstance(value, str):
+        dec = decimal.Decimal(value)
+        if not dec.is_finite():
+            raise ValueError(f"{value!r} is not a finite number")
+        with decimal.localcontext() as ctx:
+            # Enough digits that neither the scaling nor the check rounds.
+            ctx.prec = len(dec.as_tuple().digits) + 18
+            scaled = dec.scaleb(18)
+            if scaled != scaled.to_integral_value():
+                raise ValueError(f"{value!r} has more than 18 decimal places")
+        return int(scaled)
+    # A float is exactly num / den with den a power of two.
+    num, den = float(value).as_integer_ratio()
+    quo, rem = divmod(num * PRECISION, den)
+    if 2 * rem > den or (2 * rem == den and quo % 2 == 1):
+        quo += 1
+    return quo
+
+
+def _round_half_even_div(num: np.ndarray, den: int) -> np.ndarray:
+    """num / den for object arrays of non-negative ints, rounded
+    half-to-even like 'chopPrecisionAndRound'."""
+    quo = num // den
+    twice_rem = 2 * (num - quo * den)
+    round_up = (twice_rem > den) | ((twice_rem == den) & (quo % 2 == 1))
+    return quo + round_up.astype(int).astype(object)
+
+
+@dataclasses.dataclass
+class VerificationReport:
+    """Chain emission of each coefficient set, compared to the target.
+
+    Attributes:
+        periods (np.ndarray): Period numbers, shape (P,).
+        minted (np.ndarray): Tokens the chain mints in each period, after all
+            fixed-point rounding and truncation, shape (S, P).
+        float_minted (np.ndarray): The same computed in float64 with
+            np.polyval, shape (S, P).
+        target (np.ndarray): Target tokens per period, shape (P,).
+        cumulative_drift (np.ndarray): cumsum(minted) - cumsum(target),
+            shape (S, P).
+        float_drift (np.ndarray): minted - float_minted, shape (S, P).
+    """
+
+    periods: np.ndarray
+    minted: np.ndarray
+    float_minted: np.ndarray
+    target: np.ndarray
+    cumulative_drift: np.ndarray
+    float_drift: np.ndarray
+
+    def max_abs_drift(self) -> np.ndarray:
+        """Largest absolute cumulative drift of each coefficient set."""
+        return np.abs(self.cumulative_drift).max(axis=-1)
+
+
+def verify(
+    coef_sets: Union[Sequence[Sequence[Union[Real, str]]], np.ndarray],
+    target: np.ndarray,
+    epochs_per_period: int = 30,
+    base_units: int = 10**6,
+) -> VerificationReport:
+    """Evaluates every coefficient set as the chain would for every epoch of
+    'len(target)' periods.
+
+    Args:
+        coef_sets: Polynomial factors in decreasing order (last is the
+            intercept), shape (S, n) or (n,). Floats or decimal strings.
+        target (np.ndarray): Intended tokens per period, e.g.
+            'DecayResult.target_vector()'.
+        epochs_per_period (int, optional): Defaults to 30.
+        base_units (int, optional): Base denomination units per token (unibi
+            per NIBI). Defaults to 10**6.
+
+    Returns:
+        VerificationReport
+    """
+    coef_list = [list(c) for c in np.atleast_2d(np.asarray(coef_sets, dtype=object))]
+    coefs = np.array([[to_dec(c) for c in row] for row in coef_list], dtype=object)
+    target = np.asarray(target, dtype=float)
+    periods = np.arange(target.size)
+    degree = coefs.shape[1] - 1
+
+    # p^k is an integer, so factor * p^k is exact in fixed point.
+    exponents = np.arange(degree, -1, -1)
+    powers = np.array(
+        [[int(p) ** int(k) for k in exponents] for p in periods], dtype=object)
+    provision = coefs.dot(powers.T)  # (S, P) sdk.Dec integers
+    provision = np.where(provision < 0, 0, provision)
+
+    # Quo(provision, epochs): truncated (provision * 10^18) / epochs, then
+    # chopPrecisionAndRound.
+    epoch_provision = _round_half_even_div(
+        (provision * PRECISION) // epochs_per_period, PRECISION)
+    epoch_mint = (epoch_provision * base_units) // PRECISION  # TruncateInt
+    minted = (epoch_mint * epochs_per_period).astype(float) / base_units
+
+    float_coefs = np.array(
+        [[float(c) for c in row] for row in coef_list], dtype=float)
+    float_powers = periods[:, None].astype(float) ** exponents
+    float_minted = np.maximum(float_coefs @ float_powers.T, 0)
+
+    cumulative_drift = np.cumsum(minted, axis=-1) - np.cumsum(target)
+    return VerificationReport(
+        periods=periods,
+        minted=minted,
+        float_minted=float_minted,
+        target=target,
+        cumulative_drift=cumulative_drift,
+        float_drift=minted - float_minted,
+    )
+
+
+def verify_decay(
+    decay_result: "decay.DecayResult", **kwargs
+) -> VerificationReport:
+    """'verify' for the polynomial fit of a 'DecayResult'."""
+    return verify(
+        coef_sets=[decay_result.poly_coefs()],
+        target=decay_result.target_vector(),
+        **kwargs,
+    )
@@ -0,0 +1,230 @@
+"""Derived supply metrics: inflation rate, unlocks and each group's share of
+circulating supply.
+
+Everything is computed from the cumulative supply of each group on a time
+grid, such as the output of 'PlotterTokenomicsV1.setup_token_distrib_area',
+or from the monthly amounts of the V0 'token_distribution.csv'. One pass over
+the (groups, times) matrix gives the circulating supply. Unlocks are its
+first difference, and a rolling total over any window is a difference of
+the cumulative supply at the two ends of the window. So no rolling window
+is ever summed sample by sample.
+
+Times are in months since genesis. The first sample's unlocks are its whole
+supply, i.e. the genesis supply.
+
+Classes:
+    SupplyMetrics
+
+Functions:
+    compute_metrics
+    from_supply_matrix
+    from_distrib_maps
+    from_token_distribution
+"""
+import dataclasses
+import numpy as np
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.supply import SupplyMatrix
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import plotly.graph_objects as go
+
+DAYS_PER_MONTH: float = 365.25 / 12
+
+ROLLING_WINDOW_DAYS: Tuple[int, ...] = (30, 90, 365)
+"""ROLLING_WINDOW_DAYS: Default windows of the rolling unlock totals."""
+
+
+@dataclasses.dataclass
+class SupplyMetrics:
+    """Derived metrics of the supply of every group on one time grid.
+
+    Attributes:
+        names (List[str]): Group names, one per row of 'amounts'.
+        times (np.ndarray): Time axis in months, shape (T,).
+        amounts (np.ndarray): Cumulative supply of each group, shape (G, T).
+        circulating (np.ndarray): Total supply at each time, shape (T,).
+        unlocks (np.ndarray): Supply released since the previous sample,
+            shape (T,).
+        inflation_rate (np.ndarray): Annualized growth of circulating supply
+            over each sample period, shape (T,). NaN at the first sample and
+            while circulating supply is zero. On a dense grid this is the
+            instantaneous rate, which spikes at cliffs.
+        rolling_unlocks (Dict[int, np.ndarray]): Supply released in the
+            trailing window of each length in days, shape (T,) each. Supply
+            at the start of a window is interpolated linearly between
+            samples.
+        shares (np.ndarray): Each group's fraction of circulating supply,
+            shape (G, T). Zero while circulating supply is zero.
+    """
+
+    names: List[str]
+    times: np.ndarray
+    amounts: np.ndarray
+    circulating: np.ndarray
+    unlocks: np.ndarray
+    inflation_rate: np.ndarray
+    rolling_unlocks: Dict[int, np.ndarray]
+    shares: np.ndarray
+
+    def _supply_before(self, times: np.ndarray) -> np.ndarray:
+        # Circulating supply is zero before genesis.
+        return np.interp(times, self.times, self.circulating, left=0.0)
+
+    def trailing_inflation(self, window_months: float = 12) -> np.ndarray:
+        """Growth of circulating supply over the trailing window, annualized.
+        NaN where the supply at the start of the window is zero."""
+        before = self._supply_before(self.times - window_months)
+        growth = np.divide(self.circulating - before, before,
+                           out=np.full_like(before, np.nan), where=before > 0)
+        return growth * (12 / window_months)
+
+    def period_unlocks(self, period_months: float = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Supply released in consecutive periods of 'period_months' starting
+        at 'times[0]'. The unlocks between two samples count toward the
+        period of the earlier one, as in 'supply.period_unlocks'.
+
+        Returns:
+            starts (np.ndarray): Start time of each period in months.
+            totals (np.ndarray): Supply released in each period.
+        """
+        earlier = np.concatenate([self.times[:1], self.times[:-1]])
+        idx = ((earlier - self.times[0]) // period_months).astype(np.intp)
+        totals = np.bincount(idx, weights=self.unlocks)
+        return self.times[0] + period_months * np.arange(totals.size), totals
+
+    def group_share(self, name: str) -> np.ndarray:
+        return self.shares[self.names.index(name)]
+
+    def plot_inflation_rate(self, window_months: float = 12) -> "go.Figure":
+        """Trailing annualized inflation rate of circulating supply."""
+        import plotly.graph_objects as go
+
+        fig = go.Figure(go.Scatter(
+            x=self.times / 12, y=100 * self.trailing_inflation(window_months),
+            mode="lines", name=f"trailing {window_months:g} months"))
+        fig.update_layout(
+            title="Annualized Inflation Rate of Circulating Supply",
+            xaxis_title="Time (years)", yaxis_title="Inflation rate (%)",
+            template="none", font=dict(family="Inter"))
+        return fig
+
+    def plot_unlocks(self, period_months: float = 1) -> "go.Figure":
+        """Supply released per period as bars, with the rolling totals."""
+        import plotly.graph_objects as go
+
+        starts, totals = self.period_unlocks(period_months)
+        fig = go.Figure(go.Bar(
+            x=starts / 12, y=totals, name=f"per {period_months:g} months",
+            opacity=0.5))
+        for days, rolling in self.rolling_unlocks.items():
+            fig.add_trace(go.Scatter(
+                x=self.times / 12, y=rolling, mode="lines",
+                name=f"rolling {days} days"))
+        fig.update_layout(
+            title="Token Unlocks", xaxis_title="Time (years)",
+            yaxis_title="NIBI amount", template="none",
+            font=dict(family="Inter"))
+        return fig
+
+    def plot_shares(self, colors: Optional[Dict[str, str]] = None) -> "go.Figure":
+        """Each group's share of circulating supply, stacked to 100%."""
+        import plotly.graph_objects as go
+
+        colors = colors or {}
+        fig = go.Figure()
+        for name, share in zip(self.names, self.shares):
+            fig.add_trace(go.Scatter(
+                x=self.times / 12, y=100 * share, name=name, mode="lines",
+                stackgroup="one", line=dict(width=0.5, color=colors.get(name))))
+        fig.update_layout(
+            title="Share of Circulating Supply", xaxis_title="Time (years)",
+            yaxis_title="Share (%)", yaxis_range=[0, 100], template="none",
+            font=dict(family="Inter"))
+        return fig
+
+
+def compute_metrics(
+    names: List[str],
+    times: np.ndarray,
+    amounts: np.ndarray,
+    window_days: Sequence[int] = ROLLING_WINDOW_DAYS,
+) -> SupplyMetrics:
+    """Derives every metric from the cumulative supply of each group.
+
+    Args:
+        names (List[str]): Group names.
+        times (np.ndarray): Increasing times in months, shape (T,).
+        amounts (np.ndarray): Cumulative supply, shape (len(names), T).
+        window_days (Sequence[int], optional): Rolling window lengths in
+            days. Defaults to 30, 90 and 365.
+
+    Returns:
+        SupplyMetrics
+    """
+    times = np.asarray(times, dtype=float)
+    amounts = np.asarray(amounts, dtype=float)
+    circulating = amounts.sum(axis=0)
+    unlocks = np.diff(circulating, prepend=0.0)
+
+    previous = np.concatenate([[0.0], circulating[:-1]])
+    periods = np.diff(times, prepend=np.nan)
+    inflation_rate = np.divide(
+        unlocks * 12, previous * periods,
+        out=np.full_like(circulating, np.nan), where=previous > 0)
+
+    metrics = SupplyMetrics(
+        names=list(names),
+        times=times,
+        amounts=amounts,
+        circulating=circulating,
+        unlocks=unlocks,
+        inflation_rate=inflation_rate,
+        rolling_unlocks={},
+        shares=np.divide(amounts, circulating, out=np.zeros_like(amounts),
+                         where=circulating > 0),
+    )
+    for days in window_days:
+        metrics.rolling_unlocks[days] = circulating - metrics._supply_before(
+            times - days / DAYS_PER_MONTH)
+    return metrics
+
+
+def from_supply_matrix(
+    matrix: SupplyMatrix, window_days: Sequence[int] = ROLLING_WINDOW_DAYS
+) -> SupplyMetrics:
+    return compute_metrics(
+        names=matrix.names, times=matrix.times, amounts=matrix.amounts,
+        window_days=window_days)
+
+
+def from_distrib_maps(
+    dist_maps: Sequence[Dict[str, np.ndarray]],
+    stop: float = TOKEN_SUPPLY_YEARS * 12,
+    window_days: Sequence[int] = ROLLING_WINDOW_DAYS,
+) -> SupplyMetrics:
+    """Metrics of the dicts returned by
+    'PlotterTokenomicsV1.setup_token_distrib_area', sampled evenly over
+    [0, stop] months."""
+    rows = {name: arr for dist_map in dist_maps for name, arr in dist_map.items()}
+    amounts = np.stack(list(rows.values()))
+    times = np.linspace(0, stop, amounts.shape[1])
+    return compute_metrics(
+        names=list(rows), times=times, amounts=amounts, window_days=window_days)
+
+
+def from_token_distribution(
+    token_distrib_df: "pd.DataFrame",
+    window_days: Sequence[int] = ROLLING_WINDOW_DAYS,
+) -> SupplyMetrics:
+    """Metrics of the V0 distribution, whose rows are the amounts released
+    to each group (column) in the month of the row's date index, e.g.
+    'PlotterTokenomicsV0.token_distrib_df'."""
+    months = token_distrib_df.index.values.astype("datetime64[M]").astype(np.int64)
+    amounts = np.cumsum(token_distrib_df.to_numpy(dtype=float).T, axis=1)
+    return compute_metrics(
+        names=[str(c) for c in token_distrib_df.columns],
+        times=(months - months[0]).astype(float),
+        amounts=amounts, window_days=window_days)
@@ -0,0 +1,273 @@
+"""Monte Carlo bands on circulating supply.
+
+Each scenario perturbs the deterministic model: vesting unlocks of some groups
+may be delayed, the community emission may run faster or slower, and the
+public sale may sell less than its allocation (unsold tokens are never
+released). Scenarios are simulated in chunks that fit a memory budget. Each
+chunk is reduced into per-time histograms and moments before the next one is
+drawn, so percentiles never require every path to be kept in memory. Chunks
+may run on several processes.
+
+Classes:
+    ScenarioDistribution
+    SimulationResult
+
+Functions:
+    simulate
+"""
+import concurrent.futures
+import dataclasses
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+from pkg import allocation
+from pkg import vesting
+from pkg.allocation import AllocationGroup, GroupType
+from pkg.const import SUPPLY_AT_MATURITY, TOKEN_SUPPLY_YEARS
+
+
+@dataclasses.dataclass(frozen=True)
+class ScenarioDistribution:
+    """How scenario parameters are drawn.
+
+    Attributes:
+        delayed_groups (Tuple[str, ...]): Groups whose unlock may be delayed.
+        delay_prob (float): Probability that an unlock is delayed.
+        max_delay_months (int): Delays are uniform on 1..max_delay_months.
+        pace_sigma (float): Log-normal sigma of the community emission pace.
+            A pace of 1.5 releases the community schedule 1.5x as fast.
+        participation_groups (Tuple[str, ...]): Groups whose sold fraction is
+            uncertain.
+        min_participation (float): Sold fraction is uniform on
+            [min_participation, 1].
+    """
+
+    delayed_groups: Tuple[str, ...] = (GroupType.TEAM,)
+    delay_prob: float = 0.2
+    max_delay_months: int = 6
+    pace_sigma: float = 0.1
+    participation_groups: Tuple[str, ...] = (GroupType.PUBLIC_SALE,)
+    min_participation: float = 0.6
+
+
+@dataclasses.dataclass
+class SimulationResult:
+    """Per-time statistics of the total circulating supply.
+
+    Attributes:
+        times (np.ndarray): Time axis in months, shape (T,).
+        quantiles (np.ndarray): Percentiles in [0, 100], shape (Q,).
+        percentiles (np.ndarray): Supply at each percentile, shape (Q, T).
+            Accurate to the histogram bin width ('bin_width').
+        mean, std, min, max (np.ndarray): Exact moments and extremes, shape
+            (T,).
+        num_scenarios (int)
+        bin_width (float)
+    """
+
+    times: np.ndarray
+    quantiles: np.ndarray
+    percentiles: np.ndarray
+    mean: np.ndarray
+    std: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    num_scenarios: int
+    bin_width: float
+
+    def band(self, q: float) -> np.ndarray:
+        """Supply at percentile 'q', which must be one of 'quantiles'."""
+        return self.percentiles[list(self.quantiles).index(q)]
+
+
+@dataclasses.dataclass
+class _ChunkStats:
+    counts: np.ndarray  # (T, num_bins)
+    total: np.ndarray
+    total_sq: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+
+
+def _simulate_chunk(
+    groups: List[AllocationGroup],
+    total_supply: float,
+    dist: ScenarioDistribution,
+    times: np.ndarray,
+    num_scenarios: int,
+    seed: np.random.SeedSequence,
+    upper: float,
+    num_bins: int,
+) -> _ChunkStats:
+    rng = np.random.default_rng(seed)
+    t = times[None, :]
+    paths = np.zeros((num_scenarios, times.size))
+    pace = rng.lognormal(mean=0.0, sigma=dist.pace_sigma, size=(num_scenarios, 1))
+
+    for group in groups:
+        group_supply = total_supply * group.pct
+        if group.vi is None:
+            schedule = allocation.community_schedule(
+                group_supply=group_supply,
+                phases=tuple(allocation.INCENTIVE_PHASES),
+            )
+            paths += schedule(t * pace)
+            continue
+
+        total = np.full((num_scenarios, 1), group_supply)
+        if group.name in dist.participation_groups:
+            total *= rng.uniform(dist.min_participation, 1.0, size=total.shape)
+        delay = np.zeros((num_scenarios, 1))
+        if group.name in dist.delayed_groups:
+            is_delayed = rng.random(size=delay.shape) < dist.delay_prob
+            months = rng.integers(1, dist.max_delay_months + 1, size=delay.shape)
+            delay = np.where(is_delayed, months, 0)
+        paths += vesting.vesting_supply(
+            t=t,
+            total=total,
+            cliff_pct=group.vi.cliff_pct,
+            vest_start_month=group.vi.vest_start_month + delay,
+            vest_end_month=group.vi.vest_end_month + delay,
+        )
+
+    bins = (paths * (num_bins / upper)).astype(np.int64)
+    np.clip(bins, 0, num_bins - 1, out=bins)
+    bins += num_bins * np.arange(times.size)
+    counts = np.bincount(bins.ravel(), minlength=times.size * num_bins)
+    return _ChunkStats(
+        counts=counts.reshape(times.size, num_bins),
+        total=paths.sum(axis=0),
+        total_sq=np.square(paths).sum(axis=0),
+        min=paths.min(axis=0),
+        max=paths.max(axis=0),
+    )
+
+
+def simulate(
+    num_scenarios: int = 10_000,
+    groups: Optional[List[AllocationGroup]] = None,
+    total_supply: float = SUPPLY_AT_MATURITY,
+    dist: ScenarioDistribution = ScenarioDistribution(),
+    times: Optional[np.ndarray] = None,
+    quantiles: Sequence[float] = (5, 25, 50, 75, 95),
+    seed: int = 0,
+    memory_budget: int = 256 * 2**20,
+    num_bins: int = 4096,
+    max_workers: int = 1,
+) -> SimulationResult:
+    """Simulates 'num_scenarios' supply paths and summarizes them per time.
+
+    Args:
+        num_scenarios (int, optional): Number of scenarios. Defaults to 1e4.
+        groups (List[AllocationGroup], optional): Defaults to
+            'allocation.default_groups()'.
+        total_supply (float, optional): Supply at maturity.
+        dist (ScenarioDistribution, optional): Parameter distributions.
+        times (np.ndarray, optional): Time axis in months. Defaults to
+            monthly points over the token supply horizon.
+        quantiles (Sequence[float], optional): Percentiles to report.
+        seed (int, optional): Results are reproducible for a given seed,
+            'memory_budget' and 'num_scenarios', whatever 'max_workers' is.
+        memory_budget (int, optional): Approximate bytes held per chunk,
+            histograms included. Defaults to 256 MiB.
+        num_bins (int, optional): Histogram bins per time, which set the
+            accuracy of the percentiles. Defaults to 4096.
+        max_workers (int, optional): Processes to spread chunks over.
+            Defaults to 1 (no subprocesses).
+
+    Returns:
+        SimulationResult
+
+    Raises:
+        ValueError: If 'num_scenarios' is less than 1, or 'memory_budget'
+            cannot hold the histograms and one scenario.
+    """
+    if num_scenarios < 1:
+        raise ValueError(
+            f"'num_scenarios' must be at least 1, got {num_scenarios}")
+    if groups is None:
+        groups = allocation.default_groups()
+    if times is None:
+        times = np.arange(TOKEN_SUPPLY_YEARS * 12 + 1, dtype=float)
+    times = np.asarray(times, dtype=float)
+
+    # A chunk's (T, num_bins) int64 counts are held next to the merged ones.
+    # Each scenario holds its path, the scaled path, its int64 bins and about
+    # two temporaries of the vesting and moment computations.
+    histogram_bytes = 2 * 8 * times.size * num_bins
+    bytes_per_scenario = 5 * 8 * times.size
+    if memory_budget < histogram_bytes + bytes_per_scenario:
+        raise ValueError(
+            f"'memory_budget' of {memory_budget} bytes cannot hold the "
+            f"histograms ({histogram_bytes} bytes) and one scenario "
+            f"({bytes_per_scenario} bytes); lower 'num_bins' or raise it")
+    chunk_size = min(
+        num_scenarios, (memory_budget - histogram_bytes) // bytes_per_scenario)
+    chunk_sizes = [chunk_size] * (num_scenarios // chunk_size)
+    if num_scenarios % chunk_size:
+        chunk_sizes.append(num_scenarios % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+
+    # No path can exceed the supply of every group at full participation.
+    upper = total_supply * sum(g.pct for g in groups)
+    args = [
+        (groups, total_supply, dist, times, n, s, upper, num_bins)
+        for n, s in zip(chunk_sizes, seeds)
+    ]
+    if max_workers > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers) as pool:
+            chunks = pool.map(_simulate_chunk, *zip(*args))
+            stats = _merge(chunks)
+    else:
+        stats = _merge(_simulate_chunk(*a) for a in args)
+
+    mean = stats.total / num_scenarios
+    var = np.maximum(stats.total_sq / num_scenarios - mean**2, 0)
+    bin_width = upper / num_bins
+    return SimulationResult(
+        times=times,
+        quantiles=np.asarray(quantiles, dtype=float),
+        percentiles=_histogram_percentiles(
+            stats.counts, quantiles, num_scenarios, bin_width),
+        mean=mean,
+        std=np.sqrt(var),
+        min=stats.min,
+        max=stats.max,
+        num_scenarios=num_scenarios,
+        bin_width=bin_width,
+    )
+
+
+def _merge(chunks) -> _ChunkStats:
+    merged: Optional[_ChunkStats] = None
+    for chunk in chunks:
+        if merged is None:
+            merged = chunk
+            continue
+        merged.counts += chunk.counts
+        merged.total += chunk.total
+        merged.total_sq += chunk.total_sq
+        np.minimum(merged.min, chunk.min, out=merged.min)
+        np.maximum(merged.max, chunk.max, out=merged.max)
+    assert merged is not None
+    return merged
+
+
+def _histogram_percentiles(
+    counts: np.ndarray,
+    quantiles: Sequence[float],
+    num_scenarios: int,
+    bin_width: float,
+) -> np.ndarray:
+    """Percentiles from per-time histograms, interpolating linearly inside the
+    bin that holds each rank."""
+    cum = np.cumsum(counts, axis=1)
+    out = np.empty((len(quantiles), counts.shape[0]))
+    rows = np.arange(counts.shape[0])
+    for i, q in enumerate(quantiles):
+        rank = q / 100 * num_scenarios
+        idx = np.argmax(cum >= rank, axis=1)
+        below = np.where(idx > 0, cum[rows, idx - 1], 0)
+        in_bin = np.maximum(counts[rows, idx], 1)
+        frac = np.clip((rank - below) / in_bin, 0, 1)
+        out[i] = (idx + frac) * bin_width
+    return out
@@ -0,0 +1,201 @@
+"""Compact figure payloads for the Dash app.
+
+By default a figure's arrays are serialized as JSON number lists, which are
+large and slow to encode and parse. 'compact_figure' converts a figure to a
+plain dict in which:
+- numeric arrays are base64 typed arrays, {"dtype": "f8", "bdata": ...}
+- float arrays become float32 when that loses no more than 'rtol'
+- an evenly spaced x axis becomes the 'x0' and 'dx' trace attributes
+- an x axis shared by several traces is encoded once and reused
+
+Typed arrays need plotly.js 2.28 or later in the browser. Older Dash
+releases bundle an older plotly.js, so the compact form is opt-in.
+
+Payloads are cached by key in 'PayloadCache', so a figure that is served
+again, e.g. on every page load or when a callback sees the same parameters,
+is not rebuilt or re-encoded.
+
+Classes:
+    PayloadCache
+
+Functions:
+    encode_array
+    decode_array
+    compact_figure
+    figure_payload
+"""
+import base64
+import collections
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+MIN_ENCODED_SIZE: int = 8
+"""MIN_ENCODED_SIZE: Shorter arrays stay JSON lists, where base64 saves
+nothing."""
+
+# Typed array dtypes understood by plotly.js.
+_PLOTLY_DTYPES = {"f8", "f4", "i4", "u4", "i2", "u2", "i1", "u1"}
+
+
+def encode_array(arr: np.ndarray) -> Dict[str, str]:
+    """A 1D numeric array as a plotly.js typed array spec. int64 values are
+    stored as int32 when they fit and as float64 otherwise, since plotly.js
+    has no 64-bit integers."""
+    arr = np.asarray(arr)
+    if arr.dtype.kind in "iu" and arr.dtype.itemsize == 8:
+        info = np.iinfo(np.int32)
+        fits = arr.size == 0 or (arr.min() >= info.min and arr.max() <= info.max)
+        arr = arr.astype(np.int32 if fits else np.float64)
+    elif arr.dtype.kind == "b":
+        arr = arr.astype(np.uint8)
+    arr = np.ascontiguousarray(arr, dtype=arr.dtype.newbyteorder("<"))
+    code = f"{arr.dtype.kind}{arr.dtype.itemsize}"
+    if code not in _PLOTLY_DTYPES:
+        raise TypeError(f"cannot encode dtype {arr.dtype} as a typed array")
+    return {"dtype": code, "bdata": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+
+def decode_array(spec: Dict[str, Any]) -> np.ndarray:
+    """Inverse of 'encode_array'."""
+    dtype = np.dtype(spec["dtype"]).newbyteorder("<")
+    return np.frombuffer(base64.b64decode(spec["bdata"]), dtype=dtype)
+
+
+def _as_numeric_array(value: Any) -> Optional[np.ndarray]:
+    if isinstance(value, dict) and "bdata" in value and "dtype" in value:
+        return decode_array(value)  # newer plotly.py encodes arrays itself
+    if isinstance(value, (list, tuple, np.ndarray)) and len(value) >= MIN_ENCODED_SIZE:
+        try:
+            arr = np.asarray(value)
+        except ValueError:
+            return None
+        if arr.ndim == 1 and arr.dtype.kind in "biuf":
+            return arr
+    return None
+
+
+def _maybe_float32(arr: np.ndarray, rtol: float) -> np.ndarray:
+    if arr.dtype != np.float64:
+        return arr
+    small = arr.astype(np.float32)
+    with np.errstate(invalid="ignore"):
+        err = np.abs(small - arr)
+        ok = np.all((err <= rtol * np.abs(arr)) | (arr == small))
+    return small if ok else arr
+
+
+def _uniform_step(x: np.ndarray, rtol: float) -> Optional[float]:
+    if x.size < 2 or x.dtype.kind not in "iuf":
+        return None
+    dx = (float(x[-1]) - float(x[0])) / (x.size - 1)
+    if dx == 0:
+        return None
+    rebuilt = x[0] + dx * np.arange(x.size)
+    tol = rtol * max(abs(float(x[0])), abs(float(x[-1])), abs(dx))
+    return dx if np.all(np.abs(rebuilt - x) <= tol) else None
+
+
+def compact_figure(
+    fig: Any, float32: bool = False, rtol: float = 1e-6
+) -> Dict[str, Any]:
+    """Figure as a plain dict with compact arrays, ready for
+    'dcc.Graph(figure=...)'.
+
+    Args:
+        fig (go.Figure or dict): Figure to convert.
+        float32 (bool, optional): Store float arrays as float32 where the
+            relative error stays within 'rtol'. Defaults to False.
+        rtol (float, optional): Tolerance for float32 and for detecting an
+            evenly spaced x axis.
+
+    Returns:
+        Dict[str, Any]
+    """
+    fig_dict = fig if isinstance(fig, dict) else fig.to_plotly_json()
+    encoded: Dict[bytes, Dict[str, str]] = {}
+
+    def encode(arr: np.ndarray) -> Dict[str, str]:
+        if float32:
+            arr = _maybe_float32(arr, rtol)
+        key = arr.dtype.str.encode() + arr.tobytes()
+        if key not in encoded:
+            encoded[key] = encode_array(arr)
+        return encoded[key]
+
+    def walk(value: Any) -> Any:
+        arr = _as_numeric_array(value)
+        if arr is not None:
+            return encode(arr)
+        if isinstance(value, dict):
+            return {k: walk(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [walk(v) for v in value]
+        return value
+
+    data = []
+    for trace in fig_dict.get("data", []):
+        trace = dict(trace)
+        x = _as_numeric_array(trace.get("x"))
+        if x is not None and "x0" not in trace and "dx" not in trace:
+            dx = _uniform_step(x, rtol)
+            if dx is not None:
+                del trace["x"]
+                trace["x0"], trace["dx"] = x[0].item(), dx
+        data.append(walk(trace))
+    out = {k: v for k, v in fig_dict.items() if k != "data"}
+    out["data"] = data
+    return out
+
+
+class PayloadCache:
+    """Bounded, thread-safe LRU cache of compact figure payloads.
+
+    Args:
+        maxsize (int, optional): Number of payloads kept. Defaults to 64.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items: "collections.OrderedDict[Hashable, Dict[str, Any]]" = (
+            collections.OrderedDict())
+        self._lock = threading.Lock()
+
+    def get_or_build(
+        self,
+        key: Hashable,
+        build: Callable[[], Any],
+        float32: bool = False,
+    ) -> Dict[str, Any]:
+        """The cached payload for 'key', or 'compact_figure(build())' stored
+        under it. 'key' must identify everything the figure depends on."""
+        cache_key = (key, float32)
+        with self._lock:
+            if cache_key in self._items:
+                self.hits += 1
+                self._items.move_to_end(cache_key)
+                return self._items[cache_key]
+            self.misses += 1
+        payload = compact_figure(build(), float32=float32)
+        with self._lock:
+            self._items[cache_key] = payload
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return payload
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+_DEFAULT_CACHE = PayloadCache()
+
+
+def figure_payload(
+    key: Hashable, build: Callable[[], Any], float32: bool = False
+) -> Dict[str, Any]:
+    """'PayloadCache.get_or_build' on the module's shared cache."""
+    return _DEFAULT_CACHE.get_or_build(key=key, build=build, float32=float32)
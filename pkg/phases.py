@@ -0,0 +1,148 @@
+"""Fits the community incentive phase percentages to a target emission curve.
+
+'allocation.INCENTIVE_PHASES' was tuned by hand. Here the phases are the
+least-squares fit to a target curve's share of emission in each phase,
+subject to three constraints:
+- they sum to 100
+- they never increase from one phase to the next
+- no phase is below a minimum percentage
+
+The solution is in closed form. Without the sum and minimum constraints it
+is the antitonic (non-increasing) regression of the targets, given by the
+min-max formula
+
+    x_i = min_{j <= i} max_{k >= i} mean(y_j, ..., y_k),
+
+which a prefix sum turns into array operations over all (j, k) pairs. The
+regression commutes with adding a constant and preserves the sum, so the
+constrained optimum is max(x + lam, min_pct), where 'lam' is the shift that
+restores the sum. It is found exactly, as in a simplex projection. Every
+step is batched over targets, so thousands of curves solve in milliseconds.
+
+Functions:
+    phase_targets
+    fit_phases
+    fit_decay_phases
+"""
+import numpy as np
+from typing import Optional, Union
+from pkg import allocation
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.decay import ExponentialDecay
+
+NUM_PHASES: int = len(allocation.INCENTIVE_PHASES)
+
+
+def phase_targets(
+    target: np.ndarray,
+    num_phases: int = NUM_PHASES,
+    times: Optional[np.ndarray] = None,
+    total: float = 100.0,
+) -> np.ndarray:
+    """Each phase's share of a target emission curve, scaled to sum to 'total'.
+
+    Args:
+        target (np.ndarray): Emission per sample, shape (T,) or (B, T), e.g.
+            'DecayResult.target_vector()' or monthly
+            'ExponentialDecay.decay_amts'.
+        num_phases (int, optional): Number of phases of equal length.
+        times (np.ndarray, optional): Time of each sample, shape (T,). Samples
+            are assigned to phases by time over [times[0], times[-1]].
+            Defaults to splitting the samples into 'num_phases' equal runs,
+            which requires T to be a multiple of 'num_phases'.
+        total (float, optional): Defaults to 100 (percent).
+
+    Returns:
+        np.ndarray: Shape (num_phases,) or (B, num_phases).
+    """
+    target = np.asarray(target, dtype=float)
+    batch = np.atleast_2d(target)
+    if times is None:
+        if batch.shape[1] % num_phases:
+            raise ValueError(
+                f"{batch.shape[1]} samples do not split into {num_phases} "
+                "phases; pass 'times'")
+        sums = batch.reshape(batch.shape[0], num_phases, -1).sum(axis=2)
+    else:
+        times = np.asarray(times, dtype=float)
+        span = times[-1] - times[0]
+        idx = np.minimum(
+            ((times - times[0]) / span * num_phases).astype(np.intp),
+            num_phases - 1)
+        sums = np.zeros((batch.shape[0], num_phases))
+        np.add.at(sums, (slice(None), idx), batch)
+    shares = sums * (total / sums.sum(axis=1, keepdims=True))
+    return shares if target.ndim > 1 else shares[0]
+
+
+def _antitonic(y: np.ndarray) -> np.ndarray:
+    """Least-squares non-increasing fit of each row of y, shape (B, P)."""
+    num = y.shape[1]
+    prefix = np.concatenate([np.zeros((y.shape[0], 1)), np.cumsum(y, axis=1)], axis=1)
+    j, k = np.triu_indices(num)
+    # means[b, j, k] = mean(y[b, j:k + 1]) for j <= k, -inf elsewhere
+    means = np.full((y.shape[0], num, num), -np.inf)
+    means[:, j, k] = (prefix[:, k + 1] - prefix[:, j]) / (k - j + 1)
+    # max over k >= i of means[b, j, k], then min over j <= i.
+    suffix_max = np.maximum.accumulate(means[:, :, ::-1], axis=2)[:, :, ::-1]
+    suffix_max[:, ~np.tri(num, dtype=bool).T] = np.inf
+    return suffix_max.min(axis=1)
+
+
+def fit_phases(
+    targets: np.ndarray,
+    min_pct: float = 0.0,
+    total: float = 100.0,
+) -> np.ndarray:
+    """Phase percentages closest in least squares to 'targets' that sum to
+    'total', are non-increasing and are at least 'min_pct' each.
+
+    Args:
+        targets (np.ndarray): Target percentage of each phase, shape (P,) or
+            (B, P), e.g. from 'phase_targets'.
+        min_pct (float, optional): Minimum percentage of any phase.
+        total (float, optional): Defaults to 100.
+
+    Returns:
+        np.ndarray: Phase percentages with the shape of 'targets'. A row can
+            be passed to 'allocation.community_schedule' as a tuple.
+    """
+    targets = np.asarray(targets, dtype=float)
+    y = np.atleast_2d(targets)
+    num = y.shape[1]
+    if min_pct * num > total:
+        raise ValueError(
+            f"min_pct={min_pct} is infeasible for {num} phases summing to {total}")
+
+    fit = _antitonic(y)
+    # Find lam with sum(max(fit + lam, min_pct)) == total. With the k largest
+    # entries above the minimum, lam = (total - min_pct * (P - k) - top_k) / k.
+    desc = -np.sort(-fit, axis=1)
+    k = np.arange(1, num + 1)
+    lams = (total - min_pct * (num - k) - np.cumsum(desc, axis=1)) / k
+    is_valid = desc + lams >= min_pct
+    # The valid k form a prefix, so the last valid one is the count of them.
+    lam = np.take_along_axis(lams, is_valid.sum(axis=1, keepdims=True) - 1, axis=1)
+    out = np.maximum(fit + lam, min_pct)
+    return out if targets.ndim > 1 else out[0]
+
+
+def fit_decay_phases(
+    decay_factors: Union[float, np.ndarray],
+    time_years: int = TOKEN_SUPPLY_YEARS,
+    num_phases: int = NUM_PHASES,
+    min_pct: float = 0.0,
+) -> np.ndarray:
+    """Phases fitted to the monthly exponential decay of each decay factor,
+    sampled as in 'decay.do_decay'.
+
+    Returns:
+        np.ndarray: Shape (num_phases,) for a scalar decay factor, otherwise
+            (len(decay_factors), num_phases).
+    """
+    factors = np.asarray(decay_factors, dtype=float)
+    times = np.linspace(start=0, stop=time_years, num=time_years * 12)
+    f_t = ExponentialDecay.decay_amts(
+        amt_start=100, decay_factor=factors.reshape(-1, 1), times=times)
+    out = fit_phases(phase_targets(f_t, num_phases=num_phases), min_pct=min_pct)
+    return out if factors.ndim else out[0]
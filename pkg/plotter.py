@@ -10,13 +10,34 @@ Classes:
 """
 # mypy: ignore_missing_imports = True
 import os
+import concurrent.futures
 import dataclasses
+import hashlib
+import time
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.decay import DecayResult, do_decay
+from pkg import allocation
+from pkg.allocation import (  # noqa: F401
+    AllocationGroup,
+    Colors,
+    GroupType,
+    INCENTIVE_PHASES,
+    PHASE_MONTHS,
+)
+from pkg import html_export
+from pkg import metrics
+from pkg import profiling
+from pkg import query
+from pkg import sensitivity
+from pkg.spec import DecaySpec, TokenomicsSpec, compile_schedules
+from pkg import supply
+from pkg import traces
 from pkg import vesting
 
 
@@ -36,50 +57,141 @@ FONT_FAMILY: str = FontFamily.Main
 """FONT_FAMILY: Constant for the font family to use while plotting."""
 
 
-@dataclasses.dataclass
-class AllocationGroup:
-    name: str
-    pct: float  # e.g. 20 for 20%
-    color: str
-    vi: Optional[vesting.VestingInfo] = None
-
-
-def save_figure(fig: go.Figure, plot_fname: str, file_type: str):
+def save_figure(
+    fig: go.Figure, plot_fname: str, file_type: str, shared_assets: bool = False
+):
     """Save the given figure to a file.
 
     Args:
       fig (go.Figure): Graph object for the plot.
       plot_fname: File name for the plot.
       file_type: Ex: "svg", "png", "html".
+      shared_assets: For "html", load plotly.js from one shared file in
+        "plots" and store the data as typed arrays, with a gzipped sibling
+        (see 'pkg.html_export'), instead of embedding the bundle.
     """
     if not os.path.exists(os.path.join("plots")):
         os.mkdir(os.path.join("plots"))
 
-    if file_type == "html":
-        fig.write_html(os.path.join("plots", f"{plot_fname}.{file_type}"))
-    else:
-        fig.write_image(os.path.join("plots", f"{plot_fname}.{file_type}"))
+    with profiling.span(f"save_figure.{file_type}"):
+        if file_type == "html" and shared_assets:
+            html_export.write_html_page(
+                {plot_fname: fig}, os.path.join("plots", f"{plot_fname}.html"))
+        elif file_type == "html":
+            fig.write_html(os.path.join("plots", f"{plot_fname}.{file_type}"))
+        else:
+            fig.write_image(os.path.join("plots", f"{plot_fname}.{file_type}"))
+
+
+@dataclasses.dataclass
+class ExportResult:
+    plot_fname: str
+    file_type: str
+    path: str
+    seconds: float  # wall time spent rendering inside the worker
+    pid: int  # worker process that rendered the job
+
+
+_EXPORT_POOL: Optional[concurrent.futures.ProcessPoolExecutor] = None
+_EXPORT_POOL_SIZE: int = 0
+
+
+def _export_job(fig_json: str, plot_fname: str, file_type: str) -> ExportResult:
+    start = time.perf_counter()
+    fig = pio.from_json(fig_json, skip_invalid=True)
+    save_figure(fig=fig, plot_fname=plot_fname, file_type=file_type)
+    return ExportResult(
+        plot_fname=plot_fname,
+        file_type=file_type,
+        path=os.path.join("plots", f"{plot_fname}.{file_type}"),
+        seconds=time.perf_counter() - start,
+        pid=os.getpid(),
+    )
+
+
+def export_pool(max_workers: Optional[int] = None
+                ) -> concurrent.futures.ProcessPoolExecutor:
+    """Returns the shared pool of long-lived renderer workers, creating it on
+    first use. Asking for a different 'max_workers' replaces the pool.
+
+    Kaleido keeps its renderer process alive for the lifetime of the Python
+    process, so only the first image job in each worker pays its start-up.
+    """
+    global _EXPORT_POOL, _EXPORT_POOL_SIZE
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if _EXPORT_POOL is not None and _EXPORT_POOL_SIZE != max_workers:
+        shutdown_export_pool()
+    if _EXPORT_POOL is None:
+        _EXPORT_POOL = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers)
+        _EXPORT_POOL_SIZE = max_workers
+    return _EXPORT_POOL
+
+
+def shutdown_export_pool():
+    global _EXPORT_POOL
+    if _EXPORT_POOL is not None:
+        _EXPORT_POOL.shutdown()
+        _EXPORT_POOL = None
+
+
+def save_figures(
+    jobs: List[Tuple[go.Figure, str, str]],
+    max_workers: Optional[int] = None,
+) -> List[ExportResult]:
+    """Saves many figures in parallel on the pool of renderer workers.
+
+    Each figure is serialized once, no matter how many formats it is saved in.
+
+    Args:
+        jobs (List[Tuple[go.Figure, str, str]]): (figure, plot_fname,
+            file_type) triples, with the same meaning as in 'save_figure'.
+        max_workers (int, optional): Number of renderer workers. Defaults to
+            the number of CPUs.
+
+    Returns:
+        List[ExportResult]: Timing of each job, in the order of 'jobs'.
+    """
+    if not os.path.exists(os.path.join("plots")):
+        os.mkdir(os.path.join("plots"))
 
+    fig_json: Dict[int, str] = {}
+    with profiling.span("save_figures.serialize"):
+        for fig, _, _ in jobs:
+            if id(fig) not in fig_json:
+                fig_json[id(fig)] = fig.to_json()
+
+    with profiling.span("save_figures.export"):
+        pool = export_pool(max_workers=max_workers)
+        futures = [
+            pool.submit(_export_job, fig_json[id(fig)], plot_fname, file_type)
+            for fig, plot_fname, file_type in jobs
+        ]
+        return [future.result() for future in futures]
 
-class Colors:
-    PURPLE = "rgb(100, 80, 194)"
-    SKY_BLUE = "rgb(96, 156, 212)"
-    PINK = "rgb(200, 124, 226)"
-    GOLD = "rgb(213, 175, 96)"
-    GREEN = "rgb(130, 207, 179)"
 
-    LOGO_PINK = "rgb(255, 212, 229)"
-    LOGO_TURQUOISE = "rgb(83, 77, 224)"
-    LOGO_YELLOW = "rgb(255, 243, 204)"
-    LOGO_BLACK = "rgb(7, 0, 19)"
+def save_figures_page(
+    figures: Dict[str, go.Figure],
+    page_fname: str,
+    compress: Tuple[str, ...] = ("gzip",),
+) -> List[str]:
+    """Saves several figures to one HTML page in "plots" that loads the
+    shared plotly.js asset. See 'html_export.write_html_page'.
 
+    Args:
+        figures (Dict[str, go.Figure]): Figures keyed by plot name.
+        page_fname (str): File name of the page, without extension.
+        compress (Tuple[str, ...], optional): Precompressed siblings to
+            write, "gzip" and/or "br".
 
-class GroupType:
-    TEAM = "Core Contributors"
-    POST_SEED = "Investors (Post-Seed)"
-    SEED = "Investors (Seed)"
-    COMMUNITY = "Community"
-    PUBLIC_SALE = "Public Sale"  # CoinList
+    Returns:
+        List[str]: Paths written.
+    """
+    with profiling.span("save_figures_page"):
+        return html_export.write_html_page(
+            figures, os.path.join("plots", f"{page_fname}.html"),
+            compress=compress)
 
 
 class PlotterTokenomicsV1:
@@ -87,67 +199,163 @@ class PlotterTokenomicsV1:
     Tokenomics v1 (2022-05-29)
 
     Methods:
+        from_spec
+        decay_spec
+        decay_result
+        phased_groups
+        community_schedule
+        schedules
+        supply_index
+        setup_supply_matrix
+        iter_supply_windows
         setup_token_distrib_area
         plot_token_distrib_area
         plot_final_token_supply
+        sensitivity_tornado
+        plot_sensitivity_tornado
+        supply_metrics
     """
 
     token_amount_df: pd.DataFrame
     token_cumulative_distrib_df: pd.DataFrame
 
     total_supply = 1.5e9
+    spec: Optional[TokenomicsSpec] = None
     category_pct_map: Dict[str, float]
     category_color_map: Dict[str, str]
     category_order: List[str]
     category_color_map: Dict[str, str]
 
-    def __init__(self):
-        self.groups = [
-            # AllocationGroup("Team", 0.17, "rgb(195, 155, 213)"),
-            # AllocationGroup("Treasury", 0.04, "rgb(83, 77, 224)"),
-            AllocationGroup(
-                GroupType.PUBLIC_SALE,
-                0.08,
-                Colors.GREEN,
-                vi=vesting.VestingInfo(
-                    cliff_pct=0.1, vest_start_month=0, vest_end_month=12
-                ),
-            ),
-            AllocationGroup(
-                GroupType.POST_SEED,
-                0.081328,
-                Colors.GOLD,
-                vi=vesting.VestingInfo(
-                    cliff_pct=0, vest_start_month=0, vest_end_month=36
-                ),
-            ),
-            AllocationGroup(
-                GroupType.SEED,
-                0.085172,
-                Colors.SKY_BLUE,
-                vi=vesting.VestingInfo(
-                    cliff_pct=0.25, vest_start_month=9, vest_end_month=45
-                ),
-            ),
-            AllocationGroup(
-                GroupType.TEAM,
-                0.1535,
-                Colors.PINK,
-                vi=vesting.VestingInfo(
-                    cliff_pct=0.1, vest_start_month=9, vest_end_month=24
-                ),
-            ),
-            AllocationGroup(GroupType.COMMUNITY, 0.60, Colors.PURPLE),
-        ]
+    def __init__(self, groups: Optional[List[AllocationGroup]] = None):
+        """
+        Args:
+            groups (List[AllocationGroup], optional): Allocation groups to
+                plot. Defaults to the Tokenomics v2 allocation.
+        """
+        if groups is None:
+            groups = self.default_groups()
+        self.groups = groups
         self.category_color_map = {g.name: g.color for g in self.groups}
         self.category_pct_map = {g.name: g.pct for g in self.groups}
         self.category_order = None
 
+    @staticmethod
+    def default_groups() -> List[AllocationGroup]:
+        return allocation.default_groups()
+
+    @classmethod
+    def from_spec(cls, tokenomics_spec: TokenomicsSpec) -> "PlotterTokenomicsV1":
+        """Plotter for the groups, total supply and phases of a spec."""
+        plotter = cls(groups=tokenomics_spec.allocation_groups())
+        plotter.total_supply = tokenomics_spec.total_supply
+        plotter.spec = tokenomics_spec
+        return plotter
+
+    def decay_spec(self) -> DecaySpec:
+        """Decay parameters of the spec, or the defaults without one."""
+        return self.spec.decay if self.spec is not None else DecaySpec()
+
+    def decay_result(self) -> DecayResult:
+        """'do_decay' with the parameters of 'decay_spec'."""
+        return do_decay(**dataclasses.asdict(self.decay_spec()))
+
+    def phased_groups(self) -> List[str]:
+        """Names of the groups without 'VestingInfo', which are released
+        through the incentive phases (the community)."""
+        return [g.name for g in self.groups if g.vi is None]
+
+    def community_schedule(self) -> vesting.PiecewiseLinear:
+        """Cumulative distribution of the 'phased_groups' as a function of
+        time in months. Each of the 'INCENTIVE_PHASES' releases its share
+        linearly over 'PHASE_MONTHS'.
+        """
+        names = self.phased_groups()
+        if not names:
+            raise ValueError("no group is released through the phases")
+        if self.spec is not None:
+            # Phased groups share the phases, and so their breakpoint times.
+            schedules = self.schedules()
+            return vesting.PiecewiseLinear(
+                times=schedules[names[0]].times,
+                values=np.sum([schedules[n].values for n in names], axis=0))
+        group_supply = self.total_supply * sum(
+            self.category_pct_map[n] for n in names)
+        return allocation.community_schedule(
+            group_supply=group_supply, phases=tuple(INCENTIVE_PHASES))
+
+    def schedules(self) -> Dict[str, vesting.PiecewiseLinear]:
+        """Cumulative supply curve of every group, keyed by group name.
+        Groups without 'VestingInfo' (the community) come first, matching the
+        stacking order of the release schedule plot.
+        """
+        if self.spec is not None:
+            return compile_schedules(self.spec)
+        return allocation.schedules(
+            groups=self.groups, total_supply=self.total_supply)
+
+    def supply_index(self) -> query.SupplyIndex:
+        """Query index over 'schedules', built once per plotter. Answers
+        point, inverse and event queries without sampling a dense grid."""
+        if getattr(self, "_supply_index", None) is None:
+            self._supply_index = query.SupplyIndex(
+                schedules=self.schedules(),
+                phased_groups=self.phased_groups())
+        return self._supply_index
+
+    def setup_supply_matrix(
+        self,
+        num_time_points: int = int(1e5),
+        dtype: type = np.float64,
+        out: Optional[np.ndarray] = None,
+    ) -> supply.SupplyMatrix:
+        """Samples every group's schedule into one (groups x time) matrix.
+
+        Args:
+            num_time_points (int, optional): Number of data points on the time
+                axis. Defaults to int(1e5).
+            dtype (type, optional): np.float64 or np.float32.
+            out (np.ndarray, optional): Buffer to reuse across calls.
+
+        Returns:
+            supply.SupplyMatrix
+        """
+        with profiling.span("setup_supply_matrix") as sp:
+            matrix = supply.supply_matrix(
+                schedules=self.schedules(),
+                num_time_points=num_time_points,
+                stop=TOKEN_SUPPLY_YEARS * 12,
+                dtype=dtype,
+                out=out,
+            )
+            sp.arrays(amounts=matrix.amounts)
+        return matrix
+
+    def iter_supply_windows(
+        self,
+        num_time_points: int,
+        stop: float = TOKEN_SUPPLY_YEARS * 12,
+        window_points: int = 1 << 16,
+        dtype: type = np.float64,
+    ) -> Iterator[supply.SupplyWindow]:
+        """Streams the samples of 'setup_supply_matrix' a window at a time,
+        over a horizon of 'stop' months that may exceed the token supply
+        horizon. See 'supply.iter_supply_windows'.
+        """
+        return supply.iter_supply_windows(
+            schedules=self.schedules(),
+            num_time_points=num_time_points,
+            stop=stop,
+            window_points=window_points,
+            dtype=dtype,
+        )
+
+    @profiling.traced("setup_token_distrib_area")
     def setup_token_distrib_area(
         self,
         num_time_points: int = int(1e5),
     ) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
-        """_summary_
+        """Samples the supply of each group over the full token supply
+        horizon. The arrays are views into a single 'setup_supply_matrix'.
 
         Args:
             num_time_points (int, optional): Number of data points on the time
@@ -155,95 +363,57 @@ class PlotterTokenomicsV1:
                 cost of performance. Defaults to int(1e5).
 
         Returns:
-            dist_map_by_category (Dict[str, np.ndarray])
-            dist_map_full_duration (Dict[str, np.ndarray]):
+            dist_map_by_category (Dict[str, np.ndarray]): Groups with vesting.
+            dist_map_full_duration (Dict[str, np.ndarray]): The
+                'phased_groups' (the community), released over the full
+                duration.
         """
-        dist_map_by_category: Dict[str, np.ndarray] = {}
-
-        for group in self.groups:
-            if group.vi is None:
-                continue
-            dist_map_by_category[group.name] = group.vi.distrib_vec(
-                group_pct=self.category_pct_map[group.name]
-            )
+        rows = self.setup_supply_matrix(num_time_points=num_time_points).as_dict()
+        dist_map_full_duration: Dict[str, np.ndarray] = {
+            name: rows.pop(name) for name in self.phased_groups()
+        }
+        dist_map_by_category: Dict[str, np.ndarray] = rows
 
         assert all(
             [arr.shape[0] == num_time_points
              for arr in dist_map_by_category.values()]
         )
-
-        """
-        >>> yp
-        array([17.35483871, 12.09677419,  10.87096774,  8.06451613,  8.06451613,
-                7.25806452,  6.4516129 ,  5.64516129,  4.83870968,  4.03225806,
-                3.22580645,  2.41935484,  2.82258065,  2.41935484,  2.41935484,
-                2.01612903])
-        >>> yp.sum()
-        100.0
-        """
-        # Juno opts for 30-17-9-6 over 12 phases
-        #
-        incentive_phases: List[float] = (
-            [17.35483871, 12.09677419, 10.87096774, 8.06451613]
-            + [8.06451613, 7.25806452, 6.4516129, 5.64516129]
-            + [4.83870968, 4.03225806, 3.22580645, 2.82258065]
-            + [2.41935484, 2.41935484, 2.41935484, 2.01612903]
-        )
-        """incentive_phases (List[float]): A breakdown of percentages of the
-        community distribution.
-        - Q: Why are there 16 phases?
-          Each incentive phase lasts 6 months. Since the community distribution
-          comes out across a time span of 8 years, there are 16 phases.
-        """
-        assert abs(np.array(incentive_phases).sum() - 100) <= 0.01
-        community_allocation: List[np.ndarray] = []
-        start_supply_pct = 0
-        group = "Community"
-        for idx, phase_pct in enumerate(np.array(incentive_phases).cumsum()):
-            phase_pct: float
-            stop_supply_pct = (
-                (phase_pct / 100) * self.total_supply *
-                self.category_pct_map[group]
-            )
-            community_allocation.append(
-                np.linspace(
-                    start=start_supply_pct,
-                    stop=stop_supply_pct,
-                    num=int(num_time_points / TOKEN_SUPPLY_YEARS / 2),
-                )
-            )
-            start_supply_pct = stop_supply_pct
-        dist_map_full_duration: Dict[str: np.ndarray] = {
-            group: np.concatenate(community_allocation)
-        }
-        assert all(
-            [arr.shape[0] == num_time_points for arr in dist_map_full_duration.values()]
-        )
-
         return dist_map_by_category, dist_map_full_duration
 
+    @profiling.traced("plot_token_distrib_area")
     def plot_token_distrib_area(
         self,
         save: bool = False,
         save_types: List[str] = ["svg"],
+        schedules: Optional[Dict[str, vesting.PiecewiseLinear]] = None,
+        supply_matrix: Optional[supply.SupplyMatrix] = None,
     ) -> go.Figure:
-        """_summary_
+        """Stacked area chart of the supply released to each group over time.
+        Traces hold only the schedule breakpoints (see 'traces.stacked_traces'),
+        which render identically to densely sampled curves at any zoom level.
 
         Args:
             save (bool, optional): _description_. Defaults to False.
             save_types (List[str], optional): _description_. Defaults to ["svg"].
+            schedules (Dict[str, PiecewiseLinear], optional): Precomputed
+                'schedules()', in stacking order. Defaults to computing them.
+            supply_matrix (supply.SupplyMatrix, optional): Already sampled
+                supply, in stacking order, e.g. from a shared store. Plotted
+                as is instead of 'schedules'.
 
         Returns:
             go.Figure: _description_
         """
-        dist_map_by_category: Dict[str, np.ndarray]
-        dist_map_full_duration: Dict[str, np.ndarray]
-        dist_map_by_category, dist_map_full_duration = self.setup_token_distrib_area()
-
-        num_time_points: int = [
-            v for v in dist_map_by_category.values()][0].size
-        time_axis = np.linspace(start=0, stop=8, num=num_time_points)
-        x = time_axis
+        with profiling.span("traces") as sp:
+            if supply_matrix is not None:
+                x_months, ys = supply_matrix.times, supply_matrix.as_dict()
+            else:
+                if schedules is None:
+                    schedules = self.schedules()
+                x_months, ys = traces.stacked_traces(
+                    schedules, start=0, stop=TOKEN_SUPPLY_YEARS * 12)
+            x = x_months / 12  # in years
+            sp.arrays(x=x)
         layout = go.Layout(
             {
                 "showlegend": True,
@@ -254,30 +424,12 @@ class PlotterTokenomicsV1:
         fig = go.Figure(layout=layout)
 
         self.category_order = []
-        for idx, category in enumerate(dist_map_full_duration):
+        for category, y in ys.items():
             self.category_order.append(category)
-
-            assert idx <= len(self.category_color_map)
             fig.add_trace(
                 go.Scatter(
                     x=x,
-                    y=dist_map_full_duration[category],
-                    hoverinfo="x+y",
-                    mode="lines",
-                    line=dict(
-                        width=0.5, color=self.category_color_map[category]),
-                    stackgroup="one",
-                    name=category.upper(),
-                ),
-            )
-
-        for new_idx, category in enumerate(dist_map_by_category):
-            self.category_order.append(category)
-            new_idx = idx + new_idx + 1
-            fig.add_trace(
-                go.Scatter(
-                    x=x,
-                    y=dist_map_by_category[category],
+                    y=y,
                     hoverinfo="x+y",
                     mode="lines",
                     line=dict(
@@ -308,6 +460,7 @@ class PlotterTokenomicsV1:
                             file_type=save_type)
         return fig
 
+    @profiling.traced("plot_final_token_supply")
     def plot_final_token_supply(
         self, save: bool = False, save_types: List[str] = ["svg"], pie_type: str = "pie"
     ) -> go.Figure:
@@ -383,6 +536,134 @@ class PlotterTokenomicsV1:
                             file_type=save_type)
         return fig
 
+    def supply_metrics(self, num_time_points: int = int(1e4)) -> metrics.SupplyMetrics:
+        """Inflation rate, unlocks and group shares of the supply sampled by
+        'setup_token_distrib_area'."""
+        with profiling.span("supply_metrics"):
+            return metrics.from_distrib_maps(
+                self.setup_token_distrib_area(num_time_points=num_time_points),
+                stop=TOKEN_SUPPLY_YEARS * 12)
+
+    def sensitivity_tornado(self, month: float, **kwargs) -> sensitivity.Tornado:
+        """Parameters ranked by how much they move supply at 'month'. Keyword
+        arguments go to 'sensitivity.tornado'."""
+        phases, phase_months = tuple(INCENTIVE_PHASES), PHASE_MONTHS
+        if self.spec is not None:
+            phases = self.spec.community.incentive_phases
+            phase_months = self.spec.community.phase_months
+        return sensitivity.tornado(
+            month=month, groups=self.groups, phases=phases,
+            total_supply=self.total_supply, phase_months=phase_months,
+            **kwargs)
+
+    @profiling.traced()
+    def plot_sensitivity_tornado(
+        self,
+        month: float = 24,
+        top_n: int = 12,
+        save: bool = False,
+        save_types: List[str] = ["svg"],
+        tornado: Optional[sensitivity.Tornado] = None,
+    ) -> go.Figure:
+        """Tornado chart of the 'top_n' parameters that move circulating
+        supply at 'month' the most.
+
+        Args:
+            month (float, optional): Time of interest in months. Defaults to 24.
+            top_n (int, optional): Number of bars. Defaults to 12.
+            save (bool, optional): Defaults to False.
+            save_types (List[str], optional): Defaults to ["svg"].
+            tornado (sensitivity.Tornado, optional): Precomputed
+                'sensitivity_tornado', whose month replaces 'month'.
+
+        Returns:
+            go.Figure
+        """
+        if tornado is None:
+            tornado = self.sensitivity_tornado(month=month)
+        month = tornado.month
+        labels = [p.label for p in tornado.params[:top_n]][::-1]
+        low = tornado.low_supply[:top_n][::-1] - tornado.base
+        high = tornado.high_supply[:top_n][::-1] - tornado.base
+        fig = go.Figure([
+            go.Bar(y=labels, x=low, base=tornado.base, orientation="h",
+                   name="low", marker_color=Colors.SKY_BLUE),
+            go.Bar(y=labels, x=high, base=tornado.base, orientation="h",
+                   name="high", marker_color=Colors.PINK),
+        ])
+        fig.update_layout(
+            barmode="overlay",
+            title=f"Sensitivity of Circulating Supply at Month {month:g}",
+            xaxis_title="Circulating supply",
+            template="none",
+            font_family=FONT_FAMILY,
+            margin=dict(l=260),
+        )
+
+        plot_fname: str = "sensitivity_tornado"
+        if save:
+            for save_type in save_types:
+                save_figure(fig=fig, plot_fname=plot_fname,
+                            file_type=save_type)
+        return fig
+
+
+TOKEN_DISTRIB_CACHE_DIR: str = os.path.join("data", ".cache")
+"""TOKEN_DISTRIB_CACHE_DIR: Where parsed copies of the V0 CSV are cached."""
+
+
+def parse_date_series(dates: pd.Series) -> pd.Series:
+    """Vectorized 'PlotterTokenomicsV0.parse_date_column' for a whole column of
+    date tuples like "(2022, 3, 1, 0, 0, 0)"."""
+    parts = dates.str.extract(r"\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)")
+    parts.columns = ["year", "month", "day"]
+    return pd.to_datetime(parts.astype(int)).astype("datetime64[ns]")
+
+
+def load_token_distribution(
+    csv_path: str = os.path.join("data", "token_distribution.csv"),
+    cache_dir: Optional[str] = TOKEN_DISTRIB_CACHE_DIR,
+) -> pd.DataFrame:
+    """Reads the V0 token distribution CSV with its "month" column parsed.
+
+    The parsed frame is cached as a structured .npy file named after the
+    SHA-256 of the CSV, so later loads of the same CSV skip parsing and
+    memory-map the numbers straight from disk. Editing the CSV changes its
+    hash and thus invalidates the cache.
+
+    Args:
+        csv_path (str, optional): Path of the CSV.
+        cache_dir (str, optional): Cache directory. Pass None to disable the
+            cache. Defaults to 'TOKEN_DISTRIB_CACHE_DIR'.
+    """
+    cache_path: Optional[str] = None
+    if cache_dir is not None:
+        with open(csv_path, "rb") as f:
+            csv_hash = hashlib.sha256(f.read()).hexdigest()
+        fname = f"{os.path.basename(csv_path)}.{csv_hash[:16]}.npy"
+        cache_path = os.path.join(cache_dir, fname)
+        if os.path.exists(cache_path):
+            records = np.load(cache_path, mmap_mode="r")
+            return pd.DataFrame(
+                {name: records[name] for name in records.dtype.names})
+
+    df: pd.DataFrame = pd.read_csv(csv_path)
+    df.month = parse_date_series(df.month)
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        records = np.empty(
+            len(df),
+            dtype=[(col, df[col].to_numpy().dtype) for col in df.columns],
+        )
+        for col in df.columns:
+            records[col] = df[col].to_numpy()
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, records)
+        os.replace(tmp_path, cache_path)
+    return df
+
 
 class PlotterTokenomicsV0:
     """Plotter from Feb., 2022"""
@@ -391,9 +672,7 @@ class PlotterTokenomicsV0:
     token_distrib_df: pd.DataFrame
 
     def __init__(self) -> None:
-        df: pd.DataFrame = pd.read_csv(
-            os.path.join("data", "token_distribution.csv"))
-        df.month = df.month.apply(self.parse_date_column)
+        df: pd.DataFrame = load_token_distribution()
 
         token_supply_columns: List[str] = [
             "month", "total_supply", "pct_max_supply"]
@@ -416,6 +695,11 @@ class PlotterTokenomicsV0:
         self.token_distrib_df = df[token_distrib_columns].copy(deep=True)
         self.token_distrib_df = self.token_distrib_df.set_index("month")
 
+    def supply_metrics(self) -> metrics.SupplyMetrics:
+        """Inflation rate, unlocks and group shares of the monthly
+        distribution in 'token_distrib_df'."""
+        return metrics.from_token_distribution(self.token_distrib_df)
+
     @staticmethod
     def parse_date_column(date: str) -> pd.Timestamp:
         date = date.lstrip("(").rstrip(")")
@@ -484,10 +768,9 @@ class PlotterTokenomicsV0:
             STAKING_AIRDROP="Community",
             IDO="Early Backers",
         )
-        plot_df["Category"] = plot_df.Group.apply(lambda g: category_map[g])
-        plot_df["Category_sum"] = plot_df.Category.apply(
-            lambda c: plot_df.Tokens[plot_df.Category == c].sum()
-        )
+        plot_df["Category"] = plot_df.Group.map(category_map)
+        plot_df["Category_sum"] = plot_df.groupby(
+            "Category").Tokens.transform("sum")
 
         if not pie_type in ["pie", "sunburst"]:
             raise ValueError(
@@ -529,6 +812,7 @@ class PlotterTokenomicsV0:
                             file_type=save_type)
         return fig
 
+    @profiling.traced("plot_final_token_supply")
     def plot_final_token_supply(
         self, save: bool = False, save_types: List[str] = ["svg"], pie_type: str = "pie"
     ) -> go.Figure:
@@ -557,13 +841,9 @@ class PlotterTokenomicsV0:
             STAKING_AIRDROP="Community",
             IDO="Early Backers",
         )
-        final_distrib_df["Category"] = final_distrib_df.Group.apply(
-            lambda g: category_map[g]
-        )
-        final_distrib_df["Category_sum"] = final_distrib_df.Category.apply(
-            lambda c: final_distrib_df.Tokens[final_distrib_df.Category == c].sum(
-            )
-        )
+        final_distrib_df["Category"] = final_distrib_df.Group.map(category_map)
+        final_distrib_df["Category_sum"] = final_distrib_df.groupby(
+            "Category").Tokens.transform("sum")
 
         if not pie_type in ["pie", "sunburst"]:
             raise ValueError(
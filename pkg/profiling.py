@@ -0,0 +1,327 @@
+"""Named timing spans around the stages of the plotting pipeline.
+
+Spans nest, and each records its wall time, the peak memory allocated while it
+ran (via 'tracemalloc') and the sizes of any arrays attached to it. Profiling
+is off by default. When it is off, 'span' returns a shared no-op context, so
+instrumented code pays one flag check per span.
+
+Enable it by calling 'enable' (e.g. from a '--profile' flag), or with the
+'TOKENOMICS_PROFILE' environment variable, which the entry points (main.py,
+the 'tokenomics' CLI, 'pkg.build' and wsgi.py) read through
+'enable_from_env'. Importing this module never enables it.
+
+    TOKENOMICS_PROFILE=1            spans and the summary table
+    TOKENOMICS_PROFILE=out.prof     also a cProfile dump to out.prof, and the
+                                    spans as folded stacks in out.prof.folded,
+                                    which flamegraph.pl and speedscope read.
+
+Usage:
+    with profiling.span("supply_matrix") as sp:
+        matrix = ...
+        sp.arrays(amounts=matrix)
+
+Classes:
+    Span
+    SpanStats
+
+Functions:
+    enable
+    enable_from_env
+    disable
+    is_enabled
+    reset
+    span
+    traced
+    summary
+    format_summary
+    write_folded
+    report
+"""
+import atexit
+import cProfile
+import contextlib
+import dataclasses
+import functools
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import numpy as np
+
+PROFILE_ENV: str = "TOKENOMICS_PROFILE"
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_ENABLED: bool = False
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_RECORDS: List["Span"] = []
+_PROFILER: Optional[cProfile.Profile] = None
+_DUMP_PATH: Optional[str] = None
+_TRACE_ALLOCATIONS: bool = True
+
+
+@dataclasses.dataclass
+class Span:
+    """One timed run of a named stage.
+
+    Attributes:
+        path (Tuple[str, ...]): Names of the enclosing spans and this one.
+        seconds (float): Wall time.
+        child_seconds (float): Wall time spent in nested spans.
+        peak_bytes (Optional[int]): Peak traced memory above what was
+            allocated when the span started. None if allocations are not
+            traced.
+        sizes (Dict[str, Tuple[Tuple[int, ...], int]]): Shape and bytes of
+            each array attached with 'arrays'.
+    """
+
+    path: Tuple[str, ...]
+    seconds: float = 0.0
+    child_seconds: float = 0.0
+    peak_bytes: Optional[int] = None
+    sizes: Dict[str, Tuple[Tuple[int, ...], int]] = dataclasses.field(
+        default_factory=dict)
+    _start: float = dataclasses.field(default=0.0, repr=False)
+    _mem_start: int = dataclasses.field(default=0, repr=False)
+    _mem_peak: int = dataclasses.field(default=0, repr=False)
+
+    def arrays(self, **arrays: Any) -> None:
+        """Records the shape and size in bytes of each array."""
+        for name, arr in arrays.items():
+            arr = np.asarray(arr)
+            self.sizes[name] = (arr.shape, arr.nbytes)
+
+
+class _NullSpan:
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+    def arrays(self, **arrays: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def _stack() -> List[Span]:
+    if not hasattr(_LOCAL, "stack"):
+        _LOCAL.stack = []
+    return _LOCAL.stack
+
+
+def _traced_memory() -> Tuple[int, int]:
+    if not (_TRACE_ALLOCATIONS and tracemalloc.is_tracing()):
+        return 0, 0
+    return tracemalloc.get_traced_memory()
+
+
+def _reset_peak() -> None:
+    # tracemalloc.reset_peak is new in Python 3.9. Without it, peaks are
+    # measured from the start of tracing.
+    if _TRACE_ALLOCATIONS and hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+
+
+@contextlib.contextmanager
+def _span(name: str):
+    stack = _stack()
+    parent = stack[-1] if stack else None
+    current, peak = _traced_memory()
+    if parent is not None:
+        # Resetting the peak below loses the parent's peak so far.
+        parent._mem_peak = max(parent._mem_peak, peak)
+    _reset_peak()
+    sp = Span(path=(parent.path if parent else ()) + (name,),
+              _mem_start=current, _mem_peak=current)
+    stack.append(sp)
+    sp._start = time.perf_counter()
+    try:
+        yield sp
+    finally:
+        sp.seconds = time.perf_counter() - sp._start
+        stack.pop()
+        _, peak = _traced_memory()
+        sp._mem_peak = max(sp._mem_peak, peak)
+        if _TRACE_ALLOCATIONS:
+            sp.peak_bytes = sp._mem_peak - sp._mem_start
+        if parent is not None:
+            parent.child_seconds += sp.seconds
+            parent._mem_peak = max(parent._mem_peak, sp._mem_peak)
+        with _LOCK:
+            _RECORDS.append(sp)
+
+
+def span(name: str):
+    """Context manager that times the stage 'name'. Yields the 'Span' (or a
+    no-op stand-in when profiling is off), whose 'arrays' method records the
+    sizes of the stage's outputs."""
+    if not _ENABLED:
+        return _NULL_SPAN
+    return _span(name)
+
+
+def traced(name: Optional[str] = None) -> Callable[[F], F]:
+    """Decorator that wraps every call of a function in a span, named after
+    the function unless 'name' is given."""
+    def decorator(fn: F) -> F:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _ENABLED:
+                return fn(*args, **kwargs)
+            with _span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper  # type: ignore
+    return decorator
+
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+
+def enable(
+    dump_path: Optional[str] = None, trace_allocations: bool = True
+) -> None:
+    """Starts recording spans.
+
+    Args:
+        dump_path (str, optional): Also run cProfile and write its stats to
+            this path, and the spans as folded stacks to '<dump_path>.folded',
+            when 'report' is called.
+        trace_allocations (bool, optional): Record peak memory per span with
+            tracemalloc, which slows down allocation-heavy code. Defaults to
+            True.
+    """
+    global _ENABLED, _PROFILER, _DUMP_PATH, _TRACE_ALLOCATIONS
+    _TRACE_ALLOCATIONS = trace_allocations
+    if trace_allocations and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _DUMP_PATH = dump_path
+    if dump_path is not None and _PROFILER is None:
+        _PROFILER = cProfile.Profile()
+        _PROFILER.enable()
+    _ENABLED = True
+
+
+def disable() -> None:
+    """Stops recording. Recorded spans are kept until 'reset'."""
+    global _ENABLED, _PROFILER
+    _ENABLED = False
+    if _PROFILER is not None:
+        _PROFILER.disable()
+        _PROFILER = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def reset() -> None:
+    with _LOCK:
+        _RECORDS.clear()
+
+
+def enable_from_env(report_at_exit: bool = False) -> bool:
+    """Enables profiling if 'TOKENOMICS_PROFILE' is set to anything but ""
+    or "0". Any value other than "1" is taken as the cProfile dump path.
+
+    Args:
+        report_at_exit (bool, optional): Call 'report' when the interpreter
+            exits, for entry points that do not report themselves. Defaults
+            to False.
+
+    Returns:
+        bool: Whether profiling was enabled.
+    """
+    value = os.environ.get(PROFILE_ENV, "")
+    if value in ("", "0"):
+        return False
+    enable(dump_path=None if value == "1" else value)
+    if report_at_exit:
+        atexit.register(report)
+    return True
+
+
+@dataclasses.dataclass
+class SpanStats:
+    """Spans of the same path, aggregated."""
+
+    path: Tuple[str, ...]
+    calls: int
+    total_seconds: float
+    self_seconds: float
+    max_seconds: float
+    peak_bytes: Optional[int]
+    sizes: Dict[str, Tuple[Tuple[int, ...], int]]
+
+
+def summary() -> List[SpanStats]:
+    """Recorded spans aggregated by path, in the order each path first
+    finished, parents after their children."""
+    with _LOCK:
+        records = list(_RECORDS)
+    stats: Dict[Tuple[str, ...], SpanStats] = {}
+    for sp in records:
+        st = stats.get(sp.path)
+        if st is None:
+            st = stats[sp.path] = SpanStats(
+                path=sp.path, calls=0, total_seconds=0.0, self_seconds=0.0,
+                max_seconds=0.0, peak_bytes=None, sizes={})
+        st.calls += 1
+        st.total_seconds += sp.seconds
+        st.self_seconds += sp.seconds - sp.child_seconds
+        st.max_seconds = max(st.max_seconds, sp.seconds)
+        if sp.peak_bytes is not None:
+            st.peak_bytes = max(st.peak_bytes or 0, sp.peak_bytes)
+        st.sizes.update(sp.sizes)
+    return list(stats.values())
+
+
+def format_summary(stats: Optional[List[SpanStats]] = None) -> str:
+    """The summary as a text table, sorted by path so children follow their
+    parent."""
+    stats = summary() if stats is None else stats
+    lines = [f"{'span':<48} {'calls':>5} {'total ms':>10} {'self ms':>10} "
+             f"{'max ms':>10} {'peak MiB':>9}  arrays"]
+    for st in sorted(stats, key=lambda s: s.path):
+        name = "  " * (len(st.path) - 1) + st.path[-1]
+        peak = "-" if st.peak_bytes is None else f"{st.peak_bytes / 2**20:.2f}"
+        arrays = ", ".join(
+            f"{k}{list(shape)} {nbytes / 2**20:.2f}MiB"
+            for k, (shape, nbytes) in st.sizes.items())
+        lines.append(
+            f"{name:<48} {st.calls:>5} {st.total_seconds * 1e3:>10.2f} "
+            f"{st.self_seconds * 1e3:>10.2f} {st.max_seconds * 1e3:>10.2f} "
+            f"{peak:>9}  {arrays}")
+    return "\n".join(lines)
+
+
+def write_folded(path: str, stats: Optional[List[SpanStats]] = None) -> None:
+    """Writes self time per span path in microseconds, in the folded stack
+    format ("a;b;c 1234") read by flamegraph.pl and speedscope."""
+    stats = summary() if stats is None else stats
+    with open(path, "w") as f:
+        for st in stats:
+            micros = int(round(st.self_seconds * 1e6))
+            if micros > 0:
+                f.write(f"{';'.join(st.path)} {micros}\n")
+
+
+def report(print_fn: Callable[[str], None] = print) -> None:
+    """Prints the summary table and, if a dump path was given to 'enable',
+    writes the cProfile stats and folded spans. Does nothing when profiling
+    is off."""
+    if not _ENABLED:
+        return
+    stats = summary()
+    print_fn(format_summary(stats))
+    if _DUMP_PATH is not None:
+        if _PROFILER is not None:
+            _PROFILER.dump_stats(_DUMP_PATH)
+        write_folded(f"{_DUMP_PATH}.folded", stats)
+        print_fn(f"wrote {_DUMP_PATH} and {_DUMP_PATH}.folded")
@@ -0,0 +1,210 @@
+"""Point, inverse and event queries over the supply schedules.
+
+Every schedule is piecewise linear, so their sum is too, with breakpoints at
+the union of theirs. 'SupplyIndex' precomputes that total curve and a sorted
+table of schedule events once. Each query is then a binary search over a few
+dozen breakpoints, O(log n), instead of a scan over a dense time grid.
+Queries take arrays and answer them all in one vectorized pass.
+
+Times are in months since genesis.
+
+Classes:
+    EventKind
+    Events
+    SupplyIndex
+"""
+import dataclasses
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from pkg import allocation
+from pkg import traces
+from pkg.allocation import AllocationGroup
+from pkg.vesting import PiecewiseLinear
+
+
+class EventKind:
+    CLIFF = "cliff"
+    VEST_START = "vest_start"
+    VEST_END = "vest_end"
+    PHASE = "phase"
+
+
+@dataclasses.dataclass
+class Events:
+    """A table of schedule events sorted by time.
+
+    Attributes:
+        times (np.ndarray): Event times in months.
+        groups (np.ndarray): Group of each event.
+        kinds (np.ndarray): An 'EventKind' for each event. Phase events mark
+            the boundaries of the community incentive phases.
+        amounts (np.ndarray): Tokens released at once by the event (the cliff
+            size), zero for other kinds.
+        rates (np.ndarray): Tokens per month the group releases right after
+            the event.
+    """
+
+    times: np.ndarray
+    groups: np.ndarray
+    kinds: np.ndarray
+    amounts: np.ndarray
+    rates: np.ndarray
+
+    def __len__(self) -> int:
+        return self.times.size
+
+    def __getitem__(self, idx) -> "Events":
+        return Events(
+            times=self.times[idx],
+            groups=self.groups[idx],
+            kinds=self.kinds[idx],
+            amounts=self.amounts[idx],
+            rates=self.rates[idx],
+        )
+
+    def records(self) -> List[Dict[str, object]]:
+        """The events as a list of dicts, e.g. for a JSON response."""
+        return [
+            dict(time=float(t), group=str(g), kind=str(k),
+                 amount=float(a), rate=float(r))
+            for t, g, k, a, r in zip(
+                self.times, self.groups, self.kinds, self.amounts, self.rates)
+        ]
+
+
+def _inverse(curve: PiecewiseLinear, thresholds: np.ndarray) -> np.ndarray:
+    """Earliest time at which a non-decreasing curve reaches each threshold.
+    NaN where it never does."""
+    times, values = curve.breakpoints
+    idx = np.searchsorted(values, thresholds, side="left")
+    never = idx >= values.size
+    idx = np.clip(idx, 1, values.size - 1)
+    t0, t1 = times[idx - 1], times[idx]
+    v0, v1 = values[idx - 1], values[idx]
+    rise = v1 - v0
+    frac = np.divide(thresholds - v0, rise, out=np.ones_like(rise), where=rise > 0)
+    out = t0 + np.clip(frac, 0, 1) * (t1 - t0)
+    out = np.where(thresholds <= values[0], times[0], out)
+    return np.where(never, np.nan, out)
+
+
+def _group_events(name: str, curve: PiecewiseLinear, is_phased: bool) -> Events:
+    times, values = curve.breakpoints
+    widths = np.diff(times)
+    slopes = np.zeros(times.size)
+    np.divide(np.diff(values), widths, out=slopes[:-1], where=widths > 0)
+
+    # First and last breakpoint at each distinct time. Cliffs have two.
+    event_times = np.unique(times)
+    first = np.searchsorted(times, event_times, side="left")
+    last = np.searchsorted(times, event_times, side="right") - 1
+    before = np.where(first > 0, slopes[first - 1], 0.0)
+    after = slopes[last]
+    # Supply is zero before genesis, so a curve that starts above zero has a
+    # cliff at its first breakpoint.
+    lower = values[first]
+    lower[0] = 0.0
+    jumps = values[last] - lower
+
+    if is_phased:
+        kinds = np.full(event_times.size, EventKind.PHASE, dtype=object)
+        keep = np.ones(event_times.size, dtype=bool)
+    else:
+        kinds = np.where(after > before, EventKind.VEST_START, EventKind.VEST_END)
+        kinds = np.where(jumps != 0, EventKind.CLIFF, kinds).astype(object)
+        keep = (jumps != 0) | (after != before)
+    return Events(
+        times=event_times[keep],
+        groups=np.full(keep.sum(), name, dtype=object),
+        kinds=kinds[keep],
+        amounts=jumps[keep],
+        rates=after[keep],
+    )
+
+
+class SupplyIndex:
+    """Precomputed query index over the supply schedules of a set of groups.
+
+    Args:
+        schedules (Dict[str, PiecewiseLinear]): Cumulative supply curve of
+            each group, e.g. 'PlotterTokenomicsV1.schedules()'.
+        phased_groups (Sequence[str], optional): Groups released through
+            incentive phases rather than vesting. Their breakpoints are
+            reported as phase events.
+    """
+
+    def __init__(
+        self,
+        schedules: Dict[str, PiecewiseLinear],
+        phased_groups: Sequence[str] = (),
+    ):
+        self.schedules = dict(schedules)
+        self.names: List[str] = list(schedules)
+        x, ys = traces.stacked_traces(self.schedules)
+        self.total = PiecewiseLinear(times=x, values=np.sum(list(ys.values()), axis=0))
+
+        events = [_group_events(name, curve, name in phased_groups)
+                  for name, curve in self.schedules.items()]
+        order = np.argsort(np.concatenate([e.times for e in events]), kind="stable")
+        self.events = Events(
+            times=np.concatenate([e.times for e in events])[order],
+            groups=np.concatenate([e.groups for e in events])[order],
+            kinds=np.concatenate([e.kinds for e in events])[order],
+            amounts=np.concatenate([e.amounts for e in events])[order],
+            rates=np.concatenate([e.rates for e in events])[order],
+        )
+
+    @classmethod
+    def from_groups(
+        cls, groups: List[AllocationGroup], total_supply: float
+    ) -> "SupplyIndex":
+        return cls(
+            schedules=allocation.schedules(groups=groups, total_supply=total_supply),
+            phased_groups=[g.name for g in groups if g.vi is None],
+        )
+
+    def supply_at(self, t: np.ndarray) -> np.ndarray:
+        """Total released supply at each time in 't'."""
+        return self.total(t)
+
+    def supply_by_group(self, t: np.ndarray) -> np.ndarray:
+        """Released supply of each group at each time, shape
+        (len(names),) + t.shape, rows in the order of 'names'."""
+        t = np.asarray(t, dtype=float)
+        out = np.empty((len(self.names),) + t.shape)
+        for row, curve in zip(out, self.schedules.values()):
+            curve(t, out=row)
+        return out
+
+    def time_at(
+        self, thresholds: np.ndarray, group: Optional[str] = None
+    ) -> np.ndarray:
+        """Earliest time at which the total supply, or the supply of 'group',
+        reaches each threshold. NaN for thresholds never reached.
+
+        Args:
+            thresholds (np.ndarray): Supply amounts, of any shape.
+            group (str, optional): Query one group instead of the total.
+        """
+        curve = self.total if group is None else self.schedules[group]
+        return _inverse(curve, np.asarray(thresholds, dtype=float))
+
+    def next_event_index(self, t: np.ndarray) -> np.ndarray:
+        """Index into 'events' of the first event strictly after each time,
+        or len(events) if there is none."""
+        return np.searchsorted(self.events.times, t, side="right")
+
+    def next_events(
+        self, t: float, n: int = 1, kinds: Optional[Sequence[str]] = None
+    ) -> Events:
+        """The next 'n' events strictly after time 't', optionally only of the
+        given kinds."""
+        events = self.events[int(self.next_event_index(t)):]
+        if kinds is not None:
+            events = events[np.isin(events.kinds, list(kinds))]
+        return events[:n]
+
+    def events_between(self, start: float, stop: float) -> Events:
+        """Events in the time interval [start, stop)."""
+        lo, hi = np.searchsorted(self.events.times, [start, stop], side="left")
+        return self.events[lo:hi]
@@ -0,0 +1,331 @@
+"""Sensitivity of circulating supply to the allocation and vesting parameters.
+
+Supply is linear in each group's 'pct' and 'cliff_pct' and in the community
+incentive phases, and piecewise linear in the vesting months, so its
+derivative with respect to every parameter has a closed form.
+'sensitivities' evaluates all of them at once as a (parameters, times)
+Jacobian.
+
+A derivative is local: it does not see the jump when a cliff moves past the
+time of interest. 'tornado' therefore evaluates every parameter at a low and
+a high value exactly. All perturbed scenarios go through
+'vesting.vesting_supply' and one matrix product in a single batch. Parameters
+are then ranked by how far supply at one time swings.
+
+Partial derivatives hold every other parameter fixed, so they ignore that the
+group pcts sum to 1 and the phases sum to 100.
+
+Classes:
+    ParamName
+    Parameter
+    Sensitivities
+    Tornado
+
+Functions:
+    parameters
+    sensitivities
+    tornado
+"""
+import dataclasses
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+from pkg import allocation
+from pkg.allocation import AllocationGroup, INCENTIVE_PHASES, PHASE_MONTHS
+from pkg.const import SUPPLY_AT_MATURITY
+from pkg.vesting import vesting_supply
+
+
+class ParamName:
+    PCT = "pct"
+    CLIFF_PCT = "cliff_pct"
+    VEST_START = "vest_start_month"
+    VEST_END = "vest_end_month"
+    PHASE = "incentive_phases"
+
+
+_VESTING_PARAMS = (ParamName.PCT, ParamName.CLIFF_PCT,
+                   ParamName.VEST_START, ParamName.VEST_END)
+
+
+@dataclasses.dataclass(frozen=True)
+class Parameter:
+    """One model parameter.
+
+    Attributes:
+        group (str): Group the parameter belongs to.
+        name (str): A 'ParamName'.
+        value (float): Current value.
+        index (int, optional): Phase index for 'ParamName.PHASE'.
+    """
+
+    group: str
+    name: str
+    value: float
+    index: Optional[int] = None
+
+    @property
+    def label(self) -> str:
+        if self.index is None:
+            return f"{self.group}.{self.name}"
+        return f"{self.group}.{self.name}[{self.index}]"
+
+
+def parameters(
+    groups: List[AllocationGroup],
+    phases: Sequence[float] = tuple(INCENTIVE_PHASES),
+) -> List[Parameter]:
+    """Every parameter of 'groups' in group order: 'pct' for all groups, the
+    vesting fields for vesting groups and each phase for phased groups."""
+    out: List[Parameter] = []
+    for group in groups:
+        out.append(Parameter(group.name, ParamName.PCT, group.pct))
+        if group.vi is None:
+            out.extend(Parameter(group.name, ParamName.PHASE, float(p), index=i)
+                       for i, p in enumerate(phases))
+        else:
+            out.extend(Parameter(group.name, name, float(getattr(group.vi, name)))
+                       for name in _VESTING_PARAMS[1:])
+    return out
+
+
+@dataclasses.dataclass
+class Sensitivities:
+    """Derivatives of total supply with respect to every parameter.
+
+    Attributes:
+        times (np.ndarray): Times in months, shape (T,).
+        params (List[Parameter]): Parameters, shape (P,).
+        supply (np.ndarray): Total supply at each time, shape (T,).
+        jacobian (np.ndarray): d supply / d parameter, shape (P, T). Vesting
+            months are in tokens per month of delay.
+    """
+
+    times: np.ndarray
+    params: List[Parameter]
+    supply: np.ndarray
+    jacobian: np.ndarray
+
+    def row(self, label: str) -> np.ndarray:
+        """Derivative over time for the parameter with this 'label'."""
+        labels = [p.label for p in self.params]
+        return self.jacobian[labels.index(label)]
+
+    def elasticities(self) -> np.ndarray:
+        """Relative change of supply per relative change of each parameter,
+        shape (P, T). Zero where supply is zero."""
+        values = np.array([p.value for p in self.params])[:, None]
+        return np.divide(self.jacobian * values, self.supply,
+                         out=np.zeros_like(self.jacobian), where=self.supply > 0)
+
+
+def _phase_weights(t: np.ndarray, num_phases: int, phase_months: float) -> np.ndarray:
+    """Fraction of each phase elapsed at each time, shape (P, T). Supply of
+    a phased group is group_supply / 100 * phases @ weights."""
+    return np.clip(t / phase_months - np.arange(num_phases)[:, None], 0, 1)
+
+
+def sensitivities(
+    times: np.ndarray,
+    groups: Optional[List[AllocationGroup]] = None,
+    phases: Sequence[float] = tuple(INCENTIVE_PHASES),
+    total_supply: float = SUPPLY_AT_MATURITY,
+    phase_months: float = PHASE_MONTHS,
+) -> Sensitivities:
+    """Analytic derivatives of total supply at 'times' with respect to every
+    parameter in 'parameters(groups, phases)'.
+
+    Derivatives with respect to the vesting months are taken inside the
+    linear ramp. At the vesting start itself supply jumps by the cliff and
+    the derivative is undefined; it is reported as zero there.
+
+    Args:
+        times (np.ndarray): Times in months, shape (T,).
+        groups (List[AllocationGroup], optional): Defaults to
+            'allocation.default_groups()'.
+        phases (Sequence[float], optional): Community incentive phases in
+            percent.
+        total_supply (float, optional): Token supply at maturity.
+        phase_months (float, optional): Length of each phase.
+
+    Returns:
+        Sensitivities
+    """
+    groups = allocation.default_groups() if groups is None else groups
+    t = np.atleast_1d(np.asarray(times, dtype=float))
+    phases_arr = np.asarray(phases, dtype=float)
+    weights = _phase_weights(t, phases_arr.size, phase_months)
+    phased_frac = phases_arr @ weights / 100
+
+    vested = [g for g in groups if g.vi is not None]
+    pct = np.array([g.pct for g in vested])[:, None]
+    cliff = np.array([g.vi.cliff_pct for g in vested], dtype=float)[:, None]
+    start = np.array([g.vi.vest_start_month for g in vested], dtype=float)[:, None]
+    end = np.array([g.vi.vest_end_month for g in vested], dtype=float)[:, None]
+    group_total = total_supply * pct
+    span = end - start
+    elapsed = t - start
+    is_active = elapsed >= 0
+    ramp = np.where(span > 0, np.clip(elapsed / np.where(span > 0, span, 1), 0, 1), 1)
+    in_ramp = (elapsed > 0) & (t < end)
+    slope = group_total * (1 - cliff) / np.where(span > 0, span, 1) ** 2
+    vesting_rows = {
+        ParamName.PCT: np.where(is_active, total_supply * (cliff + (1 - cliff) * ramp), 0),
+        ParamName.CLIFF_PCT: np.where(is_active, group_total * (1 - ramp), 0),
+        ParamName.VEST_START: np.where(in_ramp, slope * (t - end), 0),
+        ParamName.VEST_END: np.where(in_ramp, -slope * elapsed, 0),
+    }
+    vested_supply = np.where(is_active, group_total * (cliff + (1 - cliff) * ramp), 0)
+
+    params = parameters(groups, phases)
+    jacobian = np.empty((len(params), t.size))
+    vested_idx = {g.name: i for i, g in enumerate(vested)}
+    supply = vested_supply.sum(axis=0)
+    row = 0
+    for group in groups:
+        if group.vi is None:
+            supply = supply + total_supply * group.pct * phased_frac
+            jacobian[row] = total_supply * phased_frac
+            jacobian[row + 1:row + 1 + phases_arr.size] = (
+                total_supply * group.pct / 100 * weights)
+            row += 1 + phases_arr.size
+        else:
+            for name in _VESTING_PARAMS:
+                jacobian[row] = vesting_rows[name][vested_idx[group.name]]
+                row += 1
+    return Sensitivities(times=t, params=params, supply=supply, jacobian=jacobian)
+
+
+@dataclasses.dataclass
+class Tornado:
+    """Supply at one time with each parameter at its low and high value,
+    ranked by swing, largest first.
+
+    Attributes:
+        month (float): Time of interest in months.
+        base (float): Supply at 'month' with every parameter at its value.
+        params (List[Parameter]): Parameters, shape (P,).
+        low_values, high_values (np.ndarray): Parameter values tried.
+        low_supply, high_supply (np.ndarray): Supply at 'month' with only
+            that parameter changed.
+    """
+
+    month: float
+    base: float
+    params: List[Parameter]
+    low_values: np.ndarray
+    high_values: np.ndarray
+    low_supply: np.ndarray
+    high_supply: np.ndarray
+
+    @property
+    def swing(self) -> np.ndarray:
+        return np.abs(self.high_supply - self.low_supply)
+
+    def records(self) -> List[Dict[str, object]]:
+        """The rows as a list of dicts, e.g. for a table or JSON."""
+        return [
+            dict(param=p.label, value=p.value, low=float(lo), high=float(hi),
+                 low_supply=float(ls), high_supply=float(hs),
+                 swing=float(abs(hs - ls)))
+            for p, lo, hi, ls, hs in zip(
+                self.params, self.low_values, self.high_values,
+                self.low_supply, self.high_supply)
+        ]
+
+
+def _swing_bounds(
+    params: List[Parameter],
+    groups: List[AllocationGroup],
+    rel_swing: float,
+    month_swing: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    vi = {g.name: g.vi for g in groups}
+    low = np.empty(len(params))
+    high = np.empty(len(params))
+    for i, p in enumerate(params):
+        if p.name in (ParamName.VEST_START, ParamName.VEST_END):
+            low[i], high[i] = p.value - month_swing, p.value + month_swing
+            # Keep 0 <= vest_start_month <= vest_end_month.
+            if p.name == ParamName.VEST_START:
+                low[i] = max(low[i], 0)
+                high[i] = min(high[i], vi[p.group].vest_end_month)
+            else:
+                low[i] = max(low[i], vi[p.group].vest_start_month)
+        else:
+            low[i], high[i] = p.value * (1 - rel_swing), p.value * (1 + rel_swing)
+            if p.name == ParamName.CLIFF_PCT:
+                high[i] = min(high[i], 1)
+    return low, high
+
+
+def tornado(
+    month: float,
+    groups: Optional[List[AllocationGroup]] = None,
+    phases: Sequence[float] = tuple(INCENTIVE_PHASES),
+    total_supply: float = SUPPLY_AT_MATURITY,
+    phase_months: float = PHASE_MONTHS,
+    rel_swing: float = 0.1,
+    month_swing: float = 3,
+) -> Tornado:
+    """Ranks parameters by how much supply at 'month' moves between their
+    low and high values.
+
+    Args:
+        month (float): Time of interest in months.
+        groups, phases, total_supply, phase_months: As in 'sensitivities'.
+        rel_swing (float, optional): 'pct', 'cliff_pct' and phases are tried
+            at (1 -/+ rel_swing) times their value. Defaults to 0.1.
+        month_swing (float, optional): Vesting months are tried this many
+            months earlier and later. Defaults to 3.
+
+    Returns:
+        Tornado
+    """
+    groups = allocation.default_groups() if groups is None else groups
+    params = parameters(groups, phases)
+    low, high = _swing_bounds(params, groups, rel_swing, month_swing)
+
+    # Scenario 0 is the base case, then the low and high case of each
+    # parameter: one row per scenario, one column per group or phase.
+    num_scenarios = 1 + 2 * len(params)
+    pct = np.tile([g.pct for g in groups], (num_scenarios, 1))
+    phase_pcts = np.tile(np.asarray(phases, dtype=float), (num_scenarios, 1))
+    vesting_args = {
+        name: np.tile([getattr(g.vi, name) if g.vi else 0.0 for g in groups],
+                      (num_scenarios, 1)).astype(float)
+        for name in _VESTING_PARAMS[1:]
+    }
+    group_idx = {g.name: i for i, g in enumerate(groups)}
+    for i, p in enumerate(params):
+        for row, value in [(1 + 2 * i, low[i]), (2 + 2 * i, high[i])]:
+            if p.name == ParamName.PCT:
+                pct[row, group_idx[p.group]] = value
+            elif p.name == ParamName.PHASE:
+                phase_pcts[row, p.index] = value
+            else:
+                vesting_args[p.name][row, group_idx[p.group]] = value
+
+    is_vested = np.array([g.vi is not None for g in groups])
+    vested = vesting_supply(
+        t=month,
+        total=total_supply * pct[:, is_vested],
+        cliff_pct=vesting_args[ParamName.CLIFF_PCT][:, is_vested],
+        vest_start_month=vesting_args[ParamName.VEST_START][:, is_vested],
+        vest_end_month=vesting_args[ParamName.VEST_END][:, is_vested],
+    ).sum(axis=1)
+    weights = _phase_weights(np.array([month], dtype=float),
+                             phase_pcts.shape[1], phase_months)[:, 0]
+    phased = total_supply * pct[:, ~is_vested].sum(axis=1) * (phase_pcts @ weights) / 100
+    supply = vested + phased
+
+    low_supply, high_supply = supply[1::2], supply[2::2]
+    order = np.argsort(-np.abs(high_supply - low_supply), kind="stable")
+    return Tornado(
+        month=float(month),
+        base=float(supply[0]),
+        params=[params[i] for i in order],
+        low_values=low[order],
+        high_values=high[order],
+        low_supply=low_supply[order],
+        high_supply=high_supply[order],
+    )
@@ -0,0 +1,277 @@
+"""Precomputed arrays published once and shared by every serving process.
+
+A primary process computes the supply matrix, its derived metrics, the
+sensitivity tornado and the decay curve once. It then writes them as .npy files to a new generation
+directory under a shared directory, and writes 'manifest.json' last, with an
+atomic rename. The manifest is what makes a generation visible. Worker
+processes attach by memory-mapping the files read-only, so every worker reads
+the same pages of the OS page cache. Memory does not grow with the number of
+workers, and a worker starts without recomputing anything. The manifest also
+holds the whole tokenomics spec, so workers plot with the same total supply,
+groups and phases as the published arrays. On Linux the
+default directory is under /dev/shm, which is backed by shared memory.
+
+Publishing again creates a new generation and removes older ones. Workers
+attached to a removed generation keep their mappings valid until they
+re-attach.
+
+Layout:
+    <directory>/manifest.json
+    <directory>/<generation>/<array name>.npy
+
+Classes:
+    SharedStore
+
+Functions:
+    default_dir
+    publish
+    attach
+"""
+import dataclasses
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from pkg import allocation
+from pkg import metrics
+from pkg import sensitivity
+from pkg import supply
+from pkg.allocation import AllocationGroup
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.decay import DecayResult
+from pkg.spec import DecaySpec, TokenomicsSpec, parse_spec, spec_from_groups
+
+SHARED_DIR_ENV: str = "TOKENOMICS_SHARED_DIR"
+MANIFEST_FNAME: str = "manifest.json"
+MANIFEST_VERSION: int = 3
+
+TORNADO_MONTH: float = 24
+"""TORNADO_MONTH: Month of the published sensitivity tornado, the default of
+'PlotterTokenomicsV1.plot_sensitivity_tornado'."""
+
+
+def default_dir() -> str:
+    """'TOKENOMICS_SHARED_DIR' if set, else a directory in /dev/shm when it
+    exists, else in the temp directory."""
+    if os.environ.get(SHARED_DIR_ENV):
+        return os.environ[SHARED_DIR_ENV]
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "tokenomics")
+
+
+@dataclasses.dataclass
+class SharedStore:
+    """One published generation, attached read-only.
+
+    Attributes:
+        directory (str): Shared directory holding the manifest.
+        manifest (Dict[str, Any]): Parsed manifest of the generation.
+        arrays (Dict[str, np.ndarray]): Read-only memory maps, keyed by name.
+    """
+
+    directory: str
+    manifest: Dict[str, Any]
+    arrays: Dict[str, np.ndarray]
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+    def nbytes(self) -> int:
+        return sum(arr.nbytes for arr in self.arrays.values())
+
+    def is_current(self) -> bool:
+        """Whether the manifest still points at this generation."""
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FNAME)) as f:
+                return json.load(f)["generation"] == self.generation
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def tokenomics_spec(self) -> TokenomicsSpec:
+        """The spec the arrays were computed from."""
+        return parse_spec(self.manifest["spec"], source=f"{self.directory}: spec")
+
+    def groups(self) -> List[AllocationGroup]:
+        return self.tokenomics_spec().allocation_groups()
+
+    def supply_matrix(self) -> supply.SupplyMatrix:
+        return supply.SupplyMatrix(
+            names=list(self.manifest["names"]),
+            times=self.arrays["times"],
+            amounts=self.arrays["amounts"],
+        )
+
+    def supply_metrics(self) -> metrics.SupplyMetrics:
+        """The published metrics, as views of the shared arrays."""
+        return metrics.SupplyMetrics(
+            names=list(self.manifest["names"]),
+            times=self.arrays["times"],
+            amounts=self.arrays["amounts"],
+            circulating=self.arrays["circulating"],
+            unlocks=self.arrays["unlocks"],
+            inflation_rate=self.arrays["inflation_rate"],
+            rolling_unlocks={
+                days: self.arrays[f"rolling_unlocks_{days}"]
+                for days in self.manifest["window_days"]},
+            shares=self.arrays["shares"],
+        )
+
+    def decay_result(self) -> DecayResult:
+        return DecayResult(
+            f_t=self.arrays["decay_f_t"],
+            times=self.arrays["decay_times"],
+            normal_f_t=self.arrays["decay_normal_f_t"],
+            degree=self.manifest["spec"]["decay"]["degree"],
+            supply_at_maturity=self.manifest["spec"]["decay"]["supply_at_maturity"],
+        )
+
+    def tornado(self) -> sensitivity.Tornado:
+        """The published tornado at 'TORNADO_MONTH'."""
+        tornado = self.manifest["tornado"]
+        return sensitivity.Tornado(
+            month=tornado["month"],
+            base=tornado["base"],
+            params=[sensitivity.Parameter(**p) for p in tornado["params"]],
+            low_values=self.arrays["tornado_low_values"],
+            high_values=self.arrays["tornado_high_values"],
+            low_supply=self.arrays["tornado_low_supply"],
+            high_supply=self.arrays["tornado_high_supply"],
+        )
+
+
+def publish(
+    directory: Optional[str] = None,
+    groups: Optional[List[AllocationGroup]] = None,
+    decay_factor: float = 0.2,
+    time_years: int = 8,
+    degree: int = 5,
+    num_time_points: int = int(1e4),
+    tokenomics_spec: Optional[TokenomicsSpec] = None,
+) -> str:
+    """Computes the shared arrays and publishes them as a new generation.
+
+    Args:
+        directory (str, optional): Defaults to 'default_dir()'.
+        groups (List[AllocationGroup], optional): Defaults to
+            'allocation.default_groups()'.
+        decay_factor, time_years, degree: Parameters of 'do_decay'.
+        num_time_points (int, optional): Samples of the supply matrix.
+        tokenomics_spec (TokenomicsSpec, optional): Take the groups, total
+            supply, phases and decay parameters from this spec instead.
+
+    Returns:
+        str: Path of the generation directory.
+    """
+    directory = default_dir() if directory is None else directory
+    if tokenomics_spec is None:
+        tokenomics_spec = spec_from_groups(
+            allocation.default_groups() if groups is None else groups,
+            decay=DecaySpec(
+                decay_factor=decay_factor, time_years=time_years, degree=degree))
+    os.makedirs(directory, exist_ok=True)
+
+    matrix = supply.supply_matrix(
+        schedules=tokenomics_spec.schedules(),
+        num_time_points=num_time_points,
+        stop=TOKEN_SUPPLY_YEARS * 12,
+    )
+    supply_metrics = metrics.from_supply_matrix(matrix)
+    decay_result = tokenomics_spec.decay_result()
+    tornado = sensitivity.tornado(
+        month=TORNADO_MONTH,
+        groups=tokenomics_spec.allocation_groups(),
+        phases=tokenomics_spec.community.incentive_phases,
+        total_supply=tokenomics_spec.total_supply,
+        phase_months=tokenomics_spec.community.phase_months,
+    )
+    arrays = dict(
+        times=matrix.times,
+        amounts=matrix.amounts,
+        circulating=supply_metrics.circulating,
+        unlocks=supply_metrics.unlocks,
+        inflation_rate=supply_metrics.inflation_rate,
+        shares=supply_metrics.shares,
+        decay_f_t=decay_result.f_t,
+        decay_times=decay_result.times,
+        decay_normal_f_t=decay_result.normal_f_t,
+        tornado_low_values=tornado.low_values,
+        tornado_high_values=tornado.high_values,
+        tornado_low_supply=tornado.low_supply,
+        tornado_high_supply=tornado.high_supply,
+    )
+    for days, rolling in supply_metrics.rolling_unlocks.items():
+        arrays[f"rolling_unlocks_{days}"] = rolling
+
+    generation = f"gen-{time.time_ns()}-{os.getpid()}"
+    gen_dir = os.path.join(directory, generation)
+    os.makedirs(gen_dir)
+    for name, arr in arrays.items():
+        np.save(os.path.join(gen_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    manifest = dict(
+        version=MANIFEST_VERSION,
+        generation=generation,
+        created=time.time(),
+        names=matrix.names,
+        window_days=list(supply_metrics.rolling_unlocks),
+        spec=dataclasses.asdict(tokenomics_spec),
+        tornado=dict(
+            month=tornado.month, base=float(tornado.base),
+            params=[dataclasses.asdict(p) for p in tornado.params]),
+        arrays=sorted(arrays),
+    )
+    tmp_path = os.path.join(directory, f".{MANIFEST_FNAME}.{generation}")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FNAME))
+
+    for entry in os.listdir(directory):
+        if entry.startswith("gen-") and entry != generation:
+            shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+    return gen_dir
+
+
+def attach(
+    directory: Optional[str] = None,
+    timeout: float = 0.0,
+    poll_seconds: float = 0.2,
+) -> SharedStore:
+    """Memory-maps the current generation read-only.
+
+    Args:
+        directory (str, optional): Defaults to 'default_dir()'.
+        timeout (float, optional): Seconds to wait for a primary to publish.
+            Defaults to 0, i.e. fail at once.
+        poll_seconds (float, optional): Interval between checks.
+
+    Raises:
+        FileNotFoundError: If nothing is published within 'timeout'.
+    """
+    directory = default_dir() if directory is None else directory
+    manifest_path = os.path.join(directory, MANIFEST_FNAME)
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(
+                    f"{manifest_path}: unsupported version {manifest.get('version')}")
+            gen_dir = os.path.join(directory, manifest["generation"])
+            arrays = {
+                name: np.load(os.path.join(gen_dir, f"{name}.npy"), mmap_mode="r")
+                for name in manifest["arrays"]
+            }
+            return SharedStore(directory=directory, manifest=manifest, arrays=arrays)
+        except FileNotFoundError:
+            # Not published yet, or a new generation replaced this one
+            # between reading the manifest and opening its files.
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(poll_seconds)
@@ -0,0 +1,335 @@
+"""Declarative tokenomics specs (TOML or YAML), validated and compiled into
+supply schedules.
+
+A spec holds everything that is otherwise hardcoded across the package: the
+total supply, every allocation group with its color and vesting, the
+community incentive phases and the decay parameters. The decay section
+holds the arguments of 'decay.do_decay' ('TokenomicsSpec.decay_result'),
+including its own 'supply_at_maturity'. That is the supply the decay curve
+is scaled to, 800M by default, and is separate from the token supply,
+1.5e9 in 'pkg.const'.
+
+Each group compiles to a 'PiecewiseLinear' cached under a hash of the inputs
+it depends on: its own fields, the total supply and, for phased groups, the
+phases. Editing one group recompiles only that group, and identical groups
+in different specs share a compiled schedule. This module needs NumPy only,
+so many specs can be loaded side by side without the plotting stack.
+
+Example (TOML):
+    name = "Tokenomics v2"
+    total_supply = 1_500_000_000
+
+    [community]
+    incentive_phases = [17.35483871, 12.09677419, ...]
+
+    [[groups]]
+    name = "Public Sale"
+    pct = 0.08
+    color = "rgb(130, 207, 179)"
+    vesting = { cliff_pct = 0.1, vest_start_month = 0, vest_end_month = 12 }
+
+    [[groups]]
+    name = "Community"  # no vesting: released through the phases
+    pct = 0.60
+    color = "rgb(100, 80, 194)"
+
+Classes:
+    SpecError
+    VestingSpec
+    GroupSpec
+    CommunitySpec
+    DecaySpec
+    TokenomicsSpec
+
+Functions:
+    parse_spec
+    load_spec
+    spec_from_groups
+    compile_schedules
+    cache_info
+"""
+import collections
+import dataclasses
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from pkg import allocation
+from pkg import vesting
+from pkg.const import SUPPLY_AT_MATURITY, TOKEN_SUPPLY_YEARS
+from pkg.decay import SUPPLY_AT_MATURITY as DECAY_SUPPLY_AT_MATURITY
+from pkg.decay import DecayResult, do_decay
+
+SCHEDULE_CACHE_SIZE: int = 1024
+"""SCHEDULE_CACHE_SIZE: Compiled group schedules kept in memory."""
+
+
+class SpecError(ValueError):
+    """Raised for a spec that is malformed or violates a constraint."""
+
+
+@dataclasses.dataclass(frozen=True)
+class VestingSpec:
+    cliff_pct: float
+    vest_start_month: int
+    vest_end_month: int
+
+
+@dataclasses.dataclass(frozen=True)
+class GroupSpec:
+    """An allocation group. Groups without 'vesting' are released through
+    the community incentive phases."""
+
+    name: str
+    pct: float
+    color: str
+    vesting: Optional[VestingSpec] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class CommunitySpec:
+    incentive_phases: Tuple[float, ...] = tuple(allocation.INCENTIVE_PHASES)
+    phase_months: float = allocation.PHASE_MONTHS
+
+
+@dataclasses.dataclass(frozen=True)
+class DecaySpec:
+    decay_factor: float = 0.2
+    time_years: int = TOKEN_SUPPLY_YEARS
+    degree: int = 5
+    supply_at_maturity: float = DECAY_SUPPLY_AT_MATURITY
+
+
+@dataclasses.dataclass(frozen=True)
+class TokenomicsSpec:
+    name: str
+    groups: Tuple[GroupSpec, ...]
+    total_supply: float = SUPPLY_AT_MATURITY
+    community: CommunitySpec = CommunitySpec()
+    decay: DecaySpec = DecaySpec()
+    source: Optional[str] = None
+
+    def group(self, name: str) -> GroupSpec:
+        for group in self.groups:
+            if group.name == name:
+                return group
+        raise KeyError(name)
+
+    def allocation_groups(self) -> List[allocation.AllocationGroup]:
+        """The groups as 'AllocationGroup's, e.g. for 'PlotterTokenomicsV1'."""
+        return [
+            allocation.AllocationGroup(
+                name=g.name, pct=g.pct, color=g.color,
+                vi=None if g.vesting is None else vesting.VestingInfo(
+                    **dataclasses.asdict(g.vesting)),
+            )
+            for g in self.groups
+        ]
+
+    def schedules(self) -> Dict[str, vesting.PiecewiseLinear]:
+        return compile_schedules(self)
+
+    def decay_result(self) -> DecayResult:
+        """'decay.do_decay' with the parameters of the decay section."""
+        return do_decay(**dataclasses.asdict(self.decay))
+
+
+def _build(cls, data: Mapping[str, Any], where: str, **overrides):
+    if not isinstance(data, Mapping):
+        raise SpecError(f"{where}: expected a table, got {type(data).__name__}")
+    fields = {f.name: f for f in dataclasses.fields(cls)}
+    unknown = set(data) - set(fields)
+    if unknown:
+        raise SpecError(f"{where}: unknown keys {sorted(unknown)}")
+    kwargs: Dict[str, Any] = {}
+    for name, value in data.items():
+        expected = fields[name].type
+        if expected in (float, "float") and isinstance(value, int):
+            value = float(value)
+        kwargs[name] = value
+    kwargs.update(overrides)
+    try:
+        return cls(**kwargs)
+    except TypeError as err:
+        raise SpecError(f"{where}: {err}") from None
+
+
+def _check_number(value: Any, where: str, lo: float, hi: float = np.inf) -> None:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise SpecError(f"{where}: expected a number, got {value!r}")
+    if not lo <= value <= hi:
+        raise SpecError(f"{where}: {value} is outside [{lo}, {hi}]")
+
+
+def parse_spec(data: Mapping[str, Any], source: Optional[str] = None) -> TokenomicsSpec:
+    """Validates a spec already parsed into dicts and lists.
+
+    Raises:
+        SpecError: With the location of the first problem found.
+    """
+    where = source or "spec"
+    raw_groups = data.get("groups")
+    if not isinstance(raw_groups, list) or not raw_groups:
+        raise SpecError(f"{where}: 'groups' must be a non-empty list")
+
+    groups: List[GroupSpec] = []
+    for idx, raw in enumerate(raw_groups):
+        group_where = f"{where}: groups[{idx}]"
+        raw = dict(raw) if isinstance(raw, Mapping) else raw
+        vesting_spec = None
+        if isinstance(raw, dict) and raw.get("vesting") is not None:
+            vesting_spec = _build(VestingSpec, raw["vesting"], f"{group_where}.vesting")
+        group = _build(GroupSpec, raw, group_where, vesting=vesting_spec)
+        if not isinstance(group.name, str) or not group.name:
+            raise SpecError(f"{group_where}: 'name' must be a non-empty string")
+        _check_number(group.pct, f"{group_where}.pct", 0, 1)
+        if not isinstance(group.color, str):
+            raise SpecError(f"{group_where}.color: expected a string")
+        if vesting_spec is not None:
+            vest_where = f"{group_where}.vesting"
+            _check_number(vesting_spec.cliff_pct, f"{vest_where}.cliff_pct", 0, 1)
+            for key in ["vest_start_month", "vest_end_month"]:
+                if not isinstance(getattr(vesting_spec, key), int):
+                    raise SpecError(f"{vest_where}.{key}: expected an integer")
+            if not 0 <= vesting_spec.vest_start_month <= vesting_spec.vest_end_month:
+                raise SpecError(
+                    f"{vest_where}: need 0 <= vest_start_month <= vest_end_month")
+        groups.append(group)
+
+    names = [g.name for g in groups]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        raise SpecError(f"{where}: duplicate group names {duplicates}")
+    pct_sum = sum(g.pct for g in groups)
+    if abs(pct_sum - 1) > 1e-6:
+        raise SpecError(f"{where}: group pcts sum to {pct_sum}, not 1")
+
+    community = _build(CommunitySpec, data.get("community", {}), f"{where}: community")
+    if not isinstance(community.incentive_phases, (list, tuple)) or not (
+            community.incentive_phases):
+        raise SpecError(f"{where}: community.incentive_phases must be a non-empty list")
+    for idx, pct in enumerate(community.incentive_phases):
+        _check_number(pct, f"{where}: community.incentive_phases[{idx}]", 0)
+    phases = tuple(float(p) for p in community.incentive_phases)
+    if abs(sum(phases) - 100) > 0.01:
+        raise SpecError(
+            f"{where}: community.incentive_phases sum to {sum(phases)}, not 100")
+    _check_number(community.phase_months, f"{where}: community.phase_months", 1e-9)
+    community = dataclasses.replace(community, incentive_phases=phases)
+
+    decay = _build(DecaySpec, data.get("decay", {}), f"{where}: decay")
+    _check_number(decay.decay_factor, f"{where}: decay.decay_factor", 0, 1)
+    _check_number(decay.supply_at_maturity, f"{where}: decay.supply_at_maturity", 0)
+    for key in ["time_years", "degree"]:
+        value = getattr(decay, key)
+        if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+            raise SpecError(f"{where}: decay.{key}: expected a positive integer")
+
+    top = {k: v for k, v in data.items()
+           if k not in ("groups", "community", "decay")}
+    return _build(
+        TokenomicsSpec, top, where, groups=tuple(groups),
+        community=community, decay=decay, source=source)
+
+
+def load_spec(path: str) -> TokenomicsSpec:
+    """Reads and validates a .toml, .yaml or .yml spec file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".toml":
+        try:
+            import tomllib  # Python >= 3.11
+        except ImportError:
+            import tomli as tomllib  # type: ignore
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+    elif ext in (".yaml", ".yml"):
+        import yaml
+        with open(path) as f:
+            data = yaml.safe_load(f)
+    else:
+        raise SpecError(f"{path}: unsupported spec format {ext!r}")
+    if not isinstance(data, Mapping):
+        raise SpecError(f"{path}: expected a table at the top level")
+    return parse_spec(data, source=path)
+
+
+def spec_from_groups(
+    groups: List[allocation.AllocationGroup],
+    name: str = "default",
+    total_supply: float = SUPPLY_AT_MATURITY,
+    decay: DecaySpec = DecaySpec(),
+) -> TokenomicsSpec:
+    """Spec of 'AllocationGroup's released through the default phases, the
+    inverse of 'TokenomicsSpec.allocation_groups'."""
+    return TokenomicsSpec(
+        name=name,
+        groups=tuple(
+            GroupSpec(
+                name=g.name, pct=g.pct, color=g.color,
+                vesting=None if g.vi is None else VestingSpec(
+                    cliff_pct=g.vi.cliff_pct,
+                    vest_start_month=g.vi.vest_start_month,
+                    vest_end_month=g.vi.vest_end_month),
+            )
+            for g in groups
+        ),
+        total_supply=total_supply,
+        decay=decay,
+    )
+
+
+_SCHEDULE_CACHE: "collections.OrderedDict[str, vesting.PiecewiseLinear]" = (
+    collections.OrderedDict())
+_CACHE_STATS = dict(hits=0, misses=0)
+
+
+def _group_key(group: GroupSpec, spec: TokenomicsSpec) -> str:
+    inputs: Dict[str, Any] = dict(
+        group=dataclasses.asdict(group), total_supply=spec.total_supply)
+    if group.vesting is None:
+        inputs["community"] = dataclasses.asdict(spec.community)
+    payload = json.dumps(inputs, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _compile_group(group: GroupSpec, spec: TokenomicsSpec) -> vesting.PiecewiseLinear:
+    group_supply = spec.total_supply * group.pct
+    if group.vesting is None:
+        phases = np.asarray(spec.community.incentive_phases)
+        times = spec.community.phase_months * np.arange(phases.size + 1)
+        values = np.concatenate([[0.0], phases.cumsum() / 100 * group_supply])
+        return vesting.PiecewiseLinear(times=times, values=values)
+    return vesting.VestingInfo(**dataclasses.asdict(group.vesting)).schedule(
+        group_pct=group.pct, total_supply=spec.total_supply)
+
+
+def compile_schedules(spec: TokenomicsSpec) -> Dict[str, vesting.PiecewiseLinear]:
+    """Cumulative supply curve of every group of 'spec', keyed by name, with
+    phased groups first as in 'allocation.schedules'. Each group's curve is
+    taken from the cache when its inputs are unchanged. Cached curves are
+    shared, so callers must not mutate them."""
+    ordered = ([g for g in spec.groups if g.vesting is None]
+               + [g for g in spec.groups if g.vesting is not None])
+    out: Dict[str, vesting.PiecewiseLinear] = {}
+    for group in ordered:
+        key = _group_key(group, spec)
+        schedule = _SCHEDULE_CACHE.get(key)
+        if schedule is None:
+            _CACHE_STATS["misses"] += 1
+            schedule = _compile_group(group, spec)
+            _SCHEDULE_CACHE[key] = schedule
+            if len(_SCHEDULE_CACHE) > SCHEDULE_CACHE_SIZE:
+                _SCHEDULE_CACHE.popitem(last=False)
+        else:
+            _CACHE_STATS["hits"] += 1
+            _SCHEDULE_CACHE.move_to_end(key)
+        out[group.name] = schedule
+    return out
+
+
+def cache_info() -> Dict[str, int]:
+    """Hits, misses and current size of the compiled schedule cache."""
+    return dict(**_CACHE_STATS, size=len(_SCHEDULE_CACHE))
@@ -0,0 +1,204 @@
+"""Dense (groups x time) supply matrices sampled from piecewise-linear
+schedules.
+
+Whole-horizon matrices hold every sample in memory at once. For horizons or
+resolutions that do not fit, 'iter_supply_windows' yields the same samples a
+window at a time, and 'period_unlocks' reduces such a stream in one pass.
+
+Classes:
+    SupplyMatrix
+    SupplyWindow
+
+Functions:
+    supply_matrix
+    iter_supply_windows
+    period_unlocks
+"""
+import dataclasses
+import numpy as np
+from typing import Dict, Iterable, Iterator, List, Optional
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.vesting import PiecewiseLinear
+
+
+@dataclasses.dataclass
+class SupplyMatrix:
+    """Cumulative supply of every group sampled on a shared time grid.
+
+    Attributes:
+        names (List[str]): Group names, one per row of 'amounts'.
+        times (np.ndarray): Time axis in months.
+        amounts (np.ndarray): Array of shape (len(names), times.size).
+    """
+
+    names: List[str]
+    times: np.ndarray
+    amounts: np.ndarray
+
+    def row(self, name: str) -> np.ndarray:
+        """Returns a view of the row for group 'name'."""
+        return self.amounts[self.names.index(name)]
+
+    def as_dict(self) -> Dict[str, np.ndarray]:
+        """Maps each group name to a view of its row."""
+        return {name: row for name, row in zip(self.names, self.amounts)}
+
+    def stacked(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Running sum over groups, i.e. the upper edge of each band in a
+        stacked area chart. Pass 'out=self.amounts' to stack in place."""
+        return np.cumsum(self.amounts, axis=0, out=out)
+
+    def totals(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Total supply over all groups at each time."""
+        return np.sum(self.amounts, axis=0, out=out)
+
+
+def supply_matrix(
+    schedules: Dict[str, PiecewiseLinear],
+    num_time_points: int = int(1e5),
+    stop: float = TOKEN_SUPPLY_YEARS * 12,
+    dtype: type = np.float64,
+    out: Optional[np.ndarray] = None,
+) -> SupplyMatrix:
+    """Evaluates every schedule on one evenly spaced time grid, writing each
+    group straight into its row of a single preallocated matrix.
+
+    Args:
+        schedules (Dict[str, PiecewiseLinear]): Cumulative supply curve of each
+            group, keyed by group name. Times are in months.
+        num_time_points (int, optional): Number of points on the time axis.
+            Defaults to int(1e5).
+        stop (float, optional): End of the time axis in months. Defaults to
+            the full token supply horizon.
+        dtype (type, optional): np.float64 or np.float32. Defaults to
+            np.float64.
+        out (np.ndarray, optional): Buffer of shape
+            (len(schedules), num_time_points) and type 'dtype' to reuse
+            between calls.
+
+    Returns:
+        SupplyMatrix
+    """
+    shape = (len(schedules), num_time_points)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif out.shape != shape or out.dtype != np.dtype(dtype):
+        raise ValueError(
+            f"'out' must have shape {shape} and dtype {np.dtype(dtype)}, "
+            f"got {out.shape} and {out.dtype}"
+        )
+
+    times = np.linspace(start=0, stop=stop, num=num_time_points)
+    for row, schedule in zip(out, schedules.values()):
+        schedule(times, out=row)
+
+    return SupplyMatrix(names=list(schedules), times=times, amounts=out)
+
+
+@dataclasses.dataclass
+class SupplyWindow(SupplyMatrix):
+    """A window of consecutive samples of the supply of every group.
+
+    Attributes:
+        start_index (int): Position of the first sample of the window on the
+            whole time axis.
+    """
+
+    start_index: int = 0
+
+
+def iter_supply_windows(
+    schedules: Dict[str, PiecewiseLinear],
+    num_time_points: int,
+    start: float = 0.0,
+    stop: float = TOKEN_SUPPLY_YEARS * 12,
+    window_points: int = 1 << 16,
+    dtype: type = np.float64,
+) -> Iterator[SupplyWindow]:
+    """Yields the samples of 'supply_matrix' over the time axis
+    np.linspace(start, stop, num_time_points), 'window_points' samples at a
+    time. Memory use depends on 'window_points' only, so any horizon and
+    resolution can be streamed. Schedules are held flat after their last
+    breakpoint.
+
+    The arrays of each window are views into buffers reused for the next
+    window, so copy them to keep them.
+
+    Args:
+        schedules (Dict[str, PiecewiseLinear]): Cumulative supply curve of each
+            group, keyed by group name. Times are in months.
+        num_time_points (int): Number of points on the whole time axis.
+        start (float, optional): Start of the time axis in months.
+        stop (float, optional): End of the time axis in months. Defaults to
+            the token supply horizon.
+        window_points (int, optional): Samples per window. Defaults to 65536.
+        dtype (type, optional): np.float64 or np.float32.
+
+    Yields:
+        SupplyWindow
+    """
+    names = list(schedules)
+    size = min(window_points, num_time_points)
+    amounts = np.empty((len(names), size), dtype=dtype)
+    times = np.empty(size)
+    step = (stop - start) / max(num_time_points - 1, 1)
+    for lo in range(0, num_time_points, window_points):
+        hi = min(lo + window_points, num_time_points)
+        window_times, window_amounts = times[:hi - lo], amounts[:, :hi - lo]
+        # Same values as np.linspace over the whole axis.
+        window_times[:] = np.arange(lo, hi)
+        window_times *= step
+        window_times += start
+        # np.linspace puts a single sample at 'start'.
+        if hi == num_time_points and num_time_points > 1:
+            window_times[-1] = stop
+        for row, schedule in zip(window_amounts, schedules.values()):
+            schedule(window_times, out=row)
+        yield SupplyWindow(
+            names=names, times=window_times, amounts=window_amounts,
+            start_index=lo)
+
+
+def period_unlocks(
+    windows: Iterable[SupplyMatrix], period_months: float
+) -> Dict[str, np.ndarray]:
+    """Supply released to each group in consecutive periods of
+    'period_months', from a stream of windows in time order, in one pass.
+
+    The increase between two consecutive samples is credited to the period in
+    which the earlier sample falls. The supply at the first sample (e.g. what
+    is released at genesis) goes to the first period.
+
+    Args:
+        windows (Iterable[SupplyMatrix]): E.g. 'iter_supply_windows(...)'.
+        period_months (float): Length of a period in months, e.g. 1 or 12.
+
+    Returns:
+        Dict[str, np.ndarray]: Amount released in each period, keyed by group
+            name. Period 'i' starts 'i * period_months' after the first sample.
+    """
+    totals: Optional[np.ndarray] = None
+    names: List[str] = []
+    prev_amounts = prev_time = origin = None
+    for window in windows:
+        if totals is None:
+            names = list(window.names)
+            totals = np.zeros((len(names), 0))
+            origin = prev_time = float(window.times[0])
+            prev_amounts = np.zeros(len(names))
+
+        step_starts = np.concatenate([[prev_time], window.times[:-1]])
+        periods = ((step_starts - origin) // period_months).astype(np.intp)
+        num_periods = int(periods[-1]) + 1
+        if num_periods > totals.shape[1]:
+            totals = np.pad(totals, [(0, 0), (0, num_periods - totals.shape[1])])
+        for row, prev, amounts in zip(totals, prev_amounts, window.amounts):
+            deltas = np.diff(amounts, prepend=prev)
+            row[:num_periods] += np.bincount(
+                periods, weights=deltas, minlength=num_periods)
+
+        prev_amounts = window.amounts[:, -1].astype(float)
+        prev_time = float(window.times[-1])
+    if totals is None:
+        return {}
+    return dict(zip(names, totals))
@@ -0,0 +1,66 @@
+"""Exact, breakpoint-resolution traces for piecewise-linear supply schedules.
+
+A piecewise-linear curve drawn with straight line segments between its
+breakpoints is pixel-identical to the same curve sampled at any resolution, so
+there is no need to ship dense arrays to the browser. Cliffs are drawn as
+vertical edges by repeating their time with the pre- and post-jump values.
+
+Functions:
+    breakpoint_grid
+    stacked_traces
+"""
+import numpy as np
+from typing import Dict, Optional, Tuple
+from pkg.vesting import PiecewiseLinear
+
+
+def breakpoint_grid(
+    schedules: Dict[str, PiecewiseLinear],
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> np.ndarray:
+    """Union of the breakpoints of every schedule, sorted, with each cliff
+    time repeated once so that all schedules can share one x-axis.
+
+    Args:
+        schedules (Dict[str, PiecewiseLinear]): Curves to cover.
+        start (float, optional): Clip the grid to times >= 'start'.
+        stop (float, optional): Clip the grid to times <= 'stop'.
+
+    Returns:
+        np.ndarray: Non-decreasing times.
+    """
+    curves = schedules.values()
+    times = np.unique(np.concatenate([s.times for s in curves]))
+    jumps = np.unique(np.concatenate([s.jump_times for s in curves]))
+    if start is not None:
+        times = np.concatenate([[start], times[times > start]])
+        jumps = jumps[jumps > start]
+    if stop is not None:
+        times = np.concatenate([times[times < stop], [stop]])
+        jumps = jumps[jumps < stop]
+    return np.sort(np.concatenate([times, jumps]))
+
+
+def stacked_traces(
+    schedules: Dict[str, PiecewiseLinear],
+    start: Optional[float] = None,
+    stop: Optional[float] = None,
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Evaluates every schedule on their shared 'breakpoint_grid'.
+
+    Where a time is repeated, the first point holds the value just before the
+    cliff and the second the value after it.
+
+    Returns:
+        x (np.ndarray): Shared time axis.
+        ys (Dict[str, np.ndarray]): Values of each schedule on 'x'.
+    """
+    x = breakpoint_grid(schedules=schedules, start=start, stop=stop)
+    is_left = np.zeros(x.shape, dtype=bool)
+    is_left[:-1] = x[:-1] == x[1:]
+    ys: Dict[str, np.ndarray] = {
+        name: np.where(is_left, s.left_limit(x), s(x))
+        for name, s in schedules.items()
+    }
+    return x, ys
@@ -1,9 +1,114 @@
+import bisect
+import functools
 import numpy as np
 from dataclasses import dataclass as struct
+from typing import Optional, Sequence, Tuple
 from .const import TOKEN_SUPPLY_YEARS, SUPPLY_AT_MATURITY
 
 
-@struct
+class PiecewiseLinear:
+    """A right-continuous piecewise-linear curve given by its breakpoints.
+
+    Cliffs (jumps) are represented by two consecutive breakpoints at the same
+    time; the curve takes the second (post-jump) value at that time. Outside
+    of the breakpoint range the curve is held flat at its first and last
+    values.
+
+    Attributes:
+        times (np.ndarray): Non-decreasing breakpoint times.
+        values (np.ndarray): Curve value at each breakpoint.
+    """
+
+    times: np.ndarray
+    values: np.ndarray
+
+    def __init__(self, times: Sequence[float], values: Sequence[float]):
+        times = np.array(times, dtype=float)
+        values = np.array(values, dtype=float)
+        if times.ndim != 1 or times.shape != values.shape or times.size == 0:
+            raise ValueError(
+                "'times' and 'values' must be non-empty 1D arrays of equal length"
+            )
+        if np.any(np.diff(times) < 0):
+            raise ValueError("'times' must be non-decreasing")
+        times.setflags(write=False)
+        values.setflags(write=False)
+        self.times = times
+        self.values = values
+
+        # slopes[i] is the slope of the segment starting at breakpoint i. The
+        # last entry and zero-width (cliff) segments get a slope of zero.
+        widths = np.diff(times)
+        rises = np.diff(values)
+        slopes = np.zeros_like(values)
+        np.divide(rises, widths, out=slopes[:-1], where=widths > 0)
+        self._slopes = slopes
+        self._times_list = times.tolist()
+
+    def __repr__(self) -> str:
+        return f"PiecewiseLinear(times={self.times!r}, values={self.values!r})"
+
+    @property
+    def breakpoints(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.times, self.values
+
+    def at(self, t: float) -> float:
+        """Evaluates the curve at a single time in O(log k)."""
+        idx = bisect.bisect_right(self._times_list, t) - 1
+        if idx < 0:
+            return float(self.values[0])
+        return float(
+            self.values[idx] + self._slopes[idx] * (t - self.times[idx]))
+
+    def __call__(
+        self, t: np.ndarray, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Evaluates the curve at every element of 't'.
+
+        Args:
+            t (np.ndarray): Times of any shape.
+            out (np.ndarray, optional): Buffer with the shape of 't' to write
+                the result into.
+
+        Returns:
+            np.ndarray: Curve values with the shape of 't'.
+        """
+        t = np.asarray(t, dtype=float)
+        idx = np.searchsorted(self.times, t, side="right") - 1
+        np.clip(idx, 0, None, out=idx)
+        if out is None:
+            out = np.empty(t.shape, dtype=float)
+        np.clip(t, self.times[0], None, out=out)
+        out -= self.times[idx]
+        out *= self._slopes[idx]
+        out += self.values[idx]
+        return out
+
+    def left_limit(self, t: np.ndarray) -> np.ndarray:
+        """Like '__call__', but takes the pre-jump value at cliffs."""
+        t = np.asarray(t, dtype=float)
+        idx = np.searchsorted(self.times, t, side="left") - 1
+        np.clip(idx, 0, None, out=idx)
+        clipped = np.clip(t, self.times[0], None)
+        return self.values[idx] + self._slopes[idx] * (clipped - self.times[idx])
+
+    @property
+    def jump_times(self) -> np.ndarray:
+        """Times at which the curve jumps (cliffs)."""
+        is_jump = (np.diff(self.times) == 0) & (np.diff(self.values) != 0)
+        return self.times[:-1][is_jump]
+
+    def dense(
+        self, num_time_points: int, stop: Optional[float] = None
+    ) -> np.ndarray:
+        """Samples the curve on 'num_time_points' evenly spaced times between
+        0 and 'stop' (defaults to the last breakpoint)."""
+        if stop is None:
+            stop = self.times[-1]
+        return self(np.linspace(start=0, stop=stop, num=num_time_points))
+
+
+@struct(frozen=True)
 class VestingInfo:
     cliff_pct: float
     vest_start_month: int
@@ -18,30 +123,72 @@ class VestingInfo:
     def months_after_vest(self) -> int:
         return (TOKEN_SUPPLY_YEARS * 12) - self.vest_end_month
 
+    @functools.lru_cache(maxsize=256)
+    def schedule(
+        self, group_pct: float, total_supply: float = SUPPLY_AT_MATURITY
+    ) -> PiecewiseLinear:
+        """Cumulative unlocked supply of a group as a function of time in
+        months: zero until 'vest_start_month', a cliff of 'cliff_pct', a linear
+        ramp until 'vest_end_month', then flat. Memoized per
+        (VestingInfo, group_pct, total_supply), so callers must not mutate the
+        result.
+
+        Args:
+            group_pct (float): Fraction of 'total_supply' held by the group,
+                e.g. 0.08 for 8%.
+            total_supply (float, optional): Token supply at maturity. Defaults
+                to 'SUPPLY_AT_MATURITY'.
+        """
+        token_supply_months = TOKEN_SUPPLY_YEARS * 12
+        supply_start = total_supply * group_pct * self.cliff_pct
+        supply_end = total_supply * group_pct
+
+        times = [self.vest_start_month, self.vest_end_month]
+        values = [supply_start, supply_end]
+        if self.months_before_vest() > 0:
+            times = [0, self.vest_start_month] + times
+            values = [0.0, 0.0] + values
+        if self.vest_end_month < token_supply_months:
+            times.append(token_supply_months)
+            values.append(supply_end)
+        return PiecewiseLinear(times=times, values=values)
+
     def distrib_vec(
         self,
         group_pct: float,
         num_time_points: int = int(1e5),
     ) -> np.ndarray:
-        token_supply_months = TOKEN_SUPPLY_YEARS * 12
-        supply_start = SUPPLY_AT_MATURITY * group_pct * self.cliff_pct
-        supply_end = SUPPLY_AT_MATURITY * group_pct
-        head = np.linspace(
-            start=supply_start,
-            stop=supply_end,
-            num=num_time_points * self.months_vesting() // token_supply_months,
+        """Samples 'schedule' on 'num_time_points' evenly spaced times over the
+        full token supply horizon."""
+        return self.schedule(group_pct=group_pct).dense(
+            num_time_points=num_time_points, stop=TOKEN_SUPPLY_YEARS * 12
         )
-        years_before_vest = self.months_before_vest()
-        if years_before_vest > 0:
-            zeros_before_head = np.zeros(
-                num_time_points * self.months_before_vest() // token_supply_months,
-                dtype=float,
-            )
-            head = np.concatenate([zeros_before_head, head])
 
-        ones_tail = np.ones(
-            num_time_points * self.months_after_vest() // token_supply_months,
-            dtype=float,
-        )
 
-        return np.concatenate([head, ones_tail * head[-1]])
+def vesting_supply(
+    t: np.ndarray,
+    total: np.ndarray,
+    cliff_pct: np.ndarray,
+    vest_start_month: np.ndarray,
+    vest_end_month: np.ndarray,
+) -> np.ndarray:
+    """Closed form of 'VestingInfo.schedule' that broadcasts over every
+    argument, e.g. to evaluate many parameter sets at once.
+
+    Args:
+        t (np.ndarray): Times in months.
+        total (np.ndarray): Supply of the group once fully vested.
+        cliff_pct (np.ndarray): Fraction of 'total' unlocked at the cliff.
+        vest_start_month (np.ndarray): Month of the cliff.
+        vest_end_month (np.ndarray): Month at which vesting completes.
+
+    Returns:
+        np.ndarray: Unlocked supply, broadcast over all arguments.
+    """
+    t = np.asarray(t, dtype=float)
+    span = np.asarray(vest_end_month - vest_start_month, dtype=float)
+    elapsed = t - vest_start_month
+    ramp = np.clip(elapsed / np.where(span > 0, span, 1.0), 0, 1)
+    ramp = np.where(span > 0, ramp, 1.0)
+    unlocked = total * (cliff_pct + (1 - cliff_pct) * ramp)
+    return np.where(elapsed >= 0, unlocked, 0.0)
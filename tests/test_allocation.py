@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+
+from pkg import allocation
+from pkg.const import TOKEN_SUPPLY_YEARS
+
+
+@pytest.mark.parametrize("total_supply", [7.5e8, 1.5e9, 2e9])
+def test_schedules_sum_to_total_supply(total_supply):
+    schedules = allocation.schedules(allocation.default_groups(), total_supply)
+    at_maturity = sum(
+        float(schedule(np.array([TOKEN_SUPPLY_YEARS * 12.0]))[0])
+        for schedule in schedules.values())
+    assert at_maturity == pytest.approx(total_supply)
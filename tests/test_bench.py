@@ -0,0 +1,43 @@
+import json
+
+from pkg import bench
+
+
+def record(timestamp, node, best_seconds, case="supply_matrix"):
+    return dict(
+        timestamp=timestamp, commit=timestamp, python="3.11.7",
+        machine="x86_64", node=node, case=case, size=1000,
+        best_seconds=best_seconds, error=None)
+
+
+def write_history(path, records):
+    with open(path, "w") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+
+def test_compare_skips_runs_on_other_hosts(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    write_history(path, [
+        record("2026-01-01", "fast", 1.0),
+        record("2026-01-02", "slow", 3.0),
+        record("2026-01-03", "fast", 1.1),
+    ])
+    assert bench.compare(path) == []
+
+    write_history(path, [
+        record("2026-01-01", "fast", 1.0),
+        record("2026-01-02", "slow", 3.0),
+        record("2026-01-03", "fast", 2.0),
+    ])
+    regressions = bench.compare(path)
+    assert len(regressions) == 1 and "2026-01-01" in regressions[0]
+
+
+def test_compare_without_previous_run_on_host(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    write_history(path, [
+        record("2026-01-01", "fast", 1.0),
+        record("2026-01-02", "slow", 3.0),
+    ])
+    assert bench.compare(path) == []
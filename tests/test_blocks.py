@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from pkg import allocation
+from pkg import blocks
+
+TOTAL_SUPPLY = 7.5e8
+
+
+def test_block_schedule_at_other_total_supply(tmp_path):
+    path = os.path.join(tmp_path, "blocks.bin")
+    blocks.write_block_schedule(
+        path, block_seconds=86400.0, total_supply=TOTAL_SUPPLY, by_group=True,
+        chunk_blocks=1000)
+    schedule = blocks.load_block_schedule(path)
+    records = schedule.records
+    minted = records["minted"].sum()
+    unlocked = records["unlocked"].sum()
+    assert minted + unlocked == pytest.approx(TOTAL_SUPPLY)
+
+    groups = {g.name: g for g in allocation.default_groups()}
+    for name in schedule.minted_groups + schedule.unlocked_groups:
+        assert records[name].sum() == pytest.approx(TOTAL_SUPPLY * groups[name].pct)
+    assert minted == pytest.approx(
+        sum(records[name].sum() for name in schedule.minted_groups))
+
@@ -0,0 +1,16 @@
+import pytest
+
+from pkg.inflation import to_dec
+
+
+def test_to_dec_keeps_every_digit():
+    assert to_dec("12345678901.123456789012345678") == (
+        12345678901123456789012345678)
+    assert to_dec("1.500000000000000000000") == 15 * 10**17
+    assert to_dec("-0.000000000000000001") == -1
+
+
+@pytest.mark.parametrize("value", ["0.0000000000000000001", "nan", "inf"])
+def test_to_dec_rejects(value):
+    with pytest.raises(ValueError):
+        to_dec(value)
@@ -0,0 +1,14 @@
+import numpy as np
+import pytest
+
+from pkg import allocation
+from pkg.const import TOKEN_SUPPLY_YEARS
+from pkg.query import SupplyIndex
+
+TOTAL_SUPPLY = 7.5e8
+
+
+def test_supply_index_at_other_total_supply():
+    index = SupplyIndex.from_groups(allocation.default_groups(), TOTAL_SUPPLY)
+    at_maturity = index.supply_at(np.array([TOKEN_SUPPLY_YEARS * 12.0]))
+    assert float(at_maturity[0]) == pytest.approx(TOTAL_SUPPLY)
@@ -0,0 +1,33 @@
+import dataclasses
+
+import numpy as np
+import pytest
+
+from pkg import shared
+from pkg import spec
+from pkg.plotter import PlotterTokenomicsV1
+from tests.test_spec import SPEC_PATH
+
+
+def test_published_spec_round_trips(tmp_path):
+    tokenomics_spec = spec.load_spec(SPEC_PATH)
+    tokenomics_spec = dataclasses.replace(
+        tokenomics_spec, total_supply=1e9,
+        community=dataclasses.replace(tokenomics_spec.community, phase_months=3.0))
+    shared.publish(str(tmp_path), num_time_points=101,
+                   tokenomics_spec=tokenomics_spec)
+
+    store = shared.attach(str(tmp_path))
+    attached = store.tokenomics_spec()
+    assert attached.total_supply == 1e9
+    assert attached.community == tokenomics_spec.community
+    assert attached.groups == tokenomics_spec.groups
+    assert attached.decay == tokenomics_spec.decay
+    assert store.supply_matrix().amounts[:, -1].sum() == pytest.approx(1e9)
+
+    tornado = store.tornado()
+    expected = PlotterTokenomicsV1.from_spec(tokenomics_spec).sensitivity_tornado(
+        month=shared.TORNADO_MONTH)
+    assert tornado.params == expected.params
+    np.testing.assert_allclose(tornado.low_supply, expected.low_supply)
+    np.testing.assert_allclose(tornado.high_supply, expected.high_supply)
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+
+from pkg import spec
+from pkg.plotter import PlotterTokenomicsV1
+
+SPEC_PATH = os.path.join(
+    os.path.dirname(__file__), os.pardir, "specs", "tokenomics-v2.toml")
+
+
+def renamed_phased_spec(name: str = "Ecosystem") -> spec.TokenomicsSpec:
+    with open(SPEC_PATH, "rb") as f:
+        try:
+            import tomllib
+        except ImportError:
+            import tomli as tomllib  # type: ignore
+        data = tomllib.load(f)
+    for group in data["groups"]:
+        if group.get("vesting") is None:
+            group["name"] = name
+    return spec.parse_spec(data)
+
+
+def test_renamed_phased_group():
+    tokenomics_spec = renamed_phased_spec("Ecosystem")
+    plotter = PlotterTokenomicsV1.from_spec(tokenomics_spec)
+    assert plotter.phased_groups() == ["Ecosystem"]
+
+    by_category, full_duration = plotter.setup_token_distrib_area(
+        num_time_points=97)
+    assert list(full_duration) == ["Ecosystem"]
+    assert "Ecosystem" not in by_category
+
+    community = plotter.community_schedule()
+    ecosystem = plotter.schedules()["Ecosystem"]
+    months = np.linspace(0, 96, 97)
+    np.testing.assert_allclose(community(months), ecosystem(months))
+    np.testing.assert_allclose(full_duration["Ecosystem"], ecosystem(months))
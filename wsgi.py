@@ -0,0 +1,21 @@
+"""WSGI entry point that serves the dashboard from several worker processes.
+
+The primary computes and publishes the shared arrays once. Each worker
+attaches to them read-only (see 'pkg.shared'):
+
+    python main.py --publish
+    gunicorn --workers 4 --bind 0.0.0.0:8050 wsgi:server
+
+Health and readiness probes: GET /healthz and GET /readyz.
+"""
+import os
+
+import main
+from pkg import profiling
+
+profiling.enable_from_env(report_at_exit=True)
+app = main.serving_app(
+    attach_timeout=float(os.environ.get("TOKENOMICS_ATTACH_TIMEOUT", "60")),
+    compact=os.environ.get("TOKENOMICS_TYPED_ARRAYS", "") == "1",
+)
+server = app.server